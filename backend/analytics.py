@@ -0,0 +1,238 @@
+# backend/analytics.py
+# Pre-aggregated interview analytics.
+#
+# Every saved interview increments one rollup bucket per (scope, key, day):
+# scope 'user' keyed by userId, scope 'skill' keyed by each normalized resume
+# skill. A bucket holds count/sum/min/max of finalScore, a score histogram and
+# per-question score totals, so trend queries read O(days) small documents
+# instead of scanning interviews. backfill_rollups() rebuilds all buckets from
+# the interviews collection with aggregation pipelines.
+#
+# CLI usage:
+#   python analytics.py backfill
+import argparse
+import logging
+import os
+import sys
+from datetime import datetime, timezone
+
+from pymongo import ASCENDING, UpdateOne
+
+import database
+from database import bulk_write_behind
+
+logger = logging.getLogger(__name__)
+
+ROLLUPS_COLLECTION = "interview_rollups"
+ROLLUP_SCOPES = ('user', 'skill')
+MAX_ROLLUP_SKILLS = int(os.getenv("MAX_ROLLUP_SKILLS", "25")) # Skills per interview that get a bucket
+MAX_SKILL_LENGTH = 64
+DAY_FORMAT = "%Y-%m-%d"
+
+
+def normalize_skills(skills) -> list:
+    """Lower-cased, de-duplicated, bounded skill keys (in resume order)."""
+    normalized = []
+    for skill in skills or []:
+        if not isinstance(skill, str):
+            continue
+        key = " ".join(skill.lower().split())[:MAX_SKILL_LENGTH]
+        if key and key not in normalized:
+            normalized.append(key)
+        if len(normalized) >= MAX_ROLLUP_SKILLS:
+            break
+    return normalized
+
+
+def rollup_id(scope, key, day):
+    return f"{scope}:{key}:{day}"
+
+
+def _day(value) -> str:
+    if isinstance(value, datetime):
+        if value.tzinfo is not None:
+            value = value.astimezone(timezone.utc)
+        return value.strftime(DAY_FORMAT)
+    return datetime.now(timezone.utc).strftime(DAY_FORMAT)
+
+
+def rollup_operations(interview_doc) -> list:
+    """The $inc/$min/$max upserts that fold one interview document into its buckets."""
+    day = _day(interview_doc.get('date'))
+    score = interview_doc.get('finalScore')
+    question_scores = [q.get('score') for q in interview_doc.get('questions', [])
+                       if isinstance(q.get('score'), (int, float))]
+
+    increments = {"count": 1, "questionCount": len(question_scores), "questionSum": sum(question_scores)}
+    update = {"$inc": increments}
+    if isinstance(score, (int, float)):
+        increments.update({"scored": 1, "sum": score, f"hist.{int(score)}": 1})
+        update["$min"] = {"min": score}
+        update["$max"] = {"max": score}
+
+    keys = []
+    if interview_doc.get('userId') is not None:
+        keys.append(('user', str(interview_doc['userId'])))
+    keys.extend(('skill', skill) for skill in normalize_skills(interview_doc.get('skills')))
+
+    return [
+        UpdateOne(
+            {"_id": rollup_id(scope, key, day)},
+            {**update, "$setOnInsert": {"scope": scope, "key": key, "day": day}},
+            upsert=True
+        )
+        for scope, key in keys
+    ]
+
+
+def record_interview(interview_doc, sync=None):
+    """Updates the rollups for a newly saved interview (buffered like other writes unless sync=True)."""
+    try:
+        bulk_write_behind(ROLLUPS_COLLECTION, rollup_operations(interview_doc), sync=sync)
+    except Exception as e:
+        # Analytics must never fail the save itself; a backfill repairs missed updates
+        logger.error(f"Could not update rollups for interview {interview_doc.get('interviewId')}: {e}")
+
+
+# === Queries ===
+
+def get_rollup_buckets(scope, key, day_from=None, day_to=None) -> list:
+    """Day buckets for one user/skill, oldest first. Days are 'YYYY-MM-DD' strings (inclusive)."""
+    database.ensure_connected()
+    if scope not in ROLLUP_SCOPES:
+        raise ValueError(f"Unknown rollup scope '{scope}'")
+    query = {"scope": scope, "key": key}
+    day_range = {}
+    if day_from:
+        day_range["$gte"] = day_from
+    if day_to:
+        day_range["$lte"] = day_to
+    if day_range:
+        query["day"] = day_range
+    cursor = database.db[ROLLUPS_COLLECTION].find(query, {"_id": 0, "scope": 0, "key": 0}).sort("day", ASCENDING)
+    buckets = []
+    for bucket in cursor:
+        bucket["average"] = round(bucket["sum"] / bucket["scored"], 2) if bucket.get("scored") else None
+        buckets.append(bucket)
+    return buckets
+
+
+def summarize_buckets(buckets) -> dict:
+    """Merges day buckets into totals for the whole range."""
+    totals = {"count": 0, "scored": 0, "sum": 0, "min": None, "max": None, "hist": {},
+              "questionCount": 0, "questionSum": 0}
+    for bucket in buckets:
+        for field in ("count", "scored", "sum", "questionCount", "questionSum"):
+            totals[field] += bucket.get(field, 0)
+        if bucket.get("min") is not None:
+            totals["min"] = bucket["min"] if totals["min"] is None else min(totals["min"], bucket["min"])
+        if bucket.get("max") is not None:
+            totals["max"] = bucket["max"] if totals["max"] is None else max(totals["max"], bucket["max"])
+        for score, count in bucket.get("hist", {}).items():
+            totals["hist"][score] = totals["hist"].get(score, 0) + count
+    totals["average"] = round(totals["sum"] / totals["scored"], 2) if totals["scored"] else None
+    totals["questionAverage"] = round(totals["questionSum"] / totals["questionCount"], 2) if totals["questionCount"] else None
+    return totals
+
+
+# === Backfill ===
+
+def _rollup_pipeline(scope, key_expr, pre_stages=()):
+    """Aggregation that computes the same buckets as rollup_operations() for every interview."""
+    is_scored = {"$isNumber": "$_id.score"}
+    return list(pre_stages) + [
+        {"$project": {
+            "key": key_expr,
+            "day": {"$dateToString": {"format": DAY_FORMAT, "date": "$date"}},
+            "score": "$finalScore",
+            "questionScores": {"$filter": {
+                "input": {"$ifNull": ["$questions.score", []]},
+                "cond": {"$isNumber": "$$this"}
+            }}
+        }},
+        # First per score value (for the histogram), then per bucket
+        {"$group": {
+            "_id": {"key": "$key", "day": "$day", "score": "$score"},
+            "n": {"$sum": 1},
+            "questionCount": {"$sum": {"$size": "$questionScores"}},
+            "questionSum": {"$sum": {"$sum": "$questionScores"}}
+        }},
+        {"$group": {
+            "_id": {"key": "$_id.key", "day": "$_id.day"},
+            "count": {"$sum": "$n"},
+            "scored": {"$sum": {"$cond": [is_scored, "$n", 0]}},
+            "sum": {"$sum": {"$cond": [is_scored, {"$multiply": ["$_id.score", "$n"]}, 0]}},
+            "min": {"$min": "$_id.score"},
+            "max": {"$max": "$_id.score"},
+            "hist": {"$push": {"k": {"$toString": {"$toInt": "$_id.score"}}, "v": "$n", "scored": is_scored}},
+            "questionCount": {"$sum": "$questionCount"},
+            "questionSum": {"$sum": "$questionSum"}
+        }},
+        {"$project": {
+            "_id": {"$concat": [scope, ":", "$_id.key", ":", "$_id.day"]},
+            "scope": {"$literal": scope},
+            "key": "$_id.key",
+            "day": "$_id.day",
+            "count": 1, "scored": 1, "sum": 1, "min": 1, "max": 1,
+            "hist": {"$arrayToObject": {"$map": {
+                "input": {"$filter": {"input": "$hist", "cond": "$$this.scored"}},
+                "in": {"k": "$$this.k", "v": "$$this.v"}
+            }}},
+            "questionCount": 1, "questionSum": 1
+        }}
+    ]
+
+
+def backfill_rollups():
+    """
+    Rebuilds every rollup bucket from the interviews collection. The result is built
+    in a staging collection and swapped in with a rename, so readers never see a
+    half-built set. Interviews saved while the backfill runs may be missed; run it
+    again (or off-peak) if that matters. Returns the number of buckets written.
+    """
+    if database.db is None:
+        raise Exception("DB not initialized")
+    db = database.db
+    database.flush_writes() # Pending rollup increments would otherwise land on the old collection
+    staging_name = f"{ROLLUPS_COLLECTION}_backfill"
+    db[staging_name].drop()
+    db.create_collection(staging_name) # So the rename works even with no interviews yet
+
+    user_stages = [{"$match": {"userId": {"$ne": None}, "date": {"$type": "date"}}}]
+    skill_stages = [
+        {"$match": {"skills.0": {"$exists": True}, "date": {"$type": "date"}}},
+        {"$unwind": "$skills"},
+        {"$match": {"skills": {"$type": "string", "$ne": ""}}}
+    ]
+    db.interviews.aggregate(
+        _rollup_pipeline('user', {"$toString": "$userId"}, user_stages) + [{"$out": staging_name}],
+        allowDiskUse=True
+    )
+    db.interviews.aggregate(
+        _rollup_pipeline('skill', {"$toLower": {"$trim": {"input": "$skills"}}}, skill_stages) + [{"$merge": {"into": staging_name, "whenMatched": "replace"}}],
+        allowDiskUse=True
+    )
+
+    buckets = db[staging_name].count_documents({})
+    db[staging_name].create_index([("scope", ASCENDING), ("key", ASCENDING), ("day", ASCENDING)], name='scope_key_day')
+    db[staging_name].rename(ROLLUPS_COLLECTION, dropTarget=True)
+    logger.info(f"Rebuilt {buckets} interview rollup buckets.")
+    return buckets
+
+
+# === CLI ===
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Interview analytics maintenance.")
+    parser.add_argument("command", choices=["backfill"], help="backfill: rebuild all rollups from interviews")
+    parser.parse_args(argv)
+
+    logging.basicConfig(level=os.getenv("LOG_LEVEL", "INFO").upper(), stream=sys.stderr)
+    database.connect_db()
+    buckets = backfill_rollups()
+    print(f"Rebuilt {buckets} rollup buckets.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
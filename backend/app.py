@@ -1,7 +1,6 @@
 from flask import Flask, request, jsonify
 from flask_cors import CORS
 from PyPDF2 import PdfReader
-from docx import Document
 import os
 import requests
 import json
@@ -12,6 +11,9 @@ from dotenv import load_dotenv
 import uuid
 from typing import Dict, List
 import groq
+from interview_context import ContextWindow
+from resume_parser import parse_resume_text
+from docx_extract import extract_docx_text
 
 # Load environment variables
 load_dotenv()
@@ -31,13 +33,17 @@ if not GROQ_API_KEY:
 
 groq_client=groq.Groq(api_key=GROQ_API_KEY)
 
+# Recent turns verbatim, older ones folded into a local summary, within a token budget
+context_window = ContextWindow()
+
 # Interview state storage
 interviews: Dict[str, Dict] = {}
 
 def extract_text_from_pdf(file_storage):
     try:
         reader = PdfReader(file_storage)
-        text = "\n".join(page.extract_text() for page in reader.pages if page.extract_text())
+        page_texts = (page.extract_text() for page in reader.pages) # Extract each page once
+        text = "\n".join(page_text for page_text in page_texts if page_text)
         if not text.strip():
             raise ValueError("No text could be extracted from the PDF.")
         return text
@@ -47,8 +53,7 @@ def extract_text_from_pdf(file_storage):
 
 def extract_text_from_docx(file_storage):
     try:
-        doc = Document(file_storage)
-        text = "\n".join(para.text for para in doc.paragraphs if para.text.strip())
+        text = extract_docx_text(file_storage.stream, filename=file_storage.filename).text
         if not text.strip():
             raise ValueError("No text could be extracted from the DOCX.")
         return text
@@ -75,42 +80,13 @@ def parse_resume():
         if not resume_text.strip():
             return jsonify({"error": "No text could be extracted from the uploaded resume."}), 400
 
-        max_text_length = 20000
-        if len(resume_text) > max_text_length:
-            resume_text = resume_text[:max_text_length]
-
-        prompt = f"""
-Extract the following information from this resume text and return only the JSON object:
-Keys: "name", "skills", "experience", and "projects".
-
-Resume Text:
-\"\"\"
-{resume_text}
-\"\"\"
-"""
-
-        # Replace direct API call with Groq SDK
-        chat_completion = groq_client.chat.completions.create(
-            model="llama3-70b-8192",
-            messages=[
-                {"role": "system", "content": "You are an expert at parsing resumes and returning structured JSON output."},
-                {"role": "user", "content": prompt}
-            ],
-            temperature=0.3
-        )
-
-        content = chat_completion.choices[0].message.content
-        cleaned = re.sub(r"^```(?:json)?|```$", "", content.strip(), flags=re.MULTILINE)
-        cleaned = re.sub(r'^.*?\{', '{', cleaned, flags=re.DOTALL)
-
+        # Long resumes are parsed section by section instead of being cut off
         try:
-                parsed = json.loads(cleaned)
-                return jsonify(parsed)
-        except json.JSONDecodeError as e:
-                logger.error(f"JSON decoding error: {e}")
-                return jsonify({"error": "Failed to parse resume data."}), 500
-        else:
-            return jsonify({"error": "API did not return results."}), 500
+            parsed = parse_resume_text(resume_text, groq_client.chat.completions.create, resume_file.filename)
+            return jsonify(parsed)
+        except ValueError as e:
+            logger.error(f"JSON decoding error: {e}")
+            return jsonify({"error": "Failed to parse resume data."}), 500
 
     except Exception as e:
         logger.error(f"Error: {e}\n{traceback.format_exc()}")
@@ -246,27 +222,22 @@ Interview Guidelines:
 6. Score responses objectively (1-10)
 7. Document specific strengths and areas for improvement
 
-Previous Discussion Context:
-{conversation_history}
-
-Latest Response Analysis:
-{user_response}
-
 Proceed with appropriate follow-up maintaining professional interview standards.
 """
 
-        messages = [
-            {"role": "system", "content": system_content}
+        # The history is sent once, as chat turns (not also pasted into the system content)
+        history = [
+            {"role": "assistant" if msg['type'] == 'interviewer' else "user", "content": msg['content']}
+            for msg in conversation_history
         ]
-        
-        for msg in conversation_history:
-            if msg['type'] == 'interviewer':
-                messages.append({"role": "assistant", "content": msg['content']})
-            else:
-                messages.append({"role": "user", "content": msg['content']})
-        
-        messages.append({"role": "user", "content": user_response})
-        
+        history.append({"role": "user", "content": user_response})
+        # Kept across turns, so older turns are folded into the summary incrementally
+        context_state = interview.setdefault('context', {})
+        if context_state.get('summarized_count', 0) > len(history):
+            context_state.clear() # The client sent a shorter history than was summarized: start over
+        messages, prompt_tokens = context_window.build(system_content, history, context_state)
+        logger.debug(f"Interview {interview_id}: sending ~{prompt_tokens} prompt tokens ({len(messages)} messages).")
+
 
         chat_completion = groq_client.chat.completions.create(
             model="llama3-70b-8192",
@@ -30,10 +30,8 @@
 
 
 # app.py
-from flask import Flask, request, jsonify
+from flask import Flask, Request, Response, g, request, jsonify, stream_with_context
 from flask_cors import CORS
-from PyPDF2 import PdfReader
-from docx import Document
 import os
 import json
 import re
@@ -43,33 +41,60 @@ from dotenv import load_dotenv
 import uuid
 from datetime import datetime, timezone # Use timezone-aware datetimes
 import sys
-import groq
 from bson import ObjectId # Import ObjectId if needed for user IDs
 import time
-# Add below import statements
-import socket
-# Setup logging
-logging.basicConfig(level=logging.DEBUG)
+import atexit
+import copy
+import threading
+# Setup logging (LOG_LEVEL=DEBUG for per-request detail; DEBUG logging is expensive on the hot path)
+load_dotenv()
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
+logging.basicConfig(level=LOG_LEVEL, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
-# Add below 'Load environment variables'
-def check_mongodb_availability():
-    """Simple check if MongoDB port is accessible"""
-    s = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-    try:
-        s.connect(("localhost", 27017))
-        logger.info("MongoDB port 27017 is accessible")
-        s.close()
-        return True
-    except socket.error:
-        logger.error("Cannot connect to MongoDB port 27017. Is MongoDB running?")
-        s.close()
-        return False
-
-# Call this before initializing the database
-if not check_mongodb_availability():
-    logger.critical("MongoDB server is not accessible. Please start MongoDB server first.")
-    sys.exit(1)
+
+# --- Startup timing ---
+# Import-time and warm-up phases are timed and reported by /ready.
+# Importing this module does no network I/O: MongoDB and Groq are connected on first use
+# (or by the background warm-up in init_worker).
+STARTUP_MODE = os.getenv("STARTUP_MODE", "lazy").lower() # 'lazy' or 'eager' (connect + migrate before serving)
+STARTUP_PHASES = {} # phase -> milliseconds
+PROCESS_STARTED_AT = time.time()
+
+
+def record_startup_phase(name, started):
+    """Stores the duration of a startup phase begun at `started` (perf_counter); returns now."""
+    now = time.perf_counter()
+    STARTUP_PHASES[name] = round((now - started) * 1000, 1)
+    return now
+
+
+_phase_started = time.perf_counter()
 # Import the specific functions needed from database.py
+from pdf_extract import extract_pdf_text, shutdown_extraction_pool
+from docx_extract import extract_docx_text
+from llm_gateway import GatewayBusyError, LazyGateway, get_gateway
+from interview_context import ContextWindow, make_llm_summarizer
+from interview_scoring import SCORE_PATTERN, StreamingFeedbackScanner, extract_feedback_and_score
+from model_router import TASK_CONTINUE, TASK_START, TASK_SUMMARIZE, IncompleteAnswer, model_router
+from batch_ingest import BatchIngestor, iter_zip_entries
+from session_store import SESSION_STORE_BACKEND, SessionConflictError, create_session_store
+from health import create_health_monitor
+import metrics
+from analytics import get_rollup_buckets, normalize_skills, record_interview, summarize_buckets
+from parse_cache import ParseCache, hash_stream, make_cache_key, prompt_fingerprint
+from opening_cache import OPENING_JOIN_WAIT_SECONDS, OPENING_PREWARM_ENABLED, OpeningCache
+from upload_guards import MAX_BATCH_REQUEST_BYTES, MAX_UPLOAD_REQUEST_BYTES, UploadRejected, check_resume_upload, spooled_file_stream
+from near_duplicates import NEAR_DUP_ENABLED, SIMHASH_BITS, NearDuplicateIndex, find_near_duplicate, fingerprint_text
+from resume_parser import (
+    EMPTY_RESUME,
+    MAX_RESUME_TEXT_LENGTH,
+    RESUME_PARSE_MODEL,
+    RESUME_PARSE_PROMPT_VERSION,
+    SUPPORTED_RESUME_EXTENSIONS,
+    build_resume_document,
+    parse_resume_text,
+    update_parsed_resume,
+)
 from database import (
     initialize_database, # Import the main initializer
     save_interview,
@@ -82,20 +107,60 @@ from database import (
     get_user_resumes, # Added for potential future use
     create_user,
     get_user_by_email,
+    get_cached_parse,
+    save_resumes_bulk,
+    get_resume,
+    get_resumes_by_ids,
+    iter_resume_fingerprints,
+    write_buffer,
+    flush_writes,
+    close_db_connection,
+    InvalidCursorError,
+    HISTORY_PAGE_DEFAULT,
+    get_history_page,
+    iter_history,
+    is_connected,
+    connect_db,
     # DO NOT import client, db, or collections directly here
 )
+_phase_started = record_startup_phase("imports", _phase_started)
 
-# Load environment variables from .env file
-load_dotenv()
-
-# Setup logging
-logging.basicConfig(level=logging.DEBUG, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
-logger = logging.getLogger(__name__)
 
 # Initialize Flask app
+class SpooledRequest(Request):
+    """Spools uploaded files to a temp file past UPLOAD_SPOOL_THRESHOLD_BYTES instead of holding them in RAM."""
+
+    def _get_file_stream(self, total_content_length, content_type, filename=None, content_length=None):
+        return spooled_file_stream(total_content_length, content_type, filename, content_length)
+
+
 app = Flask(__name__)
+app.request_class = SpooledRequest
+app.config['MAX_CONTENT_LENGTH'] = MAX_UPLOAD_REQUEST_BYTES # Larger bodies get 413 before they're read
 CORS(app) # Enable CORS for all routes
 
+# --- Request latency metrics ---
+HTTP_REQUEST_SECONDS = metrics.REGISTRY.histogram(
+    "resumep_http_request_duration_seconds",
+    "Time to produce a response, by route template (streamed bodies excluded).",
+    ("method", "route", "status")
+)
+
+
+@app.before_request
+def start_request_timer():
+    g.request_started = time.perf_counter()
+
+
+@app.after_request
+def observe_request_latency(response):
+    started = g.pop('request_started', None)
+    if started is not None:
+        # Label by route template, not the raw path, to keep series bounded
+        route = request.url_rule.rule if request.url_rule else "unmatched"
+        HTTP_REQUEST_SECONDS.labels(request.method, route, str(response.status_code)).observe(time.perf_counter() - started)
+    return response
+
 # --- Load Groq API key ---
 GROQ_API_KEY = os.getenv("GROQ_API_KEY")
 if not GROQ_API_KEY:
@@ -105,17 +170,27 @@ if not GROQ_API_KEY:
     # For now, we raise ValueError to prevent startup without the key
     raise ValueError("Missing GROQ_API_KEY in environment variables.")
 
-try:
-    groq_client = groq.Groq(api_key=GROQ_API_KEY)
-    logger.info("Groq client initialized successfully.")
-except Exception as e:
-    logger.error(f"Failed to initialize Groq client: {e}", exc_info=True)
-    raise
+# All Groq calls go through the pooled, concurrency-limited gateway (built on first use)
+llm_gateway = LazyGateway()
+
+# --- Resume parse cache ---
+# Duplicate uploads are answered from here instead of re-running extraction and the LLM call
+parse_cache = ParseCache(persistent_get=get_cached_parse)
+
+# --- Near-duplicate resume index ---
+# Near-identical uploads (same lines in a new file, or a few edited lines) reuse or patch
+# an earlier parsedData; loaded from the resumes collection and refreshed in the background
+near_duplicate_index = NearDuplicateIndex(load=iter_resume_fingerprints)
+NEAR_DUPLICATE_OUTCOMES = metrics.REGISTRY.counter(
+    "resumep_near_duplicate_total",
+    "Resume parses by near-duplicate outcome (reused, patched, parsed).",
+    ("outcome",)
+)
 
-# --- In-memory storage for active interview states ---
-# Note: This will be lost if the server restarts.
-# For production, consider using a persistent store like Redis or the database itself.
-interviews: dict[str, dict] = {}
+# --- Prewarmed interview openings ---
+# The greeting + first question is generated in the background as soon as a resume is
+# parsed; /start-interview takes it from here instead of waiting on the LLM
+opening_cache = OpeningCache()
 
 # === Helper Functions ===
 
@@ -123,15 +198,14 @@ def get_utc_now():
     """Returns the current UTC datetime."""
     return datetime.now(timezone.utc)
 
-def extract_text_from_pdf(file_storage):
-    """Extracts text from a PDF file stream."""
+def extract_text_from_pdf(file_storage, max_chars=None):
+    """Extracts text from a PDF file stream, stopping once max_chars have been collected."""
     try:
-        reader = PdfReader(file_storage)
-        text = ""
-        for page in reader.pages:
-            page_text = page.extract_text()
-            if page_text:
-                text += page_text + "\n" # Add newline between pages
+        with metrics.time_stage("extraction", "pdf"):
+            result = extract_pdf_text(file_storage.read(), max_chars=max_chars, filename=file_storage.filename)
+        text = result.text
+        if result.truncated:
+            logger.info(f"Stopped PDF extraction for {file_storage.filename} after {result.pages_extracted}/{result.page_count} pages (text limit reached).")
         if not text.strip():
             logger.warning(f"No text could be extracted from PDF: {file_storage.filename}")
         return text
@@ -139,11 +213,14 @@ def extract_text_from_pdf(file_storage):
         logger.error(f"Error parsing PDF file {file_storage.filename}: {e}", exc_info=True)
         raise ValueError(f"Could not process PDF file: {e}") # Re-raise as ValueError
 
-def extract_text_from_docx(file_storage):
-    """Extracts text from a DOCX file stream."""
+def extract_text_from_docx(file_storage, max_chars=None):
+    """Extracts text from a DOCX file stream, including tables, text boxes and headers/footers."""
     try:
-        doc = Document(file_storage)
-        text = "\n".join(para.text for para in doc.paragraphs if para.text.strip())
+        with metrics.time_stage("extraction", "docx"):
+            result = extract_docx_text(file_storage.stream, max_chars=max_chars, filename=file_storage.filename)
+        text = result.text
+        if result.truncated:
+            logger.info(f"Stopped DOCX extraction for {file_storage.filename} (text limit reached).")
         if not text.strip():
             logger.warning(f"No text could be extracted from DOCX: {file_storage.filename}")
         return text
@@ -151,36 +228,320 @@ def extract_text_from_docx(file_storage):
         logger.error(f"Error parsing DOCX file {file_storage.filename}: {e}", exc_info=True)
         raise ValueError(f"Could not process DOCX file: {e}") # Re-raise as ValueError
 
-def parse_llm_json_response(llm_content: str, filename: str = "N/A") -> dict:
-    """Attempts to parse JSON from LLM output, handling common formatting issues."""
+# --- Interview helpers (shared by the JSON and streaming routes) ---
+
+MAX_INTERVIEW_MESSAGES = 15 # End after ~7 questions (1 initial + 7 user + 7 AI = 15 messages)
+
+# Keeps prompt size bounded: last N turns verbatim + a rolling summary of older ones
+context_window = ContextWindow(summarize=make_llm_summarizer(llm_gateway.complete, model_router.primary_model(TASK_SUMMARIZE)))
+
+
+def routed_interview_completion(task, messages, temperature, label):
+    """
+    Gets an interviewer reply along the task's model route. A non-final tier's reply is
+    escalated when it is empty or, for follow-up turns, carries no '**Score:** N/10'.
+    """
+    def attempt(model, final):
+        chat_completion = llm_gateway.complete(model=model, messages=messages, temperature=temperature)
+        content = chat_completion.choices[0].message.content or ""
+        if not final:
+            if not content.strip():
+                raise IncompleteAnswer("empty reply")
+            if task == TASK_CONTINUE and not SCORE_PATTERN.search(content):
+                raise IncompleteAnswer("no score in reply")
+        return chat_completion
+    return model_router.run(task, attempt, label)
+
+
+def build_interview_system_prompt(resume_data: dict) -> tuple[str, str]:
+    """Builds the interviewer system prompt from parsed resume data. Returns (system_prompt, candidate_name)."""
+    candidate_name = resume_data.get('name', 'the candidate')
+    skills_list = resume_data.get('skills', [])
+    experience_list = resume_data.get('experience', []) # List of job objects
+    projects_list = resume_data.get('projects', []) # List of project objects
+
+    # Create a concise summary for the prompt
+    skills_summary = ', '.join(skills_list[:10]) + ('...' if len(skills_list) > 10 else '') if skills_list else 'Not specified'
+    experience_summary = f"{len(experience_list)} positions mentioned"
+    projects_summary = f"{len(projects_list)} projects mentioned"
+
+    system_prompt = f"""
+        **Role:** You are 'AI Interviewer', a friendly yet professional senior technical interviewer.
+        **Candidate:** {candidate_name}
+        **Candidate Profile Summary:**
+        - Key Skills: {skills_summary}
+        - Experience: {experience_summary}
+        - Projects: {projects_summary}
+
+        **Interview Protocol:**
+        1.  **Begin:** Start with a brief, professional introduction and ask your first question immediately.
+        2.  **Questioning:** Ask around 5-7 insightful questions covering:
+            -   Technical skills (related to the profile summary).
+            -   Problem-solving approaches.
+            -   Specific experiences or projects from their resume (if details were provided).
+            -   Behavioral scenarios (e.g., teamwork, handling challenges).
+        3.  **Interaction:** After *each* candidate answer:
+            -   Provide brief, constructive feedback (1-2 sentences).
+            -   Provide a numerical score for their answer (1-10).
+            -   **Format:** Respond *only* in this format: `[Your next question or follow-up]\n\n**Feedback:** [Your feedback text]. **Score:** [Number]/10`
+        4.  **Adapt:** Ask relevant follow-up questions based on their responses.
+        5.  **Conclude:** After sufficient questions (~5-7), politely conclude the interview.
+
+        **Tone:** Maintain a positive, encouraging, and professional tone throughout.
+
+        **Action:** Start the interview now by introducing yourself briefly and asking the first relevant question based on the candidate's profile.
+        """
+    return system_prompt, candidate_name
+
+
+def start_interview_messages(system_prompt: str) -> list[dict]:
+    """Returns the messages that ask the LLM for the greeting and first question."""
+    return [
+        {"role": "system", "content": system_prompt},
+        {"role": "user", "content": "Start the interview now."} # Simple trigger
+    ]
+
+
+def opening_cache_key(system_prompt: str) -> str:
+    """Fingerprint of everything the opening depends on: the system prompt and the start route."""
+    return prompt_fingerprint(system_prompt, ",".join(model_router.models(TASK_START)))
+
+
+def generate_opening(system_prompt: str, label: str = "prewarm") -> str:
+    """Asks the LLM for the interview greeting and first question."""
+    chat_completion = routed_interview_completion(
+        TASK_START,
+        start_interview_messages(system_prompt),
+        0.7, # Moderate temperature for variability in questions
+        label
+    )
+    return chat_completion.choices[0].message.content
+
+
+def prewarm_interview_opening(resume_data: dict):
+    """Starts generating the opening for a just-parsed resume (never raises)."""
+    if not OPENING_PREWARM_ENABLED or not any(resume_data.get(key) for key in ('name', 'skills', 'experience', 'projects')):
+        return
     try:
-        # Attempt direct parsing first (ideal case, especially with JSON mode)
-        return json.loads(llm_content)
-    except json.JSONDecodeError:
-        logger.warning(f"Direct JSON parsing failed for response related to {filename}. Trying cleanup...")
-        # Fallback: Clean common markdown code fences and retry
-        cleaned = re.sub(r"^```(?:json)?\s*|\s*```$", "", llm_content.strip(), flags=re.MULTILINE | re.DOTALL)
-        # Fallback: Find the first '{' and last '}' - use with caution
-        start = cleaned.find('{')
-        end = cleaned.rfind('}')
-        if start != -1 and end != -1 and end > start:
-            json_like_part = cleaned[start:end+1]
-            try:
-                return json.loads(json_like_part)
-            except json.JSONDecodeError as e_fallback:
-                logger.error(f"JSON parsing failed even after cleanup for {filename}. Error: {e_fallback}. Cleaned content: {json_like_part[:500]}...") # Log snippet
-                raise ValueError("Failed to parse JSON data from LLM response.")
+        system_prompt, _ = build_interview_system_prompt(resume_data)
+        opening_cache.prewarm(opening_cache_key(system_prompt), lambda: generate_opening(system_prompt))
+    except Exception as e:
+        logger.warning(f"Could not prewarm the interview opening: {e}")
+
+
+def create_interview_state(interview_id, user_id, candidate_name, system_prompt, initial_message, skills=None):
+    """Stores the initial state of a new interview in the session store."""
+    session_store.create(interview_id, {
+        'userId': user_id, # Store the user ID
+        'userName': candidate_name, # Store the candidate name
+        'skills': normalize_skills(skills), # Resume skills, used as analytics keys
+        'status': 'in_progress',
+        'system_prompt': system_prompt, # Store for context in subsequent calls
+        'conversation_history': [
+            {"role": "assistant", "content": initial_message, "timestamp": get_utc_now()}
+        ],
+        'scores': [], # To store numerical scores extracted from AI responses
+        'startTime': get_utc_now()
+    })
+    logger.info(f"Started interview {interview_id} for user {user_id} ({candidate_name}).")
+
+
+def begin_interview_turn(data):
+    """
+    Validates a continue request, loads the session and appends the user's answer
+    to the (local copy of the) history. Nothing is stored until the turn completes.
+    Returns (interview_id, interview_state, messages_for_api, None) on success,
+    or (interview_id, None, None, (error_body, status_code)) on failure.
+    """
+    if not data:
+        logger.warning("'/continue-interview' request missing JSON body.")
+        return None, None, None, ({"error": "Request body must be valid JSON."}, 400)
+
+    interview_id = data.get('interviewId')
+    user_response = data.get('userResponse')
+
+    interview_state = session_store.get(interview_id) if interview_id else None
+    if not interview_state:
+        logger.warning(f"'/continue-interview' request for invalid/unknown interview ID: {interview_id}")
+        return interview_id, None, None, ({"error": "Interview not found or invalid ID."}, 404)
+    if not user_response:
+        logger.warning(f"'/continue-interview' request for {interview_id} missing 'userResponse'.")
+        return interview_id, None, None, ({"error": "userResponse is required."}, 400)
+
+    if interview_state['status'] != 'in_progress':
+        logger.warning(f"Attempt to continue interview {interview_id} which has status: {interview_state['status']}")
+        return interview_id, None, None, ({"error": f"Interview cannot be continued, status is: {interview_state['status']}"}, 400)
+
+    # Append user response to history
+    interview_state['conversation_history'].append({
+        "role": "user",
+        "content": user_response,
+        "timestamp": get_utc_now()
+    })
+
+    # Prepare messages for Groq (system prompt + rolling summary + recent turns, within the token budget)
+    context_state = interview_state.setdefault('context', {})
+    messages_for_api, context_state['estimated_prompt_tokens'] = context_window.build(
+        interview_state['system_prompt'], interview_state['conversation_history'], context_state
+    )
+
+    return interview_id, interview_state, messages_for_api, None
+
+
+def complete_interview_turn(interview_id, interview_state, ai_response_content, prompt_tokens=None):
+    """
+    Records the AI reply for a turn: extracts feedback/score, appends the reply to the
+    history, applies the end condition and saves the session. Returns the JSON-ready
+    response body. Raises SessionConflictError if the session changed meanwhile.
+    `prompt_tokens` is the provider-reported count; the local estimate is used without it.
+    """
+    context_state = interview_state.setdefault('context', {})
+    prompt_tokens = prompt_tokens or context_state.get('estimated_prompt_tokens')
+    interview_state.setdefault('prompt_token_counts', []).append(prompt_tokens)
+
+    feedback, score = extract_feedback_and_score(ai_response_content, interview_id)
+    if score is not None:
+        interview_state['scores'].append(score) # Store the valid score
+
+    # Append AI response to history (store raw response and extracted score)
+    interview_state['conversation_history'].append({
+        "role": "assistant",
+        "content": ai_response_content, # Store the full raw response
+        "timestamp": get_utc_now(),
+        "score_extracted": score # Store the extracted score (or None)
+    })
+
+    # --- Check for Interview End Condition ---
+    if len(interview_state['conversation_history']) >= MAX_INTERVIEW_MESSAGES:
+        interview_state['status'] = 'ending' # Signal to frontend
+        ai_response_content += "\n\nOkay, I believe that covers the main areas I wanted to discuss. Thank you for answering my questions." # Append concluding remark
+        logger.info(f"Interview {interview_id} reached message limit ({MAX_INTERVIEW_MESSAGES}), signaling end.")
+
+    session_store.save(interview_id, interview_state)
+
+    return {
+        "interviewStatus": interview_state['status'], # Let frontend know if it should prepare to end
+        "message": ai_response_content, # Full AI response including question/feedback/score
+        "feedback": feedback, # Extracted feedback text
+        "score": score, # Extracted numerical score
+        "promptTokens": prompt_tokens # Prompt size of this turn (stays bounded over long interviews)
+    }
+
+
+def build_interview_document(interview_id, interview_state, user_object_id, status):
+    """Builds the interviews-collection document (final score, Q&A pairs, history) from session state."""
+    # --- Calculate final score ---
+    final_score = None
+    if interview_state.get('scores'):
+        valid_scores = [s for s in interview_state['scores'] if isinstance(s, (int, float))]
+        if valid_scores:
+            final_score = round(sum(valid_scores) / len(valid_scores))
+            logger.info(f"Calculated final score for interview {interview_id}: {final_score}")
         else:
-             logger.error(f"Could not find valid JSON structure after cleanup for {filename}. Cleaned content: {cleaned[:500]}...")
-             raise ValueError("Could not find valid JSON structure in LLM response.")
+            logger.warning(f"No valid scores found for interview {interview_id} to calculate final score.")
+    else:
+        logger.warning(f"Score list empty for interview {interview_id}. Cannot calculate final score.")
+
+
+    # --- Process history for Database ---
+    conversation_history_db = []
+    qa_pairs = []
+    current_question_info = None
+
+    for msg in interview_state['conversation_history']:
+        # Map roles for DB consistency ('assistant' -> 'interviewer')
+        msg_type = 'interviewer' if msg['role'] == 'assistant' else 'user'
+        db_entry = {
+            'type': msg_type,
+            'content': msg['content'],
+            'timestamp': msg.get('timestamp', get_utc_now()),
+            'score': msg.get('score_extracted') # Include score extracted during conversation
+        }
+        conversation_history_db.append(db_entry)
+
+        # Attempt to structure Q&A pairs
+        if msg_type == 'interviewer':
+            # If a previous question was pending an answer, finalize it (maybe as unanswered)
+            if current_question_info and 'answer' not in current_question_info:
+                logger.warning(f"Interview {interview_id}: Found unanswered interviewer message before the next.")
+                current_question_info['answer'] = "[No specific user answer recorded before next question]"
+                qa_pairs.append(current_question_info)
+
+            # Start a new potential Q&A pair
+            current_question_info = {
+                'question': msg['content'],
+                'answer': None, # Placeholder for the user's answer
+                'score': msg.get('score_extracted'), # Score associated with the *question's* feedback
+                'timestamp': msg.get('timestamp', get_utc_now())
+            }
+        elif msg_type == 'user' and current_question_info:
+            # Assign the user's message as the answer to the pending question
+            current_question_info['answer'] = msg['content']
+            qa_pairs.append(current_question_info)
+            current_question_info = None # Reset, waiting for the next question
+
+    # Handle case where the last message was a question without a final user answer
+    if current_question_info and 'answer' not in current_question_info:
+         current_question_info['answer'] = "[Interview ended before answer]"
+         qa_pairs.append(current_question_info)
+         logger.info(f"Interview {interview_id}: Last message was a question, marked as ended before answer.")
+
+    return {
+        'interviewId': interview_id, # Use the string UUID as the primary identifier maybe? Or use DB ObjectId? Check schema.
+        'userId': user_object_id, # Reference to the user document
+        'userName': interview_state.get('userName', 'Unknown Candidate'),
+        'date': interview_state.get('startTime', get_utc_now()), # Use start time if available
+        'endDate': get_utc_now(), # Add end time
+        'finalScore': final_score,
+        'status': status,
+        'skills': interview_state.get('skills', []),
+        'questions': qa_pairs, # Structured Q&A
+        'conversationHistory': conversation_history_db # Full history for reference
+    }
+
+
+# --- Storage for active interview states ---
+
+PERSIST_ABANDONED_INTERVIEWS = os.getenv("PERSIST_ABANDONED_INTERVIEWS", "True").lower() == "true"
+
+
+def persist_abandoned_interview(interview_id, interview_state, reason):
+    """Eviction callback: saves an idle/spilled session as an 'abandoned' interview."""
+    logger.info(f"Interview {interview_id} evicted from the session store ({reason}).")
+    user_id = interview_state.get('userId')
+    if not PERSIST_ABANDONED_INTERVIEWS or not user_id or not ObjectId.is_valid(user_id):
+        return
+    status = 'interrupted' if reason == 'shutdown' else 'abandoned' # Server stopped vs. candidate went away
+    interview_data = build_interview_document(interview_id, interview_state, ObjectId(user_id), status)
+    save_interview(interview_data)
+    record_interview(interview_data)
+    logger.info(f"Saved {status} interview {interview_id} for user {user_id}.")
+
+
+# SESSION_STORE=memory keeps sessions in this process (single worker only), bounded by an
+# idle TTL and entry/byte caps; SESSION_STORE=redis shares them across workers/nodes.
+session_store = create_session_store(on_evict=persist_abandoned_interview)
+
+# Background dependency probes; the health endpoints only read their cached results.
+# The in-process session store can't fail independently, so it only counts for readiness with Redis.
+health_monitor = create_health_monitor(session_store, session_store_critical=SESSION_STORE_BACKEND == "redis")
 
 # === API Routes ===
 
+@app.errorhandler(413)
+def request_too_large(error):
+    """Request bodies over MAX_CONTENT_LENGTH (or the batch limit) are refused before being read."""
+    limit = request.max_content_length
+    logger.warning(f"Rejected {request.method} {request.path}: body larger than {limit} bytes.")
+    return jsonify({"error": f"Upload too large (limit {limit} bytes)."}), 413
+
+
 @app.route('/parse-resume', methods=['POST'])
 def parse_resume():
     """
     Parses an uploaded resume file (PDF or DOCX) using Groq LLM
     and returns structured data (name, skills, experience, projects).
+    Identical uploads are served from the parse cache without an LLM call.
     """
     if 'resume' not in request.files:
         logger.warning("'/parse-resume' request missing 'resume' file part.")
@@ -197,84 +558,200 @@ def parse_resume():
     resume_text = ""
 
     try:
-        if filename_lower.endswith('.pdf'):
-            resume_text = extract_text_from_pdf(resume_file)
-        elif filename_lower.endswith(('.docx')): # Allow .docx
-            resume_text = extract_text_from_docx(resume_file)
-        else:
+        if not filename_lower.endswith(SUPPORTED_RESUME_EXTENSIONS):
             logger.warning(f"Unsupported file type received: {filename}")
             return jsonify({"error": "Unsupported file type. Only PDF and DOCX are allowed."}), 400
 
-        if not resume_text or not resume_text.strip():
-             logger.warning(f"Resume '{filename}' resulted in empty text after extraction.")
-             # Return an empty structure consistent with successful parsing
-             return jsonify({"name": "", "skills": [], "experience": [], "projects": []})
-
-        # Truncate if necessary (adjust length as needed)
-        max_text_length = 25000 # Increased limit slightly
-        if len(resume_text) > max_text_length:
-            logger.warning(f"Resume text for '{filename}' truncated to {max_text_length} characters.")
-            resume_text = resume_text[:max_text_length]
+        # --- Size, page-count and zip-directory guards (metadata only, before any parsing) ---
+        check_resume_upload(filename, resume_file.stream)
 
-        # Prepare prompt for LLM
-        prompt = f"""
-        **Task:** Extract key information from the following resume text.
-        **Output Format:** Return ONLY a valid JSON object with these exact keys: "name" (string), "skills" (list of strings), "experience" (list of objects, each representing a job), and "projects" (list of objects, each representing a project). If information for a key isn't found, use an empty string or empty list as appropriate.
+        # --- Content-addressed cache lookup (before any extraction or LLM work) ---
+        content_hash = hash_stream(resume_file.stream) # Leaves the stream rewound for the extractors
+        cache_key = make_cache_key(content_hash, RESUME_PARSE_PROMPT_VERSION, RESUME_PARSE_MODEL)
+        cached_data, cache_tier = parse_cache.get(cache_key)
+        if cached_data is not None:
+            logger.info(f"Parse cache hit ({cache_tier}) for resume: {filename}")
+            prewarm_interview_opening(cached_data)
+            response = jsonify(cached_data)
+            response.headers['X-Parse-Cache'] = f"hit-{cache_tier}"
+            return response
 
-        **Resume Text:**
-        ```
-        {resume_text}
-        ```
-
-        **JSON Output:**
-        """
-
-        # Call Groq API
-        logger.debug(f"Sending resume text for '{filename}' to Groq API for parsing.")
-        chat_completion = groq_client.chat.completions.create(
-            model="llama3-70b-8192", # Or consider llama3-8b-8192 for faster, possibly less accurate results
-            messages=[
-                {"role": "system", "content": "You are an expert resume parser. Your sole task is to extract information and return it as a valid JSON object according to the user's specified format. Respond ONLY with the JSON object."},
-                {"role": "user", "content": prompt}
-            ],
-            temperature=0.1, # Very low temperature for deterministic extraction
-            response_format={"type": "json_object"} # Use JSON mode
-        )
+        if filename_lower.endswith('.pdf'):
+            resume_text = extract_text_from_pdf(resume_file, max_chars=MAX_RESUME_TEXT_LENGTH)
+        else: # .docx
+            resume_text = extract_text_from_docx(resume_file, max_chars=MAX_RESUME_TEXT_LENGTH)
 
-        llm_content = chat_completion.choices[0].message.content
-        logger.debug(f"Received Groq API response for '{filename}'.")
+        if not resume_text or not resume_text.strip():
+             logger.warning(f"Resume '{filename}' resulted in empty text after extraction.")
+             # Return an empty structure consistent with successful parsing
+             return jsonify(dict(EMPTY_RESUME))
 
-        # Parse the JSON response
-        parsed_data = parse_llm_json_response(llm_content, filename)
+        # Send the text to the LLM and parse its JSON answer (or reuse a near-duplicate's)
+        fingerprint = fingerprint_text(resume_text) if NEAR_DUP_ENABLED else None
+        parsed_data, near_duplicate = parse_with_near_duplicates(resume_text, fingerprint, filename)
 
-        # Optional: Basic validation of the parsed structure
-        required_keys = {"name", "skills", "experience", "projects"}
-        if not required_keys.issubset(parsed_data.keys()):
-            logger.warning(f"Parsed data for '{filename}' is missing required keys. Found: {parsed_data.keys()}")
-            # Decide how to handle - return error or fill missing keys? Filling is safer.
-            for key in required_keys:
-                if key not in parsed_data:
-                    parsed_data[key] = [] if key in ["skills", "experience", "projects"] else ""
+        # --- Populate the cache tiers ---
+        parse_cache.put(cache_key, parsed_data)
+        user_id = request.form.get('userId') # Optional; the persistent tier needs an owning user
+        if user_id and ObjectId.is_valid(user_id):
+            try:
+                resume_doc = build_resume_document(ObjectId(user_id), filename, content_hash, cache_key, parsed_data, get_utc_now(), fingerprint)
+                save_resume(resume_doc)
+                if fingerprint is not None:
+                    near_duplicate_index.add(resume_doc['_id'], resume_doc['simhash'])
+            except Exception as db_err:
+                # The parse itself succeeded; a failed write only costs a future cache miss
+                logger.error(f"Failed to persist parsed resume '{filename}' for user {user_id}: {db_err}")
 
         logger.info(f"Successfully parsed resume: {filename}")
-        return jsonify(parsed_data)
-
+        prewarm_interview_opening(parsed_data) # The candidate usually starts the interview next
+        response = jsonify(parsed_data)
+        response.headers['X-Parse-Cache'] = "miss"
+        if near_duplicate:
+            response.headers['X-Near-Duplicate'] = f"{near_duplicate['mode']}; resume={near_duplicate['resumeId']}; distance={near_duplicate['distance']}"
+        return response
+
+    except UploadRejected as rejected:
+        logger.warning(f"Rejected resume upload {filename}: {rejected}")
+        return jsonify({'error': str(rejected)}), rejected.status_code
     except ValueError as ve: # Catch specific ValueErrors raised by helpers or parser
          logger.error(f"Value error during resume parsing for {filename}: {ve}")
          return jsonify({'error': str(ve)}), 400 # Return specific error message
+    except GatewayBusyError as busy:
+        logger.warning(f"LLM gateway busy while parsing {filename}: {busy}")
+        return jsonify({'error': 'The server is busy, please try again shortly.'}), 503
     except Exception as e:
         logger.error(f"Unexpected error during /parse-resume for {filename}: {e}\n{traceback.format_exc()}")
         return jsonify({'error': 'An unexpected error occurred during resume parsing.'}), 500
 
 
+def parse_with_near_duplicates(resume_text, fingerprint, filename):
+    """
+    Parses extracted resume text. If an indexed resume is a near-duplicate, its parsedData
+    is reused (same lines) or patched with only the changed lines; otherwise the full text
+    goes to the LLM. Returns (parsed_data, near-duplicate info dict or None).
+    """
+    match = None
+    if fingerprint is not None:
+        try:
+            match = find_near_duplicate(fingerprint, near_duplicate_index,
+                                        lambda resume_id: get_resume(resume_id, {'parsedData': 1, 'lineHashes': 1}))
+        except Exception as e:
+            # The index is an optimization; fall back to a full parse
+            logger.warning(f"Near-duplicate lookup failed for '{filename}': {e}")
+    if match is not None and match.identical_lines:
+        logger.info(f"Resume '{filename}' has the same lines as resume {match.resume_id}; reusing its parsed data.")
+        NEAR_DUPLICATE_OUTCOMES.labels("reused").inc()
+        return copy.deepcopy(match.parsed_data), match.info("reused")
+    if match is not None and match.patchable:
+        try:
+            parsed_data = update_parsed_resume(match.parsed_data, match.added_lines, match.removed_count, llm_gateway.complete,
+                                               filename, resume_text)
+            logger.info(f"Patched resume '{filename}' from near-duplicate {match.resume_id} ({len(match.added_lines)} new lines).")
+            NEAR_DUPLICATE_OUTCOMES.labels("patched").inc()
+            return parsed_data, match.info("patched")
+        except ValueError as e:
+            logger.warning(f"Patching '{filename}' from near-duplicate {match.resume_id} failed ({e}); parsing in full.")
+    NEAR_DUPLICATE_OUTCOMES.labels("parsed").inc()
+    return parse_resume_text(resume_text, llm_gateway.complete, filename), None
+
+
+@app.route('/resumes/<resume_id>/near-duplicates', methods=['GET'])
+def resume_near_duplicates(resume_id):
+    """
+    Recruiter lookup: resumes whose text is nearly identical to this one, closest first.
+    Query params: maxDistance (SimHash bits out of 64, capped at the index maximum), limit.
+    """
+    try:
+        max_distance = int(request.args.get('maxDistance', near_duplicate_index.max_distance))
+        limit = min(max(int(request.args.get('limit', 20)), 1), 100)
+    except ValueError:
+        return jsonify({"error": "maxDistance and limit must be integers."}), 400
+
+    try:
+        resume_doc = get_resume(resume_id, {'simhash': 1})
+        if resume_doc is None:
+            return jsonify({"error": "Resume not found."}), 404
+        if 'simhash' not in resume_doc:
+            return jsonify({"error": "Resume has no text fingerprint (uploaded before near-duplicate indexing)."}), 404
+        matches = near_duplicate_index.query(resume_doc['simhash'], max_distance, limit, exclude=resume_doc['_id'])
+        details = get_resumes_by_ids([match_id for match_id, _ in matches],
+                                     {'fileName': 1, 'userId': 1, 'uploadedAt': 1, 'parsedData.name': 1})
+    except Exception as e:
+        logger.error(f"Error looking up near-duplicates of resume {resume_id}: {e}")
+        return jsonify({"error": "Failed to look up near-duplicates."}), 500
+
+    results = []
+    for match_id, distance in matches:
+        doc = details.get(match_id)
+        if doc is None:
+            continue
+        results.append({
+            "resumeId": str(match_id),
+            "distance": distance,
+            "similarity": round(1 - distance / SIMHASH_BITS, 4),
+            "fileName": doc.get('fileName'),
+            "userId": str(doc['userId']) if doc.get('userId') else None,
+            "candidateName": (doc.get('parsedData') or {}).get('name'),
+            "uploadedAt": doc['uploadedAt'].isoformat() if doc.get('uploadedAt') else None,
+        })
+    return jsonify({"resumeId": resume_id, "maxDistance": min(max_distance, near_duplicate_index.max_distance), "matches": results})
+
+
+@app.route('/parse-resumes/batch', methods=['POST'])
+def parse_resumes_batch():
+    """
+    Parses many resumes in one request: a multipart list of PDF/DOCX files in the
+    'resumes' field, and/or zip archives of them. Results are streamed back as NDJSON
+    (one line per file, then a summary line). With a 'userId' form field the parsed
+    resumes are bulk-inserted into the resumes collection.
+    """
+    request.max_content_length = MAX_BATCH_REQUEST_BYTES # Must be set before the form is parsed
+    uploads = request.files.getlist('resumes')
+    if not uploads:
+        logger.warning("'/parse-resumes/batch' request without files in the 'resumes' form field.")
+        return jsonify({"error": "No resume files provided in the 'resumes' form field."}), 400
+
+    user_id = request.form.get('userId')
+    if user_id and not ObjectId.is_valid(user_id):
+        return jsonify({"error": "Invalid userId."}), 400
+
+    def iter_uploads():
+        for upload in uploads:
+            filename = upload.filename or ""
+            if filename.lower().endswith('.zip'):
+                yield from iter_zip_entries(upload.stream)
+            else:
+                yield filename, upload.stream # Size/shape-checked by the ingestor before it is read
+
+    ingestor = BatchIngestor(
+        llm_gateway.complete,
+        parse_cache=parse_cache,
+        save_many=save_resumes_bulk,
+        user_object_id=ObjectId(user_id) if user_id else None
+    )
+
+    def generate():
+        try:
+            for result in ingestor.run(iter_uploads()):
+                yield json.dumps(result, default=str) + "\n"
+        except UploadRejected as rejected:
+            logger.warning(f"Rejected batch upload: {rejected}")
+            yield json.dumps({"error": str(rejected)}) + "\n"
+        except Exception as e:
+            logger.error(f"Error during /parse-resumes/batch: {e}\n{traceback.format_exc()}")
+            yield json.dumps({"error": "Batch processing failed due to an internal error."}) + "\n"
+
+    logger.info(f"Starting batch parse of {len(uploads)} uploaded files (user {user_id}).")
+    return Response(stream_with_context(generate()), mimetype='application/x-ndjson')
+
+
 @app.route('/start-interview', methods=['POST'])
 def start_interview():
     """
     Starts a new interview based on parsed resume data.
     Initializes interview state and gets the first question from the LLM.
     """
-    global interviews # Access the global in-memory dictionary
-
     try:
         data = request.get_json()
         if not data:
@@ -293,76 +770,29 @@ def start_interview():
         interview_id = str(uuid.uuid4()) # Generate a unique ID for this interview session
 
         # Prepare context for the interviewer LLM
-        candidate_name = resume_data.get('name', 'the candidate')
-        skills_list = resume_data.get('skills', [])
-        experience_list = resume_data.get('experience', []) # List of job objects
-        projects_list = resume_data.get('projects', []) # List of project objects
-
-        # Create a concise summary for the prompt
-        skills_summary = ', '.join(skills_list[:10]) + ('...' if len(skills_list) > 10 else '') if skills_list else 'Not specified'
-        experience_summary = f"{len(experience_list)} positions mentioned"
-        projects_summary = f"{len(projects_list)} projects mentioned"
-
-        system_prompt = f"""
-        **Role:** You are 'AI Interviewer', a friendly yet professional senior technical interviewer.
-        **Candidate:** {candidate_name}
-        **Candidate Profile Summary:**
-        - Key Skills: {skills_summary}
-        - Experience: {experience_summary}
-        - Projects: {projects_summary}
+        system_prompt, candidate_name = build_interview_system_prompt(resume_data)
 
-        **Interview Protocol:**
-        1.  **Begin:** Start with a brief, professional introduction and ask your first question immediately.
-        2.  **Questioning:** Ask around 5-7 insightful questions covering:
-            -   Technical skills (related to the profile summary).
-            -   Problem-solving approaches.
-            -   Specific experiences or projects from their resume (if details were provided).
-            -   Behavioral scenarios (e.g., teamwork, handling challenges).
-        3.  **Interaction:** After *each* candidate answer:
-            -   Provide brief, constructive feedback (1-2 sentences).
-            -   Provide a numerical score for their answer (1-10).
-            -   **Format:** Respond *only* in this format: `[Your next question or follow-up]\n\n**Feedback:** [Your feedback text]. **Score:** [Number]/10`
-        4.  **Adapt:** Ask relevant follow-up questions based on their responses.
-        5.  **Conclude:** After sufficient questions (~5-7), politely conclude the interview.
+        # Use the opening prewarmed when the resume was parsed (or wait for it if still generating)
+        initial_message, opening_source = opening_cache.take(opening_cache_key(system_prompt), OPENING_JOIN_WAIT_SECONDS)
+        if initial_message is None:
+            # Call Groq API to get the initial greeting and first question
+            logger.debug(f"Starting interview {interview_id}. Sending initial prompt to Groq.")
+            initial_message = generate_opening(system_prompt, interview_id)
 
-        **Tone:** Maintain a positive, encouraging, and professional tone throughout.
+        # Store initial state in the session store
+        create_interview_state(interview_id, user_id, candidate_name, system_prompt, initial_message, resume_data.get('skills'))
 
-        **Action:** Start the interview now by introducing yourself briefly and asking the first relevant question based on the candidate's profile.
-        """
-
-        # Call Groq API to get the initial greeting and first question
-        logger.debug(f"Starting interview {interview_id}. Sending initial prompt to Groq.")
-        chat_completion = groq_client.chat.completions.create(
-            model="llama3-70b-8192",
-            messages=[
-                {"role": "system", "content": system_prompt},
-                {"role": "user", "content": "Start the interview now."} # Simple trigger
-            ],
-            temperature=0.7 # Moderate temperature for variability in questions
-        )
-
-        initial_message = chat_completion.choices[0].message.content
-
-        # Store initial state in the in-memory dictionary
-        interviews[interview_id] = {
-            'userId': user_id, # Store the user ID
-            'userName': candidate_name, # Store the candidate name
-            'status': 'in_progress',
-            'system_prompt': system_prompt, # Store for context in subsequent calls
-            'conversation_history': [
-                {"role": "assistant", "content": initial_message, "timestamp": get_utc_now()}
-            ],
-            'scores': [], # To store numerical scores extracted from AI responses
-            'startTime': get_utc_now()
-        }
-
-        logger.info(f"Started interview {interview_id} for user {user_id} ({candidate_name}).")
-        return jsonify({
+        response = jsonify({
             "message": initial_message,
             "interviewId": interview_id,
             "interviewStatus": "in_progress"
-        }), 201 # 201 Created status code might be appropriate
+        })
+        response.headers['X-Opening-Cache'] = opening_source
+        return response, 201 # 201 Created status code might be appropriate
 
+    except GatewayBusyError as busy:
+        logger.warning(f"LLM gateway busy during /start-interview: {busy}")
+        return jsonify({'error': 'The server is busy, please try again shortly.'}), 503
     except Exception as e:
         logger.error(f"Error during /start-interview: {e}\n{traceback.format_exc()}")
         return jsonify({'error': 'Failed to start interview due to an internal error.'}), 500
@@ -374,110 +804,27 @@ def continue_interview():
     Continues an ongoing interview. Sends user response to LLM, gets AI response,
     extracts feedback/score, and updates interview state.
     """
-    global interviews # Access the global in-memory store
-
+    interview_id = None # Initialize for error logging
     try:
-        data = request.json
-        if not data:
-            logger.warning("'/continue-interview' request missing JSON body.")
-            return jsonify({"error": "Request body must be valid JSON."}), 400
-
-        interview_id = data.get('interviewId')
-        user_response = data.get('userResponse')
-
-        if not interview_id or interview_id not in interviews:
-            logger.warning(f"'/continue-interview' request for invalid/unknown interview ID: {interview_id}")
-            return jsonify({"error": "Interview not found or invalid ID."}), 404
-        if not user_response:
-             logger.warning(f"'/continue-interview' request for {interview_id} missing 'userResponse'.")
-             return jsonify({"error": "userResponse is required."}), 400
-
-        interview_state = interviews[interview_id]
-
-        if interview_state['status'] != 'in_progress':
-             logger.warning(f"Attempt to continue interview {interview_id} which has status: {interview_state['status']}")
-             return jsonify({"error": f"Interview cannot be continued, status is: {interview_state['status']}"}), 400
-
-        # Append user response to history
-        interview_state['conversation_history'].append({
-            "role": "user",
-            "content": user_response,
-            "timestamp": get_utc_now()
-        })
-
-        # Prepare messages for Groq (include system prompt + full history)
-        messages_for_api = [
-            {"role": "system", "content": interview_state['system_prompt']}
-        ]
-        # Add conversation history, ensuring correct role mapping if needed
-        for msg in interview_state['conversation_history']:
-            messages_for_api.append({"role": msg["role"], "content": msg["content"]})
+        interview_id, interview_state, messages_for_api, error = begin_interview_turn(request.json)
+        if error:
+            return jsonify(error[0]), error[1]
 
         # Call Groq API
         logger.debug(f"Continuing interview {interview_id}. Sending history (length {len(messages_for_api)}) to Groq.")
-        chat_completion = groq_client.chat.completions.create(
-            model="llama3-70b-8192",
-            messages=messages_for_api,
-            temperature=0.6 # Slightly lower temp for more focused follow-ups
+        chat_completion = routed_interview_completion(
+            TASK_CONTINUE,
+            messages_for_api,
+            0.6, # Slightly lower temp for more focused follow-ups
+            interview_id
         )
 
         ai_response_content = chat_completion.choices[0].message.content
-        logger.debug(f"Received Groq response for interview {interview_id}.")
-
-        # --- Extract Feedback and Score using Regex ---
-        feedback = "Feedback not provided." # Default
-        score = None # Default
-        score_extracted_for_log = "N/A"
-
-        # Regex to find the feedback and score, allowing for variations in spacing/casing
-        # Looks for "**Feedback:**" followed by text, until "**Score:**" or end of string
-        # Then looks for "**Score:**" followed by number/10
-        match = re.search(
-            r"\*\*Feedback:\*\*\s*(.*?)(?:\s*\*\*Score:\*\*|\Z).*\*\*Score:\*\*\s*(\d{1,2})\s*/\s*10",
-            ai_response_content,
-            re.IGNORECASE | re.DOTALL
-        )
-
-        if match:
-            feedback = match.group(1).strip()
-            try:
-                score = int(match.group(2))
-                interview_state['scores'].append(score) # Store the valid score
-                score_extracted_for_log = str(score)
-                logger.info(f"Interview {interview_id}: Extracted Feedback and Score={score}")
-            except ValueError:
-                logger.warning(f"Interview {interview_id}: Could not parse score from matched group '{match.group(2)}'")
-                feedback = "Feedback provided, but score extraction failed." # Update feedback if score fails
-        else:
-            # Try finding score separately if the combined pattern failed
-            score_match = re.search(r"\*\*Score:\*\*\s*(\d{1,2})\s*/\s*10", ai_response_content, re.IGNORECASE)
-            if score_match:
-                 try:
-                     score = int(score_match.group(1))
-                     interview_state['scores'].append(score)
-                     score_extracted_for_log = str(score)
-                     logger.info(f"Interview {interview_id}: Extracted Score={score} (Feedback pattern not matched)")
-                 except ValueError:
-                     logger.warning(f"Interview {interview_id}: Could not parse score from group '{score_match.group(1)}' (Feedback pattern not matched)")
-            else:
-                logger.warning(f"Interview {interview_id}: Feedback/Score pattern not found in response: {ai_response_content[:100]}...")
+        prompt_tokens = chat_completion.usage.prompt_tokens if chat_completion.usage else None
+        logger.debug(f"Received Groq response for interview {interview_id} ({prompt_tokens} prompt tokens).")
 
-
-        # Append AI response to history (store raw response and extracted score)
-        interview_state['conversation_history'].append({
-            "role": "assistant",
-            "content": ai_response_content, # Store the full raw response
-            "timestamp": get_utc_now(),
-            "score_extracted": score # Store the extracted score (or None)
-        })
-
-        # --- Check for Interview End Condition ---
-        # Example: End after ~7 questions (1 system + 7 user + 7 AI = 15 messages)
-        MAX_MESSAGES = 15
-        if len(interview_state['conversation_history']) >= MAX_MESSAGES:
-             interview_state['status'] = 'ending' # Signal to frontend
-             ai_response_content += "\n\nOkay, I believe that covers the main areas I wanted to discuss. Thank you for answering my questions." # Append concluding remark
-             logger.info(f"Interview {interview_id} reached message limit ({MAX_MESSAGES}), signaling end.")
+        # --- Extract feedback/score, record the reply and check the end condition ---
+        response_body = complete_interview_turn(interview_id, interview_state, ai_response_content, prompt_tokens)
 
         # --- (Optional) Persist intermediate chat message ---
         # Consider the performance impact of writing to DB on every turn.
@@ -503,25 +850,125 @@ def continue_interview():
         #         logger.error(f"Failed to save intermediate chat message for interview {interview_id}: {db_err}")
 
         # --- Return response to frontend ---
-        return jsonify({
-            "interviewStatus": interview_state['status'], # Let frontend know if it should prepare to end
-            "message": ai_response_content, # Full AI response including question/feedback/score
-            "feedback": feedback, # Extracted feedback text
-            "score": score # Extracted numerical score
-        })
-
+        return jsonify(response_body)
+
+    except GatewayBusyError as busy:
+        logger.warning(f"LLM gateway busy during /continue-interview: {busy}")
+        return jsonify({'error': 'The server is busy, please try again shortly.'}), 503
+    except SessionConflictError as conflict:
+        logger.warning(f"Concurrent update of interview {interview_id}: {conflict}")
+        return jsonify({'error': 'This interview was updated by another request. Please retry.'}), 409
     except Exception as e:
-        logger.error(f"Error during /continue-interview for ID {interview_id if 'interview_id' in locals() else 'N/A'}: {e}\n{traceback.format_exc()}")
+        logger.error(f"Error during /continue-interview for ID {interview_id}: {e}\n{traceback.format_exc()}")
         return jsonify({'error': 'Failed to continue interview due to an internal error.'}), 500
 
+
+# --- Streaming (Server-Sent Events) variants ---
+
+def sse_event(event: str, payload: dict) -> str:
+    """Formats one Server-Sent Events message."""
+    return f"event: {event}\ndata: {json.dumps(payload)}\n\n"
+
+
+def sse_response(generator):
+    """Wraps an SSE generator in a streaming response that proxies won't buffer."""
+    return Response(
+        stream_with_context(generator),
+        mimetype='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
+
+
+@app.route('/start-interview/stream', methods=['POST'])
+def start_interview_stream():
+    """
+    Streaming variant of /start-interview. Emits a 'meta' event with the interview ID,
+    'token' events as the greeting is generated and a final 'done' event carrying the
+    same fields as the JSON route.
+    """
+    data = request.get_json(silent=True)
+    if not data:
+        logger.warning("'/start-interview/stream' request missing JSON body.")
+        return jsonify({"error": "Request body must be valid JSON."}), 400
+    resume_data = data.get('resumeData')
+    user_id = data.get('userId')
+    if not resume_data or not isinstance(resume_data, dict):
+        logger.warning("'/start-interview/stream' request JSON missing 'resumeData' object.")
+        return jsonify({"error": "Request JSON must include a valid 'resumeData' object."}), 400
+
+    interview_id = str(uuid.uuid4())
+    system_prompt, candidate_name = build_interview_system_prompt(resume_data)
+
+    def generate():
+        yield sse_event('meta', {"interviewId": interview_id})
+        parts = []
+        try:
+            prewarmed, _ = opening_cache.take(opening_cache_key(system_prompt), OPENING_JOIN_WAIT_SECONDS)
+            if prewarmed is not None:
+                parts.append(prewarmed)
+                yield sse_event('token', {"text": prewarmed}) # Already complete: one token event
+            else:
+                for delta in llm_gateway.stream(model=model_router.final_model(TASK_START), messages=start_interview_messages(system_prompt), temperature=0.7):
+                    parts.append(delta)
+                    yield sse_event('token', {"text": delta})
+        except GatewayBusyError as busy:
+            logger.warning(f"LLM gateway busy during /start-interview/stream: {busy}")
+            yield sse_event('error', {"error": "The server is busy, please try again shortly."})
+            return
+        except Exception as e:
+            logger.error(f"Error during /start-interview/stream: {e}\n{traceback.format_exc()}")
+            yield sse_event('error', {"error": "Failed to start interview due to an internal error."})
+            return
+
+        initial_message = "".join(parts)
+        create_interview_state(interview_id, user_id, candidate_name, system_prompt, initial_message, resume_data.get('skills'))
+        yield sse_event('done', {
+            "message": initial_message,
+            "interviewId": interview_id,
+            "interviewStatus": "in_progress"
+        })
+
+    return sse_response(generate())
+
+
+@app.route('/continue-interview/stream', methods=['POST'])
+def continue_interview_stream():
+    """
+    Streaming variant of /continue-interview. Emits 'token' events as the reply is
+    generated, 'feedback'/'score' events as soon as those parts are detected in the
+    stream, and a final 'done' event with the same fields as the JSON route.
+    """
+    interview_id, interview_state, messages_for_api, error = begin_interview_turn(request.get_json(silent=True))
+    if error:
+        return jsonify(error[0]), error[1]
+
+    def generate():
+        scanner = StreamingFeedbackScanner()
+        try:
+            for delta in llm_gateway.stream(model=model_router.final_model(TASK_CONTINUE), messages=messages_for_api, temperature=0.6):
+                yield sse_event('token', {"text": delta})
+                for event, payload in scanner.feed(delta):
+                    yield sse_event(event, payload)
+            response_body = complete_interview_turn(interview_id, interview_state, scanner.text)
+            yield sse_event('done', response_body)
+        except GatewayBusyError as busy:
+            logger.warning(f"LLM gateway busy during /continue-interview/stream: {busy}")
+            yield sse_event('error', {"error": "The server is busy, please try again shortly."})
+        except SessionConflictError as conflict:
+            logger.warning(f"Concurrent update of interview {interview_id}: {conflict}")
+            yield sse_event('error', {"error": "This interview was updated by another request. Please retry."})
+        except Exception as e:
+            logger.error(f"Error during /continue-interview/stream for ID {interview_id}: {e}\n{traceback.format_exc()}")
+            yield sse_event('error', {"error": "Failed to continue interview due to an internal error."})
+
+    return sse_response(generate())
+
 @app.route('/end-interview', methods=['POST'])
 def end_interview():
     """
     Ends an interview, calculates final score, saves the complete interview
-    and chat history to the database, and cleans up the in-memory state.
+    and chat history to the database, and removes the session from the session store.
     """
-    global interviews # Access the global in-memory store
-
     interview_id = None # Initialize for error logging
     try:
         data = request.json
@@ -531,80 +978,23 @@ def end_interview():
 
         interview_id = data.get('interviewId')
 
-        if not interview_id or interview_id not in interviews:
+        interview_state = session_store.get(interview_id) if interview_id else None
+        if not interview_state:
             logger.warning(f"'/end-interview' request for invalid/unknown interview ID: {interview_id}")
-            # If ID exists but not in memory, maybe it was already ended? Check DB?
-            # For now, assume it's an error if not in memory.
+            # If ID exists but not in the store, maybe it was already ended or expired? Check DB?
+            # For now, assume it's an error if not in the store.
             return jsonify({"error": "Interview not found or invalid ID. It might have already ended or failed to start."}), 404
 
-        interview_state = interviews[interview_id]
         user_id = interview_state.get('userId')
-        user_name = interview_state.get('userName', 'Unknown Candidate')
 
         if not user_id:
              logger.error(f"Interview {interview_id} cannot be saved because userId is missing from its state.")
-             # Clean up memory anyway
-             del interviews[interview_id]
+             # Clean up the session anyway
+             session_store.delete(interview_id)
              return jsonify({"error": "Cannot save interview: User ID was not associated during start."}), 400
 
         logger.info(f"Ending interview {interview_id} for user {user_id}.")
 
-        # --- Calculate final score ---
-        final_score = None
-        if interview_state.get('scores'):
-            valid_scores = [s for s in interview_state['scores'] if isinstance(s, (int, float))]
-            if valid_scores:
-                final_score = round(sum(valid_scores) / len(valid_scores))
-                logger.info(f"Calculated final score for interview {interview_id}: {final_score}")
-            else:
-                logger.warning(f"No valid scores found for interview {interview_id} to calculate final score.")
-        else:
-            logger.warning(f"Score list empty for interview {interview_id}. Cannot calculate final score.")
-
-
-        # --- Process history for Database ---
-        conversation_history_db = []
-        qa_pairs = []
-        current_question_info = None
-
-        for msg in interview_state['conversation_history']:
-            # Map roles for DB consistency ('assistant' -> 'interviewer')
-            msg_type = 'interviewer' if msg['role'] == 'assistant' else 'user'
-            db_entry = {
-                'type': msg_type,
-                'content': msg['content'],
-                'timestamp': msg.get('timestamp', get_utc_now()),
-                'score': msg.get('score_extracted') # Include score extracted during conversation
-            }
-            conversation_history_db.append(db_entry)
-
-            # Attempt to structure Q&A pairs
-            if msg_type == 'interviewer':
-                # If a previous question was pending an answer, finalize it (maybe as unanswered)
-                if current_question_info and 'answer' not in current_question_info:
-                    logger.warning(f"Interview {interview_id}: Found unanswered interviewer message before the next.")
-                    current_question_info['answer'] = "[No specific user answer recorded before next question]"
-                    qa_pairs.append(current_question_info)
-
-                # Start a new potential Q&A pair
-                current_question_info = {
-                    'question': msg['content'],
-                    'answer': None, # Placeholder for the user's answer
-                    'score': msg.get('score_extracted'), # Score associated with the *question's* feedback
-                    'timestamp': msg.get('timestamp', get_utc_now())
-                }
-            elif msg_type == 'user' and current_question_info:
-                # Assign the user's message as the answer to the pending question
-                current_question_info['answer'] = msg['content']
-                qa_pairs.append(current_question_info)
-                current_question_info = None # Reset, waiting for the next question
-
-        # Handle case where the last message was a question without a final user answer
-        if current_question_info and 'answer' not in current_question_info:
-             current_question_info['answer'] = "[Interview ended before answer]"
-             qa_pairs.append(current_question_info)
-             logger.info(f"Interview {interview_id}: Last message was a question, marked as ended before answer.")
-
         # --- Prepare final interview document for saving ---
         user_object_id = None
         try:
@@ -614,25 +1004,17 @@ def end_interview():
             user_object_id = ObjectId(user_id)
         except Exception as e:
             logger.error(f"Invalid userId format '{user_id}' for interview {interview_id}. Cannot convert to ObjectId. Error: {e}")
-            # Clean up memory anyway
-            del interviews[interview_id]
+            # Clean up the session anyway
+            session_store.delete(interview_id)
             return jsonify({'error': 'Invalid user ID format, cannot save interview.'}), 400
 
-        interview_data = {
-            'interviewId': interview_id, # Use the string UUID as the primary identifier maybe? Or use DB ObjectId? Check schema.
-            'userId': user_object_id, # Reference to the user document
-            'userName': user_name,
-            'date': interview_state.get('startTime', get_utc_now()), # Use start time if available
-            'endDate': get_utc_now(), # Add end time
-            'finalScore': final_score,
-            'status': 'completed',
-            'questions': qa_pairs, # Structured Q&A
-            'conversationHistory': conversation_history_db # Full history for reference
-        }
+        interview_data = build_interview_document(interview_id, interview_state, user_object_id, 'completed')
+        final_score = interview_data['finalScore']
 
         # --- Save to Database ---
         logger.debug(f"Attempting to save interview {interview_id} data to database.")
-        save_interview(interview_data) # Assumes this handles insert correctly
+        save_interview(interview_data, sync=True) # Acknowledged write: the client is told the interview is saved
+        record_interview(interview_data) # Rollup increments can trail the response
 
         # Optionally save chat history separately if needed, or rely on conversationHistory in interview doc
         # logger.debug(f"Attempting to save chat history for interview {interview_id}.")
@@ -643,9 +1025,9 @@ def end_interview():
         # }
         # save_chat_message(chat_data)
 
-        # --- Clean up in-memory state ---
-        del interviews[interview_id]
-        logger.info(f"Interview {interview_id} ended successfully and saved. Final score: {final_score}. In-memory state cleaned.")
+        # --- Clean up session state ---
+        session_store.delete(interview_id)
+        logger.info(f"Interview {interview_id} ended successfully and saved. Final score: {final_score}. Session state cleaned.")
 
         return jsonify({
             'message': 'Interview ended and saved successfully.',
@@ -655,75 +1037,350 @@ def end_interview():
 
     except Exception as e:
         logger.error(f"Error during /end-interview for ID {interview_id}: {e}\n{traceback.format_exc()}")
-        # Attempt to clean up memory even if DB save failed
-        if interview_id and interview_id in interviews:
+        # Attempt to clean up the session even if DB save failed
+        if interview_id:
             try:
-                del interviews[interview_id]
-                logger.info(f"Cleaned up in-memory state for interview {interview_id} after error during ending process.")
+                session_store.delete(interview_id)
+                logger.info(f"Cleaned up session state for interview {interview_id} after error during ending process.")
             except Exception as cleanup_err:
-                 logger.error(f"Error cleaning up memory for interview {interview_id} after end error: {cleanup_err}")
+                 logger.error(f"Error cleaning up session for interview {interview_id} after end error: {cleanup_err}")
         return jsonify({'error': 'An unexpected error occurred while ending the interview.'}), 500
 
 
+# --- User history (dashboards and exports) ---
+
+HISTORY_COLLECTIONS = {'interviews', 'resumes'}
+
+
+@app.route('/users/<user_id>/<collection>', methods=['GET'])
+def user_history_page(user_id, collection):
+    """
+    One page of a user's interviews or resumes, newest first.
+    Query params: view (summary|detail|full, default summary), limit, cursor (from nextCursor).
+    """
+    if collection not in HISTORY_COLLECTIONS:
+        return jsonify({"error": "Not found."}), 404
+    if not ObjectId.is_valid(user_id):
+        return jsonify({"error": "Invalid userId."}), 400
+    try:
+        limit = int(request.args.get('limit', HISTORY_PAGE_DEFAULT))
+        items, next_cursor = get_history_page(
+            collection, user_id,
+            view=request.args.get('view', 'summary'),
+            limit=limit,
+            cursor=request.args.get('cursor')
+        )
+    except (InvalidCursorError, ValueError) as e:
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        logger.error(f"Error listing {collection} for user {user_id}: {e}\n{traceback.format_exc()}")
+        return jsonify({"error": f"Could not load {collection}."}), 500
+    payload = {"items": items, "nextCursor": next_cursor}
+    return Response(json.dumps(payload, default=str), mimetype='application/json')
+
+
+@app.route('/users/<user_id>/<collection>/export', methods=['GET'])
+def user_history_export(user_id, collection):
+    """Streams all of a user's interviews or resumes as NDJSON (view param as above, default full)."""
+    if collection not in HISTORY_COLLECTIONS:
+        return jsonify({"error": "Not found."}), 404
+    if not ObjectId.is_valid(user_id):
+        return jsonify({"error": "Invalid userId."}), 400
+    view = request.args.get('view', 'full')
+    try:
+        documents = iter_history(collection, user_id, view=view)
+        first = next(documents, None) # Surface bad views / DB errors before the stream starts
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        logger.error(f"Error exporting {collection} for user {user_id}: {e}\n{traceback.format_exc()}")
+        return jsonify({"error": f"Could not export {collection}."}), 500
+
+    def generate():
+        try:
+            if first is not None:
+                yield json.dumps(first, default=str) + "\n"
+                for document in documents:
+                    yield json.dumps(document, default=str) + "\n"
+        except Exception as e:
+            logger.error(f"Error during {collection} export for user {user_id}: {e}")
+            yield json.dumps({"error": "Export interrupted due to an internal error."}) + "\n"
+        finally:
+            documents.close()
+
+    return Response(stream_with_context(generate()), mimetype='application/x-ndjson')
+
+
+# --- Analytics ---
+
+def _rollup_response(scope, key):
+    """Day buckets plus range totals for one rollup key (?from=YYYY-MM-DD&to=YYYY-MM-DD)."""
+    day_from, day_to = request.args.get('from'), request.args.get('to')
+    for day in (day_from, day_to):
+        if day and not re.fullmatch(r"\d{4}-\d{2}-\d{2}", day):
+            return jsonify({"error": "Dates must be formatted as YYYY-MM-DD."}), 400
+    try:
+        buckets = get_rollup_buckets(scope, key, day_from, day_to)
+    except Exception as e:
+        logger.error(f"Error reading {scope} rollups for {key}: {e}\n{traceback.format_exc()}")
+        return jsonify({"error": "Could not load analytics."}), 500
+    return jsonify({"scope": scope, "key": key, "buckets": buckets, "totals": summarize_buckets(buckets)})
+
+
+@app.route('/analytics/users/<user_id>/scores', methods=['GET'])
+def user_score_trend(user_id):
+    """Per-day interview score trend for one user."""
+    if not ObjectId.is_valid(user_id):
+        return jsonify({"error": "Invalid userId."}), 400
+    return _rollup_response('user', user_id)
+
+
+@app.route('/analytics/skills/<path:skill>/scores', methods=['GET'])
+def skill_score_trend(skill):
+    """Per-day interview score trend across candidates listing a skill."""
+    skill_keys = normalize_skills([skill])
+    if not skill_keys:
+        return jsonify({"error": "Invalid skill."}), 400
+    return _rollup_response('skill', skill_keys[0])
+
+
+@app.route('/interview/<interview_id>/context-stats', methods=['GET'])
+def interview_context_stats(interview_id):
+    """Returns per-turn prompt-token counts and summary state for a live interview."""
+    interview_state = session_store.get(interview_id)
+    if not interview_state:
+        return jsonify({"error": "Interview not found or invalid ID."}), 404
+    context_state = interview_state.get('context', {})
+    return jsonify({
+        "interviewId": interview_id,
+        "promptTokensPerTurn": interview_state.get('prompt_token_counts', []),
+        "historyLength": len(interview_state['conversation_history']),
+        "summarizedTurns": context_state.get('summarized_count', 0),
+        "summaryChars": len(context_state.get('summary', ""))
+    })
+
+
+@app.route('/sessions/stats', methods=['GET'])
+def session_stats():
+    """Returns live session count and (for the in-process store) bytes retained and evictions."""
+    if hasattr(session_store, 'stats'):
+        return jsonify(session_store.stats())
+    return jsonify({"liveSessions": session_store.count()})
+
+
+@app.route('/llm-gateway/stats', methods=['GET'])
+def llm_gateway_stats():
+    """Returns per-model queue depth and in-flight counts of the LLM gateway."""
+    return jsonify(llm_gateway.stats())
+
+
+@app.route('/model-router/stats', methods=['GET'])
+def model_router_stats():
+    """Returns the model route per task and per-tier attempt and escalation counts."""
+    return jsonify(model_router.stats())
+
+
+@app.route('/parse-cache/stats', methods=['GET'])
+def parse_cache_stats():
+    """Returns size and hit/miss counters of the resume parse cache."""
+    return jsonify(parse_cache.stats())
+
+
+@app.route('/opening-cache/stats', methods=['GET'])
+def opening_cache_stats():
+    """Returns size and hit/miss counters of the prewarmed interview-opening cache."""
+    return jsonify(opening_cache.stats())
+
+
+@app.route('/near-duplicates/stats', methods=['GET'])
+def near_duplicate_stats():
+    """Returns size and lookup counters of the near-duplicate resume index."""
+    return jsonify(near_duplicate_index.stats())
+
+
+@app.route('/db/write-buffer/stats', methods=['GET'])
+def write_buffer_stats():
+    """Returns pending operations and flush latency of the database write-behind buffer."""
+    return jsonify(write_buffer.stats())
+
+
+# --- Metrics ---
+
+metrics.REGISTRY.gauge("resumep_live_sessions", "Interview sessions currently held by the session store.",
+                       lambda: session_store.count())
+metrics.REGISTRY.gauge("resumep_session_bytes", "Serialized bytes retained by the in-process session store.",
+                       lambda: session_store.bytes_retained() if hasattr(session_store, 'bytes_retained') else None)
+metrics.REGISTRY.gauge("resumep_llm_queued", "LLM calls waiting for a per-model slot.",
+                       lambda: {(model,): s["queued"] for model, s in llm_gateway.stats().items()}, ("model",))
+metrics.REGISTRY.gauge("resumep_llm_in_flight", "LLM calls currently in flight.",
+                       lambda: {(model,): s["inFlight"] for model, s in llm_gateway.stats().items()}, ("model",))
+metrics.REGISTRY.gauge("resumep_llm_circuit_state", "LLM circuit breaker state per model (0 closed, 1 half-open, 2 open).",
+                       lambda: llm_gateway.circuit_states(), ("model",))
+metrics.REGISTRY.gauge("resumep_db_write_buffer_pending", "Operations waiting in the database write-behind buffer.",
+                       lambda: write_buffer.pending())
+metrics.REGISTRY.gauge("resumep_parse_cache_entries", "Entries in the in-memory resume parse cache.",
+                       lambda: parse_cache.stats()["entries"])
+metrics.REGISTRY.gauge("resumep_near_duplicate_index_entries", "Resumes in the in-memory near-duplicate index.",
+                       lambda: near_duplicate_index.stats()["entries"])
+metrics.REGISTRY.gauge("resumep_opening_cache_entries", "Prewarmed interview openings waiting to be used.",
+                       lambda: opening_cache.stats()["entries"])
+metrics.REGISTRY.gauge("resumep_dependency_up", "1 if the last background probe of the dependency succeeded, else 0.",
+                       health_monitor.up_gauge, ("dependency",))
+
+
+@app.route('/metrics', methods=['GET'])
+def metrics_endpoint():
+    """Prometheus text exposition of this process's metrics."""
+    return Response(metrics.REGISTRY.render(), content_type=metrics.CONTENT_TYPE)
+
+
+@app.route('/live', methods=['GET'])
+def liveness():
+    """Liveness: the process is up and serving requests. Never touches dependencies."""
+    return jsonify({"status": "alive", "uptimeSeconds": round(time.time() - PROCESS_STARTED_AT, 1)})
+
+
+@app.route('/ready', methods=['GET'])
+def readiness():
+    """
+    Readiness: 200 while every critical dependency passed its last background probe
+    (and MongoDB is connected). Reads cached state only; never blocks on a dependency.
+    """
+    snapshot = health_monitor.snapshot()
+    ready = snapshot["ready"] and is_connected()
+    return jsonify({
+        "ready": ready,
+        "startupMode": STARTUP_MODE,
+        "database": "connected" if is_connected() else "connecting",
+        "llmGateway": "started" if llm_gateway.started else "not_started",
+        "dependencies": {name: dep["status"] for name, dep in snapshot["dependencies"].items()},
+        "startupPhasesMs": STARTUP_PHASES
+    }), 200 if ready else 503
+
+
 @app.route('/health', methods=['GET'])
 def health_check():
-    """Provides a basic health check endpoint."""
-    # Consider adding a quick DB ping here for a more comprehensive check
-    # from database import client as db_client # Import client temporarily
-    db_status = "unknown"
-    # try:
-    #    if db_client:
-    #        db_client.admin.command('ping')
-    #        db_status = "connected"
-    #    else:
-    #        db_status = "client_not_initialized"
-    # except Exception as e:
-    #    logger.warning(f"Health check DB ping failed: {e}")
-    #    db_status = "disconnected"
-
+    """
+    Dependency health from the cached background probes: 'healthy', 'degraded'
+    (a non-critical dependency such as Groq is down) or 'unhealthy' (503).
+    """
     logger.debug("Health check endpoint '/health' accessed.")
+    snapshot = health_monitor.snapshot()
     return jsonify({
-        "status": "healthy",
+        "status": snapshot["status"],
         "version": "1.0.0", # Consider updating version automatically
-        # "database_status": db_status,
+        "dependencies": snapshot["dependencies"],
         "timestamp": get_utc_now().isoformat()
-        })
+        }), 503 if snapshot["status"] == "unhealthy" else 200
 
-# === Main Execution Block ===
+_phase_started = record_startup_phase("app_setup", _phase_started)
+
+# === Worker lifecycle ===
+# Used by the development server below and by gunicorn (see gunicorn.conf.py / wsgi.py),
+# where each worker process connects to MongoDB after the fork.
+
+def initialize_database_with_retries(max_retries=3, delay_seconds=2):
+    """Runs initialize_database, retrying a few times. Returns True on success."""
+    logger.info("Initializing database...")
+    for attempt in range(1, max_retries + 1):
+        try:
+            if initialize_database():
+                logger.info("Database successfully initialized!")
+                return True
+            logger.warning(f"Database initialization failed. Retry {attempt}/{max_retries}...")
+        except Exception as db_error:
+            logger.error(f"Database initialization error: {db_error}. Retry {attempt}/{max_retries}...")
+        if attempt < max_retries:
+            time.sleep(delay_seconds)
+    return False
+
+
+def _warm_up():
+    """Lazy startup: connects to MongoDB and builds the LLM gateway in the background."""
+    started = time.perf_counter()
+    delay_seconds = 1
+    while not is_connected() and not _worker_shut_down:
+        try:
+            connect_db()
+        except Exception as e:
+            logger.warning(f"MongoDB not reachable yet ({e}); retrying in {delay_seconds}s.")
+            time.sleep(delay_seconds)
+            delay_seconds = min(delay_seconds * 2, 30)
+    started = record_startup_phase("database_connect", started)
+    near_duplicate_index.start()
+    get_gateway()
+    record_startup_phase("llm_gateway", started)
+    logger.info(f"Warm-up finished. Startup phases (ms): {STARTUP_PHASES}")
+
+
+def init_worker():
+    """
+    Per-process startup. STARTUP_MODE=eager connects and migrates the database before
+    serving (the old behaviour); the default lazy mode returns immediately and warms
+    up in the background, with schema changes left to `python database.py migrate`.
+    """
+    if STARTUP_MODE == "eager":
+        started = time.perf_counter()
+        if not initialize_database_with_retries():
+            raise RuntimeError("Database initialization failed after multiple attempts.")
+        started = record_startup_phase("database_init", started)
+        near_duplicate_index.start()
+        get_gateway()
+        record_startup_phase("llm_gateway", started)
+        logger.info(f"Startup phases (ms): {STARTUP_PHASES}")
+    else:
+        threading.Thread(target=_warm_up, name="startup-warm-up", daemon=True).start()
+    session_store.start_sweeper()
+    health_monitor.start()
 
-# Add this at the bottom of app.py, replacing the current if __name__ == '__main__':
+
+_worker_shut_down = False
+
+
+def shutdown_worker():
+    """
+    Graceful per-process shutdown: persists in-flight interviews held by this
+    process, flushes buffered DB writes, then releases the LLM gateway, the
+    extraction pool and the DB connection. Safe to call more than once.
+    """
+    global _worker_shut_down
+    if _worker_shut_down:
+        return
+    _worker_shut_down = True
+    logger.info("Shutting down worker...")
+    for step, action in (
+        ("health monitor", health_monitor.stop),
+        ("near-duplicate index", near_duplicate_index.stop),
+        ("opening prewarm pool", opening_cache.close),
+        ("session sweeper", session_store.stop_sweeper),
+        ("session store", session_store.close), # In-process sessions are saved as 'interrupted'
+        ("write buffer", flush_writes),
+        ("LLM gateway", llm_gateway.close),
+        ("extraction pool", shutdown_extraction_pool),
+        ("database", close_db_connection),
+    ):
+        try:
+            action()
+        except Exception as e:
+            logger.error(f"Error shutting down {step}: {e}")
+    logger.info("Worker shut down.")
+
+
+# === Main Execution Block ===
+# Development server only. In production run: gunicorn -c gunicorn.conf.py wsgi:app
 
 if __name__ == '__main__':
     try:
-        # Initialize database connection and schemas ONCE at startup
-        logger.info("Application starting up. Initializing database...")
-        
-        # Add more robust error handling and retry logic for database connection
-        max_retries = 3
-        retry_count = 0
-        db_initialized = False
-        
-        while retry_count < max_retries and not db_initialized:
-            try:
-                if initialize_database():
-                    db_initialized = True
-                    logger.info("Database successfully initialized!")
-                else:
-                    retry_count += 1
-                    logger.warning(f"Database initialization failed. Retry {retry_count}/{max_retries}...")
-                    time.sleep(2)  # Wait 2 seconds before retry
-            except Exception as db_error:
-                retry_count += 1
-                logger.error(f"Database initialization error: {db_error}. Retry {retry_count}/{max_retries}...")
-                time.sleep(2)  # Wait 2 seconds before retry
-        
-        if not db_initialized:
+        try:
+            init_worker()
+        except RuntimeError:
             logger.critical("CRITICAL: Database initialization failed after multiple attempts. Please check MongoDB connection and configuration in .env and database.py. Application cannot start.")
             sys.exit(1)  # Exit if DB connection fails
+        atexit.register(shutdown_worker)
 
         # Start Flask development server
         port = int(os.getenv("PORT", 5000))  # Allow port configuration via environment variable
-        debug_mode = os.getenv("FLASK_DEBUG", "True").lower() == "true"  # Allow debug mode config
+        debug_mode = os.getenv("FLASK_DEBUG", "False").lower() == "true"  # Opt in to debug mode and the reloader
 
         logger.info(f"Starting Flask application on host 0.0.0.0 port {port} (Debug: {debug_mode})...")
         app.run(
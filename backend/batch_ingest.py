@@ -0,0 +1,292 @@
+# backend/batch_ingest.py
+# Batch resume ingestion, used by the /parse-resumes/batch endpoint and as a CLI.
+#
+# Files flow through a two-stage pipeline: text extraction runs in the shared
+# process pool (CPU-bound), LLM parsing runs on a bounded thread pool on top of
+# the LLM gateway (I/O-bound). At most `max_pending` files are in flight at a time,
+# so a large zip never sits in memory all at once. Results are yielded per file
+# as soon as they are ready, and parsed resumes are bulk-inserted with insert_many.
+#
+# CLI usage:
+#   python batch_ingest.py <directory|archive.zip> [--user-id ID] [--llm-concurrency N] [--no-db]
+import argparse
+import json
+import logging
+import os
+import sys
+import time
+import zipfile
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from datetime import datetime, timezone
+
+from near_duplicates import NEAR_DUP_ENABLED, fingerprint_text
+from parse_cache import hash_bytes, make_cache_key
+from upload_guards import (
+    MAX_BATCH_ZIP_ENTRIES,
+    MAX_BATCH_ZIP_UNCOMPRESSED_BYTES,
+    MAX_RESUME_FILE_BYTES,
+    UploadRejected,
+    check_resume_upload,
+    check_zip,
+)
+from pdf_extract import get_extraction_pool, shutdown_extraction_pool
+from resume_parser import (
+    EMPTY_RESUME,
+    MAX_RESUME_TEXT_LENGTH,
+    RESUME_PARSE_MODEL,
+    RESUME_PARSE_PROMPT_VERSION,
+    SUPPORTED_RESUME_EXTENSIONS,
+    build_resume_document,
+    extract_text_from_bytes,
+    parse_resume_text,
+)
+
+logger = logging.getLogger(__name__)
+
+BATCH_LLM_CONCURRENCY = int(os.getenv("BATCH_LLM_CONCURRENCY", "8"))
+BATCH_MAX_PENDING = int(os.getenv("BATCH_MAX_PENDING", "32")) # Files read but not yet finished
+BATCH_INSERT_SIZE = int(os.getenv("BATCH_INSERT_SIZE", "100"))
+BATCH_MAX_FILES = int(os.getenv("BATCH_MAX_FILES", "1000"))
+
+
+# === Upload sources ===
+
+def _is_resume_name(name):
+    base = os.path.basename(name)
+    return bool(base) and not base.startswith(('.', '~$')) and base.lower().endswith(SUPPORTED_RESUME_EXTENSIONS)
+
+
+def iter_zip_entries(zip_stream):
+    """
+    Yields (filename, bytes) for every PDF/DOCX in a zip archive, reading one entry at a time.
+    The archive's directory is checked first (raises UploadRejected); resumes whose declared
+    size is over MAX_RESUME_FILE_BYTES are not decompressed and yield (filename, UploadRejected).
+    """
+    check_zip(zip_stream, MAX_BATCH_ZIP_ENTRIES, MAX_BATCH_ZIP_UNCOMPRESSED_BYTES, label="zip archive")
+    with zipfile.ZipFile(zip_stream) as archive:
+        for info in archive.infolist():
+            if info.is_dir() or info.filename.startswith('__MACOSX/') or not _is_resume_name(info.filename):
+                continue
+            if info.file_size > MAX_RESUME_FILE_BYTES:
+                logger.warning(f"Skipping {info.filename} in zip archive: {info.file_size} bytes (limit {MAX_RESUME_FILE_BYTES}).")
+                yield os.path.basename(info.filename), UploadRejected(
+                    f"'{info.filename}' is {info.file_size} bytes uncompressed (limit {MAX_RESUME_FILE_BYTES}).")
+                continue
+            yield os.path.basename(info.filename), archive.read(info)
+
+
+def iter_directory(path):
+    """Yields (relative path, bytes) for every PDF/DOCX below a directory, in sorted order."""
+    for root, dirs, files in os.walk(path):
+        dirs.sort()
+        for name in sorted(files):
+            if _is_resume_name(name):
+                full_path = os.path.join(root, name)
+                with open(full_path, 'rb') as f:
+                    yield os.path.relpath(full_path, path), f.read()
+
+
+# === Pipeline ===
+
+class BatchIngestor:
+    """
+    Parses many resumes with bounded parallelism. `complete` is a gateway-style
+    callable; `save_many` (e.g. database.save_resumes_bulk) receives lists of resume
+    documents when `user_object_id` is set.
+    """
+
+    def __init__(self, complete, llm_concurrency=BATCH_LLM_CONCURRENCY, max_pending=BATCH_MAX_PENDING,
+                 max_files=BATCH_MAX_FILES, parse_cache=None, save_many=None, user_object_id=None,
+                 insert_batch_size=BATCH_INSERT_SIZE):
+        self.complete = complete
+        self.llm_concurrency = llm_concurrency
+        self.max_pending = max(max_pending, llm_concurrency)
+        self.max_files = max_files
+        self.parse_cache = parse_cache
+        self.save_many = save_many if user_object_id is not None else None
+        self.user_object_id = user_object_id
+        self.insert_batch_size = insert_batch_size
+
+    @staticmethod
+    def _result(item, parsed_data=None, error=None, cache=None):
+        result = {
+            "fileName": item["fileName"],
+            "status": "error" if error else "ok",
+            "elapsedMs": round((time.perf_counter() - item["started"]) * 1000, 1),
+        }
+        if error:
+            result["error"] = error
+        else:
+            result["parsedData"] = parsed_data
+            result["cache"] = cache
+        return result
+
+    def _flush(self, docs, summary):
+        """Bulk-inserts buffered resume documents; failures are counted, not raised."""
+        if not docs or not self.save_many:
+            return
+        try:
+            self.save_many(list(docs))
+            summary["inserted"] += len(docs)
+        except Exception as e:
+            logger.error(f"Bulk insert of {len(docs)} resumes failed: {e}")
+            summary["insertErrors"] += len(docs)
+        docs.clear()
+
+    def _queue_insert(self, to_insert, item, parsed_data, summary):
+        """Queues a resume document for the user (fresh parse or cache hit), flushing full batches."""
+        if not self.save_many:
+            return
+        to_insert.append(build_resume_document(
+            self.user_object_id, item["fileName"], item["contentHash"], item["cacheKey"],
+            parsed_data, datetime.now(timezone.utc), item.get("fingerprint")
+        ))
+        if len(to_insert) >= self.insert_batch_size:
+            self._flush(to_insert, summary)
+
+    def run(self, uploads):
+        """
+        Consumes (filename, bytes or seekable stream) pairs and yields one result dict per
+        file, then a summary dict. Files failing the upload guards, or paired with an
+        exception instead of data (e.g. by iter_zip_entries), are reported as errors.
+        """
+        extraction_pool = get_extraction_pool()
+        llm_pool = ThreadPoolExecutor(max_workers=self.llm_concurrency, thread_name_prefix="batch-llm")
+        uploads = iter(uploads)
+        pending = {} # future -> (stage, item)
+        to_insert = []
+        summary = {"files": 0, "ok": 0, "errors": 0, "cacheHits": 0, "inserted": 0, "insertErrors": 0, "limitReached": False}
+        started = time.perf_counter()
+        exhausted = False
+
+        try:
+            while True:
+                # Refill the pipeline up to max_pending files
+                while not exhausted and len(pending) < self.max_pending:
+                    if summary["files"] >= self.max_files:
+                        summary["limitReached"] = True
+                        exhausted = True
+                        break
+                    try:
+                        filename, data = next(uploads)
+                    except StopIteration:
+                        exhausted = True
+                        break
+                    summary["files"] += 1
+                    try:
+                        if isinstance(data, Exception):
+                            raise data
+                        check_resume_upload(filename, data)
+                        if not isinstance(data, (bytes, bytearray)):
+                            data = data.read()
+                    except ValueError as e: # Includes UploadRejected
+                        summary["errors"] += 1
+                        yield self._result({"fileName": filename, "started": time.perf_counter()}, error=str(e))
+                        continue
+                    content_hash = hash_bytes(data)
+                    item = {
+                        "fileName": filename,
+                        "started": time.perf_counter(),
+                        "contentHash": content_hash,
+                        "cacheKey": make_cache_key(content_hash, RESUME_PARSE_PROMPT_VERSION, RESUME_PARSE_MODEL),
+                    }
+                    if self.parse_cache is not None:
+                        cached_data, cache_tier = self.parse_cache.get(item["cacheKey"])
+                        if cached_data is not None:
+                            summary["ok"] += 1
+                            summary["cacheHits"] += 1
+                            self._queue_insert(to_insert, item, cached_data, summary)
+                            yield self._result(item, cached_data, cache=cache_tier)
+                            continue
+                    future = extraction_pool.submit(extract_text_from_bytes, filename, data, MAX_RESUME_TEXT_LENGTH, False)
+                    pending[future] = ("extract", item)
+
+                if not pending:
+                    break
+
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    stage, item = pending.pop(future)
+                    try:
+                        value = future.result()
+                    except Exception as e:
+                        summary["errors"] += 1
+                        yield self._result(item, error=str(e))
+                        continue
+
+                    if stage == "extract":
+                        if not value or not value.strip():
+                            summary["ok"] += 1
+                            yield self._result(item, dict(EMPTY_RESUME))
+                        else:
+                            if self.save_many and NEAR_DUP_ENABLED:
+                                item["fingerprint"] = fingerprint_text(value) # Makes the stored resume findable as a near-duplicate
+                            pending[llm_pool.submit(parse_resume_text, value, self.complete, item["fileName"])] = ("parse", item)
+                        continue
+
+                    # stage == "parse"
+                    if self.parse_cache is not None:
+                        self.parse_cache.put(item["cacheKey"], value)
+                    self._queue_insert(to_insert, item, value, summary)
+                    summary["ok"] += 1
+                    yield self._result(item, value)
+
+            self._flush(to_insert, summary)
+            summary["elapsedMs"] = round((time.perf_counter() - started) * 1000, 1)
+            yield {"summary": summary}
+        finally:
+            # Reached early if the consumer went away (e.g. HTTP client disconnected)
+            for future in pending:
+                future.cancel()
+            llm_pool.shutdown(wait=False, cancel_futures=True)
+            self._flush(to_insert, summary)
+
+
+# === CLI ===
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Parse a directory or zip of resumes and print NDJSON results.")
+    parser.add_argument("source", help="Directory or .zip file containing PDF/DOCX resumes")
+    parser.add_argument("--user-id", help="Owner user ID; parsed resumes are bulk-inserted into the resumes collection")
+    parser.add_argument("--llm-concurrency", type=int, default=BATCH_LLM_CONCURRENCY, help="Parallel LLM calls")
+    parser.add_argument("--max-files", type=int, default=sys.maxsize, help="Stop after this many files")
+    parser.add_argument("--no-db", action="store_true", help="Do not write to MongoDB")
+    args = parser.parse_args(argv)
+
+    from dotenv import load_dotenv
+    load_dotenv()
+    logging.basicConfig(level=os.getenv("LOG_LEVEL", "INFO").upper(), stream=sys.stderr)
+
+    from llm_gateway import get_gateway
+    save_many, user_object_id = None, None
+    if args.user_id and not args.no_db:
+        from bson import ObjectId
+        import database
+        database.connect_db()
+        save_many, user_object_id = database.save_resumes_bulk, ObjectId(args.user_id)
+
+    if os.path.isdir(args.source):
+        uploads = iter_directory(args.source)
+    elif zipfile.is_zipfile(args.source):
+        uploads = iter_zip_entries(args.source)
+    else:
+        parser.error(f"{args.source} is neither a directory nor a zip archive")
+
+    ingestor = BatchIngestor(
+        get_gateway().complete,
+        llm_concurrency=args.llm_concurrency,
+        max_files=args.max_files,
+        save_many=save_many,
+        user_object_id=user_object_id
+    )
+    try:
+        for result in ingestor.run(uploads):
+            sys.stdout.write(json.dumps(result, default=str) + "\n")
+            sys.stdout.flush()
+    finally:
+        shutdown_extraction_pool()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,231 @@
+# backend/benchmarks/fake_groq.py
+# Local stand-in for the Groq chat-completions API, for offline benchmarks.
+#
+# Answers POST .../chat/completions (what the groq SDK calls under GROQ_BASE_URL)
+# after a configurable time-to-first-token, then "generates" completion tokens at
+# a configurable rate. JSON-mode requests get a resume-shaped JSON object; other
+# requests get an interviewer reply with a '**Feedback:** ... **Score:** N/10'
+# block. Both plain and stream=True (SSE) responses are supported.
+#
+# Faults can be injected per request, to exercise the gateway's retries, hedging
+# and circuit breaker: 500s, 429s carrying Retry-After, requests that hang, and
+# a slow tail (extra latency on a fraction of requests). With a seed, the n-th
+# request always draws the same faults, so fault runs are reproducible.
+#
+# Usage (then start the app with GROQ_BASE_URL=http://127.0.0.1:8300):
+#   python -m benchmarks.fake_groq --port 8300 --latency-ms 300 --tokens-per-second 250
+#   python -m benchmarks.fake_groq --error-rate 0.1 --rate-limit-rate 0.05 --slow-rate 0.05 --slow-ms 3000
+import argparse
+import json
+import random
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+FILLER_WORDS = ("design", "latency", "cache", "tradeoff", "index", "query", "service", "test",
+                "deploy", "team", "scale", "review", "profile", "stream", "model", "metric")
+
+
+def estimate_prompt_tokens(messages) -> int:
+    return sum(len(str(m.get("content", ""))) for m in messages) // 4 + 4 * len(messages)
+
+
+def resume_reply(rng) -> str:
+    return json.dumps({
+        "name": "Benchmark Candidate",
+        "skills": rng.sample(["Python", "Flask", "MongoDB", "Redis", "Docker", "Kubernetes", "React", "SQL", "AWS", "Go"], 6),
+        "experience": [{"title": "Software Engineer", "company": f"Company {i}", "duration": "2 years"} for i in range(3)],
+        "projects": [{"name": f"Project {i}", "description": "Built a service."} for i in range(2)]
+    })
+
+
+def interview_reply(rng, completion_tokens) -> str:
+    words = " ".join(rng.choice(FILLER_WORDS) for _ in range(max(completion_tokens - 20, 5)))
+    return (f"Thanks. Could you walk me through how you would approach {words}?\n\n"
+            f"**Feedback:** Clear answer with a concrete example. **Score:** {rng.randint(4, 9)}/10")
+
+
+class FakeGroqHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1" # Keep-alive, like the real API
+    server_version = "FakeGroq/1.0"
+
+    def log_message(self, format, *args):
+        pass # Keep benchmark output clean
+
+    def _send_json(self, status, payload, headers=None):
+        body = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _inject_fault(self, config, rng) -> bool:
+        """Applies at most one configured fault; returns True if the request was answered with it."""
+        roll = rng.random()
+        fault = None
+        for name, rate in (("error", config.error_rate), ("rate_limited", config.rate_limit_rate),
+                           ("hang", config.hang_rate), ("slow", config.slow_rate)):
+            if roll < rate:
+                fault = name
+                break
+            roll -= rate
+        if fault is None:
+            return False
+        with self.server.stats_lock:
+            self.server.faults[fault] = self.server.faults.get(fault, 0) + 1
+        if fault == "error":
+            self._send_json(500, {"error": {"message": "Injected internal error", "type": "internal_server_error"}})
+        elif fault == "rate_limited":
+            self._send_json(429, {"error": {"message": "Injected rate limit", "type": "rate_limit_exceeded"}},
+                            {"Retry-After": f"{config.retry_after_seconds:g}"})
+        elif fault == "hang":
+            time.sleep(config.hang_seconds) # Longer than the client's timeout: it gives up first
+            self._send_json(504, {"error": {"message": "Injected hang"}})
+        else:
+            time.sleep(config.slow_ms / 1000)
+            return False # Slow, but still answered normally
+        return True
+
+    def _write_chunk(self, data: bytes):
+        self.wfile.write(f"{len(data):x}\r\n".encode() + data + b"\r\n")
+        self.wfile.flush()
+
+    def do_GET(self):
+        # Model listing, used by the app's Groq health probe
+        if self.path.rstrip("/").endswith("/models"):
+            self._send_json(200, {"object": "list", "data": [{"id": "fake-model", "object": "model", "owned_by": "benchmarks"}]})
+        else:
+            self._send_json(404, {"error": {"message": f"Unknown path {self.path}"}})
+
+    def do_POST(self):
+        if not self.path.rstrip("/").endswith("/chat/completions"):
+            self._send_json(404, {"error": {"message": f"Unknown path {self.path}"}})
+            return
+        length = int(self.headers.get("Content-Length") or 0)
+        try:
+            request = json.loads(self.rfile.read(length) or b"{}")
+        except json.JSONDecodeError:
+            self._send_json(400, {"error": {"message": "Invalid JSON body"}})
+            return
+
+        config = self.server.config
+        with self.server.stats_lock:
+            self.server.requests += 1
+            request_number = self.server.requests
+        rng = random.Random(f"{config.seed}:{request_number}" if config.seed is not None else None)
+        try:
+            if self._inject_fault(config, rng):
+                return
+        except (BrokenPipeError, ConnectionResetError):
+            return # Client gave up on a hung request
+        model = request.get("model", "fake-model")
+        messages = request.get("messages", [])
+        json_mode = (request.get("response_format") or {}).get("type") == "json_object"
+        content = resume_reply(rng) if json_mode else interview_reply(rng, config.completion_tokens)
+        prompt_tokens = estimate_prompt_tokens(messages)
+        completion_tokens = max(len(content) // 4, 1)
+        usage = {"prompt_tokens": prompt_tokens, "completion_tokens": completion_tokens,
+                 "total_tokens": prompt_tokens + completion_tokens}
+        completion_id = f"chatcmpl-{uuid.uuid4().hex[:24]}"
+        created = int(time.time())
+
+        time.sleep(config.latency_ms / 1000) # Time to first token
+        if not request.get("stream"):
+            time.sleep(completion_tokens / config.tokens_per_second)
+            self._send_json(200, {
+                "id": completion_id, "object": "chat.completion", "created": created, "model": model,
+                "choices": [{"index": 0, "message": {"role": "assistant", "content": content}, "finish_reason": "stop"}],
+                "usage": usage
+            })
+            return
+
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        pieces = [content[i:i + 16] for i in range(0, len(content), 16)] # ~4 tokens per chunk
+        delay = 4 / config.tokens_per_second
+        try:
+            for index, piece in enumerate(pieces):
+                delta = {"content": piece}
+                if index == 0:
+                    delta["role"] = "assistant"
+                chunk = {"id": completion_id, "object": "chat.completion.chunk", "created": created, "model": model,
+                         "choices": [{"index": 0, "delta": delta, "finish_reason": None}]}
+                self._write_chunk(f"data: {json.dumps(chunk)}\n\n".encode())
+                time.sleep(delay)
+            final = {"id": completion_id, "object": "chat.completion.chunk", "created": created, "model": model,
+                     "choices": [{"index": 0, "delta": {}, "finish_reason": "stop"}],
+                     "x_groq": {"id": completion_id, "usage": usage}}
+            self._write_chunk(f"data: {json.dumps(final)}\n\n".encode())
+            self._write_chunk(b"data: [DONE]\n\n")
+            self._write_chunk(b"")
+        except (BrokenPipeError, ConnectionResetError):
+            pass # Client cancelled the stream
+
+
+class FakeGroqConfig:
+    def __init__(self, latency_ms=300.0, tokens_per_second=250.0, completion_tokens=80,
+                 error_rate=0.0, rate_limit_rate=0.0, retry_after_seconds=1.0,
+                 hang_rate=0.0, hang_seconds=120.0, slow_rate=0.0, slow_ms=3000.0, seed=None):
+        self.latency_ms = latency_ms
+        self.tokens_per_second = max(tokens_per_second, 1.0)
+        self.completion_tokens = completion_tokens
+        # Fault injection: fractions of requests (checked in this order, at most one per request)
+        self.error_rate = error_rate
+        self.rate_limit_rate = rate_limit_rate
+        self.retry_after_seconds = retry_after_seconds
+        self.hang_rate = hang_rate
+        self.hang_seconds = hang_seconds
+        self.slow_rate = slow_rate
+        self.slow_ms = slow_ms
+        self.seed = seed # Seeds each request's random draws by its sequence number
+
+
+def start_fake_groq(host="127.0.0.1", port=0, config=None):
+    """Starts the server on a daemon thread; returns (server, base_url). Call server.shutdown() to stop."""
+    server = ThreadingHTTPServer((host, port), FakeGroqHandler)
+    server.daemon_threads = True
+    server.config = config or FakeGroqConfig()
+    server.requests = 0
+    server.faults = {} # fault name -> injected count
+    server.stats_lock = threading.Lock()
+    threading.Thread(target=server.serve_forever, name="fake-groq", daemon=True).start()
+    return server, f"http://{host}:{server.server_address[1]}"
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Serve a fake Groq chat-completions API.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8300)
+    parser.add_argument("--latency-ms", type=float, default=300.0, help="Time to first token")
+    parser.add_argument("--tokens-per-second", type=float, default=250.0, help="Generation speed")
+    parser.add_argument("--completion-tokens", type=int, default=80, help="Approximate length of interviewer replies")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fraction of requests answered with HTTP 500")
+    parser.add_argument("--rate-limit-rate", type=float, default=0.0, help="Fraction answered with HTTP 429 + Retry-After")
+    parser.add_argument("--retry-after", type=float, default=1.0, help="Retry-After seconds sent with 429s")
+    parser.add_argument("--hang-rate", type=float, default=0.0, help="Fraction of requests that hang")
+    parser.add_argument("--hang-seconds", type=float, default=120.0)
+    parser.add_argument("--slow-rate", type=float, default=0.0, help="Fraction of requests with extra latency")
+    parser.add_argument("--slow-ms", type=float, default=3000.0)
+    parser.add_argument("--seed", type=int, help="Make injected faults reproducible")
+    args = parser.parse_args(argv)
+
+    config = FakeGroqConfig(args.latency_ms, args.tokens_per_second, args.completion_tokens,
+                            args.error_rate, args.rate_limit_rate, args.retry_after,
+                            args.hang_rate, args.hang_seconds, args.slow_rate, args.slow_ms, args.seed)
+    server, base_url = start_fake_groq(args.host, args.port, config)
+    print(f"Fake Groq API listening on {base_url} (set GROQ_BASE_URL={base_url})", flush=True)
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,393 @@
+# backend/benchmarks/run.py
+# Benchmark harness. Every run prints one JSON document (p50/p95/p99 latency,
+# throughput and the configuration used) so runs can be diffed or stored.
+#
+# Usage (from backend/):
+#   python -m benchmarks.run micro [--iterations 50] [--output micro.json]
+#   python -m benchmarks.run interviews --app-url http://127.0.0.1:5000 --concurrency 16 --interviews 200
+#       (start the app with GROQ_BASE_URL pointing at `python -m benchmarks.fake_groq`,
+#        or pass --fake-groq-port to start one here and point the app at it)
+#   python -m benchmarks.run faults --calls 200 --error-rate 0.2 --rate-limit-rate 0.05 --slow-rate 0.05
+#       (LLM gateway retries/hedging/circuit breaker against a fault-injecting fake Groq API)
+import argparse
+import json
+import os
+import platform
+import statistics
+import sys
+import threading
+import time
+import tracemalloc
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+from benchmarks.synthetic import make_docx, make_pdf, resume_lines
+
+
+# === Statistics ===
+
+def percentile(sorted_values, fraction):
+    """Linear-interpolated percentile of an already sorted list."""
+    if not sorted_values:
+        return None
+    position = (len(sorted_values) - 1) * fraction
+    lower = int(position)
+    upper = min(lower + 1, len(sorted_values) - 1)
+    return sorted_values[lower] + (sorted_values[upper] - sorted_values[lower]) * (position - lower)
+
+
+def summarize(samples_seconds, wall_seconds=None) -> dict:
+    """Latency summary in milliseconds (plus ops/s when the wall time is known)."""
+    values = sorted(samples_seconds)
+    if not values:
+        return {"count": 0}
+    summary = {
+        "count": len(values),
+        "meanMs": round(statistics.fmean(values) * 1000, 3),
+        "p50Ms": round(percentile(values, 0.50) * 1000, 3),
+        "p95Ms": round(percentile(values, 0.95) * 1000, 3),
+        "p99Ms": round(percentile(values, 0.99) * 1000, 3),
+        "maxMs": round(values[-1] * 1000, 3),
+    }
+    total = wall_seconds if wall_seconds is not None else sum(values)
+    summary["opsPerSecond"] = round(len(values) / total, 2) if total > 0 else None
+    return summary
+
+
+def time_calls(fn, iterations, warmup=3) -> dict:
+    for _ in range(warmup):
+        fn()
+    samples = []
+    for _ in range(iterations):
+        started = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - started)
+    return summarize(samples)
+
+
+def peak_memory_mb(fn) -> float:
+    """Peak Python heap allocated during one call, in MB."""
+    tracemalloc.start()
+    try:
+        fn()
+        return round(tracemalloc.get_traced_memory()[1] / 1e6, 3)
+    finally:
+        tracemalloc.stop()
+
+
+def environment() -> dict:
+    return {"python": platform.python_version(), "platform": platform.platform(), "cpus": os.cpu_count()}
+
+
+# === Micro benchmarks ===
+
+SAMPLE_REPLY = ("That's a solid approach. How would you shard that cache across regions?\n\n"
+                "**Feedback:** Good grasp of eviction policies; mention consistency next time. **Score:** 8/10")
+SAMPLE_JSON = json.dumps({"name": "Benchmark Candidate", "skills": ["Python"] * 20,
+                          "experience": [{"title": "Engineer", "company": f"C{i}"} for i in range(8)],
+                          "projects": [{"name": f"P{i}", "description": "x" * 200} for i in range(5)]})
+
+
+def micro_benchmarks(iterations, pdf_pages, docx_sections) -> dict:
+    """Extraction, LLM JSON parsing and score extraction, each in isolation."""
+    results = {}
+
+    def run(name, setup, memory=False):
+        # Each case imports what it measures, so one missing dependency only skips that case
+        try:
+            fn = setup()
+        except ImportError as e:
+            results[name] = {"skipped": f"missing dependency: {e.name}"}
+            return
+        results[name] = time_calls(fn, iterations)
+        if memory:
+            results[name]["peakMemoryMB"] = peak_memory_mb(fn)
+
+    for pages in pdf_pages:
+        pdf_bytes = make_pdf(pages=pages)
+
+        def setup_inline(pdf_bytes=pdf_bytes):
+            from pdf_extract import extract_pdf_text
+            return lambda: extract_pdf_text(pdf_bytes, parallel=False)
+
+        def setup_parallel(pdf_bytes=pdf_bytes):
+            from pdf_extract import extract_pdf_text
+            return lambda: extract_pdf_text(pdf_bytes, parallel=True)
+
+        run(f"pdf_extract_inline_{pages}p", setup_inline)
+        run(f"pdf_extract_parallel_{pages}p", setup_parallel)
+
+    for sections in docx_sections:
+        docx_bytes = make_docx(sections=sections, table_rows=sections * 2, text_boxes=2, header=True)
+
+        def setup_docx_stream(docx_bytes=docx_bytes):
+            from docx_extract import extract_docx_text
+            return lambda: extract_docx_text(docx_bytes)
+
+        def setup_docx_python_docx(docx_bytes=docx_bytes):
+            # The previous path: python-docx object model, body paragraphs only
+            import io
+            from docx import Document
+            return lambda: "\n".join(p.text for p in Document(io.BytesIO(docx_bytes)).paragraphs if p.text.strip())
+
+        run(f"docx_extract_stream_{sections}s", setup_docx_stream, memory=True)
+        run(f"docx_extract_python_docx_{sections}s", setup_docx_python_docx, memory=True)
+
+    def setup_local_extract():
+        from local_extract import extract_local
+        text = "\n".join(resume_lines(sections=12, bullets_per_section=8))
+        return lambda: extract_local(text)
+
+    def setup_json_clean():
+        from resume_parser import parse_llm_json_response
+        return lambda: parse_llm_json_response(SAMPLE_JSON)
+
+    def setup_json_fenced():
+        from resume_parser import parse_llm_json_response
+        fenced = f"Here is the JSON:\n```json\n{SAMPLE_JSON}\n```"
+        return lambda: parse_llm_json_response(fenced)
+
+    def setup_score():
+        from interview_scoring import extract_feedback_and_score
+        return lambda: extract_feedback_and_score(SAMPLE_REPLY, "bench")
+
+    def setup_stream_scan():
+        from interview_scoring import StreamingFeedbackScanner
+        chunks = [SAMPLE_REPLY[i:i + 8] for i in range(0, len(SAMPLE_REPLY), 8)]
+
+        def scan():
+            scanner = StreamingFeedbackScanner()
+            for chunk in chunks:
+                scanner.feed(chunk)
+        return scan
+
+    run("local_extract", setup_local_extract)
+    run("parse_llm_json_clean", setup_json_clean)
+    run("parse_llm_json_fenced", setup_json_fenced)
+    run("extract_feedback_and_score", setup_score)
+    run("streaming_feedback_scanner", setup_stream_scan)
+
+    try:
+        from pdf_extract import shutdown_extraction_pool
+        shutdown_extraction_pool()
+    except ImportError:
+        pass
+    return results
+
+
+# === End-to-end interview load ===
+
+class InterviewLoad:
+    """Drives complete start -> continue x N -> end interviews against a running app."""
+
+    def __init__(self, app_url, turns, stream, timeout):
+        self.app_url = app_url.rstrip("/")
+        self.turns = turns
+        self.stream = stream
+        self.timeout = timeout
+        self.samples = {} # step name -> [seconds]
+        self.errors = {} # "step:status" -> count
+        self._lock = threading.Lock()
+
+    def _record(self, step, seconds=None, error=None):
+        with self._lock:
+            if error is not None:
+                key = f"{step}:{error}"
+                self.errors[key] = self.errors.get(key, 0) + 1
+            else:
+                self.samples.setdefault(step, []).append(seconds)
+
+    def _post(self, path, payload):
+        """POSTs JSON; returns (parsed body or None, seconds, time to first byte)."""
+        request = urllib.request.Request(
+            f"{self.app_url}{path}", data=json.dumps(payload).encode(),
+            headers={"Content-Type": "application/json"}, method="POST"
+        )
+        started = time.perf_counter()
+        with urllib.request.urlopen(request, timeout=self.timeout) as response:
+            first = response.read(1)
+            first_byte = time.perf_counter() - started
+            body = first + response.read()
+        elapsed = time.perf_counter() - started
+        if response.headers.get_content_type() == "text/event-stream":
+            return self._last_sse_data(body), elapsed, first_byte
+        return json.loads(body), elapsed, first_byte
+
+    @staticmethod
+    def _last_sse_data(body):
+        """The payload of the final SSE event carrying an interviewId/message (the 'done' event)."""
+        result = {}
+        for line in body.decode().splitlines():
+            if line.startswith("data:"):
+                try:
+                    data = json.loads(line[5:].strip())
+                except json.JSONDecodeError:
+                    continue
+                if isinstance(data, dict):
+                    result.update(data)
+        return result
+
+    def _step(self, step, path, payload):
+        try:
+            body, elapsed, first_byte = self._post(path, payload)
+        except urllib.error.HTTPError as e:
+            self._record(step, error=e.code)
+            return None
+        except Exception as e:
+            self._record(step, error=type(e).__name__)
+            return None
+        self._record(step, elapsed)
+        if self.stream:
+            self._record(f"{step}_first_byte", first_byte)
+        return body
+
+    def run_one(self, index):
+        started = time.perf_counter()
+        suffix = "/stream" if self.stream else ""
+        user_id = f"{index:024x}" # Valid ObjectId hex; one synthetic user per interview
+        resume_data = {"name": f"Candidate {index}", "skills": ["Python", "MongoDB", "Redis"],
+                       "experience": [{"title": "Engineer"}], "projects": [{"name": "Search"}]}
+        body = self._step("start", f"/start-interview{suffix}", {"resumeData": resume_data, "userId": user_id})
+        interview_id = (body or {}).get("interviewId")
+        if not interview_id:
+            return
+        for turn in range(self.turns):
+            answer = f"Answer {turn}: I would profile first, then add a cache in front of the slow query."
+            if self._step("continue", f"/continue-interview{suffix}", {"interviewId": interview_id, "userResponse": answer}) is None:
+                return
+        if self._step("end", "/end-interview", {"interviewId": interview_id}) is not None:
+            self._record("interview", time.perf_counter() - started)
+
+    def run(self, interviews, concurrency) -> dict:
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            list(pool.map(self.run_one, range(interviews)))
+        wall = time.perf_counter() - started
+        requests_ok = sum(len(v) for k, v in self.samples.items() if k in ("start", "continue", "end"))
+        return {
+            "wallSeconds": round(wall, 3),
+            "interviewsPerSecond": round(len(self.samples.get("interview", [])) / wall, 3) if wall else None,
+            "requestsPerSecond": round(requests_ok / wall, 2) if wall else None,
+            "steps": {step: summarize(values) for step, values in sorted(self.samples.items())},
+            "errors": self.errors,
+        }
+
+
+# === LLM gateway under injected faults ===
+
+def fault_benchmark(calls, concurrency, config) -> dict:
+    """Drives gateway completions against a local fake Groq API that injects faults."""
+    from benchmarks.fake_groq import start_fake_groq
+    from llm_gateway import LLMGateway
+
+    fake_server, base_url = start_fake_groq(config=config)
+    gateway = LLMGateway(api_key="benchmark", base_url=base_url)
+    samples, errors = [], {}
+    lock = threading.Lock()
+
+    def call(index):
+        started = time.perf_counter()
+        try:
+            gateway.complete(model="fake-model", messages=[{"role": "user", "content": f"Question {index}"}], temperature=0.6)
+        except Exception as e:
+            with lock:
+                errors[type(e).__name__] = errors.get(type(e).__name__, 0) + 1
+            return
+        with lock:
+            samples.append(time.perf_counter() - started)
+
+    started = time.perf_counter()
+    try:
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            list(pool.map(call, range(calls)))
+        wall = time.perf_counter() - started
+        return {
+            "succeeded": len(samples),
+            "errors": errors,
+            "latency": summarize(samples, wall),
+            "upstreamRequests": fake_server.requests,
+            "injectedFaults": fake_server.faults,
+            "gateway": gateway.stats(),
+        }
+    finally:
+        gateway.close()
+        fake_server.shutdown()
+
+
+# === CLI ===
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Resume parser / interview benchmarks (JSON output).")
+    parser.add_argument("--output", help="Write the JSON report to this file instead of stdout")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    micro = sub.add_parser("micro", help="Extraction, JSON parsing and score extraction micro-benchmarks")
+    micro.add_argument("--iterations", type=int, default=50)
+    micro.add_argument("--pdf-pages", type=int, nargs="+", default=[1, 4, 16])
+    micro.add_argument("--docx-sections", type=int, nargs="+", default=[4, 16, 64])
+
+    load = sub.add_parser("interviews", help="Full interviews against a running app")
+    load.add_argument("--app-url", default="http://127.0.0.1:5000")
+    load.add_argument("--interviews", type=int, default=50)
+    load.add_argument("--concurrency", type=int, default=8)
+    load.add_argument("--turns", type=int, default=3, help="continue-interview calls per interview")
+    load.add_argument("--stream", action="store_true", help="Use the SSE variants of start/continue")
+    load.add_argument("--timeout", type=float, default=120.0)
+    load.add_argument("--fake-groq-port", type=int, help="Also start the fake Groq API on this port")
+    load.add_argument("--latency-ms", type=float, default=300.0, help="Fake Groq time to first token")
+    load.add_argument("--tokens-per-second", type=float, default=250.0, help="Fake Groq generation speed")
+
+    faults = sub.add_parser("faults", help="LLM gateway retries, hedging and circuit breaker against injected faults")
+    faults.add_argument("--calls", type=int, default=200)
+    faults.add_argument("--concurrency", type=int, default=16)
+    faults.add_argument("--latency-ms", type=float, default=200.0)
+    faults.add_argument("--tokens-per-second", type=float, default=1000.0)
+    faults.add_argument("--error-rate", type=float, default=0.1)
+    faults.add_argument("--rate-limit-rate", type=float, default=0.05)
+    faults.add_argument("--retry-after", type=float, default=0.5)
+    faults.add_argument("--hang-rate", type=float, default=0.0)
+    faults.add_argument("--hang-seconds", type=float, default=60.0)
+    faults.add_argument("--slow-rate", type=float, default=0.05)
+    faults.add_argument("--slow-ms", type=float, default=2000.0)
+    args = parser.parse_args(argv)
+
+    report = {"benchmark": args.command, "startedAt": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+              "environment": environment()}
+    if args.command == "micro":
+        report["config"] = {"iterations": args.iterations, "pdfPages": args.pdf_pages, "docxSections": args.docx_sections}
+        report["results"] = micro_benchmarks(args.iterations, args.pdf_pages, args.docx_sections)
+    elif args.command == "faults":
+        from benchmarks.fake_groq import FakeGroqConfig
+        report["config"] = {key: getattr(args, key) for key in
+                            ("calls", "concurrency", "latency_ms", "error_rate", "rate_limit_rate", "retry_after",
+                             "hang_rate", "hang_seconds", "slow_rate", "slow_ms")}
+        config = FakeGroqConfig(args.latency_ms, args.tokens_per_second, 80, args.error_rate, args.rate_limit_rate,
+                                args.retry_after, args.hang_rate, args.hang_seconds, args.slow_rate, args.slow_ms)
+        report["results"] = fault_benchmark(args.calls, args.concurrency, config)
+    else:
+        fake_server = None
+        if args.fake_groq_port:
+            from benchmarks.fake_groq import FakeGroqConfig, start_fake_groq
+            fake_server, base_url = start_fake_groq(port=args.fake_groq_port, config=FakeGroqConfig(args.latency_ms, args.tokens_per_second))
+            print(f"Fake Groq API on {base_url}; the app must run with GROQ_BASE_URL={base_url}", file=sys.stderr)
+        report["config"] = {key: getattr(args, key) for key in
+                            ("app_url", "interviews", "concurrency", "turns", "stream", "latency_ms", "tokens_per_second")}
+        try:
+            report["results"] = InterviewLoad(args.app_url, args.turns, args.stream, args.timeout).run(args.interviews, args.concurrency)
+        finally:
+            if fake_server is not None:
+                report["fakeGroqRequests"] = fake_server.requests
+                fake_server.shutdown()
+
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(output + "\n")
+    else:
+        print(output)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,134 @@
+# backend/benchmarks/synthetic.py
+# Deterministic synthetic resumes as PDF and DOCX bytes, written by hand (no
+# reportlab/python-docx needed to generate them) so benchmark inputs are
+# identical on every machine.
+import io
+import random
+import zipfile
+
+SKILLS = ["Python", "Flask", "Django", "MongoDB", "PostgreSQL", "Redis", "Docker", "Kubernetes", "AWS", "GCP",
+          "React", "TypeScript", "Go", "Rust", "Kafka", "Spark", "Terraform", "GraphQL", "CI/CD", "Linux"]
+VERBS = ["Built", "Designed", "Led", "Optimized", "Migrated", "Automated", "Scaled", "Shipped", "Refactored", "Owned"]
+OBJECTS = ["a payment service", "the search backend", "an ETL pipeline", "the mobile API", "a recommendation engine",
+           "the auth platform", "an internal dashboard", "the billing system", "a data warehouse", "the CI pipeline"]
+OUTCOMES = ["cutting p95 latency by 40%", "serving 2M requests per day", "reducing cloud spend by 25%",
+            "with zero downtime", "for 12 enterprise customers", "improving conversion by 8%"]
+
+
+def resume_lines(sections=6, bullets_per_section=6, seed=0) -> list:
+    """Plain-text resume lines; size grows with sections x bullets."""
+    rng = random.Random(seed)
+    lines = [f"Candidate {seed}", f"candidate{seed}@example.com | +1 555 0100 | github.com/candidate{seed}", "",
+             "SKILLS", ", ".join(rng.sample(SKILLS, 10)), ""]
+    for section in range(sections):
+        lines.append("EXPERIENCE" if section == 0 else f"Company {section} - Senior Engineer (201{section % 10} - 202{section % 5})")
+        for _ in range(bullets_per_section):
+            lines.append(f"- {rng.choice(VERBS)} {rng.choice(OBJECTS)} {rng.choice(OUTCOMES)} using {rng.choice(SKILLS)}.")
+        lines.append("")
+    lines.extend(["PROJECTS", f"- Open-source {rng.choice(SKILLS)} toolkit with {rng.randint(50, 900)} stars.",
+                  "", "EDUCATION", "B.Sc. Computer Science"])
+    return lines
+
+
+def _pdf_escape(text: str) -> str:
+    return text.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+
+
+def make_pdf(pages=2, lines_per_page=45, seed=0) -> bytes:
+    """A valid multi-page PDF with Helvetica text (extractable by PyPDF2)."""
+    source = resume_lines(sections=max(pages * 3, 1), bullets_per_section=8, seed=seed)
+    page_lines = []
+    for page in range(pages):
+        chunk = [source[(page * lines_per_page + i) % len(source)] for i in range(lines_per_page)]
+        page_lines.append(chunk)
+
+    objects = [] # Object bodies, numbered from 1
+    objects.append(b"<< /Type /Catalog /Pages 2 0 R >>")
+    objects.append(None) # Pages, filled in once kids are known
+    objects.append(b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>")
+    kids = []
+    for chunk in page_lines:
+        text_ops = ["BT", "/F1 10 Tf", "12 TL", "50 770 Td"]
+        text_ops.extend(f"({_pdf_escape(line)}) '" for line in chunk)
+        text_ops.append("ET")
+        stream = "\n".join(text_ops).encode("latin-1", "replace")
+        objects.append(b"<< /Length %d >>\nstream\n" % len(stream) + stream + b"\nendstream")
+        content_number = len(objects)
+        objects.append(b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] /Resources << /Font << /F1 3 0 R >> >> /Contents %d 0 R >>" % content_number)
+        kids.append(len(objects))
+    objects[1] = b"<< /Type /Pages /Kids [" + b" ".join(b"%d 0 R" % k for k in kids) + b"] /Count %d >>" % len(kids)
+
+    out = io.BytesIO()
+    out.write(b"%PDF-1.4\n")
+    offsets = []
+    for number, body in enumerate(objects, start=1):
+        offsets.append(out.tell())
+        out.write(b"%d 0 obj\n" % number + body + b"\nendobj\n")
+    xref_at = out.tell()
+    out.write(b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1))
+    for offset in offsets:
+        out.write(b"%010d 00000 n \n" % offset)
+    out.write(b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objects) + 1, xref_at))
+    return out.getvalue()
+
+
+_CONTENT_TYPES = """<?xml version="1.0" encoding="UTF-8" standalone="yes"?>
+<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">
+<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>
+<Default Extension="xml" ContentType="application/xml"/>
+<Override PartName="/word/document.xml" ContentType="application/vnd.openxmlformats-officedocument.wordprocessingml.document.main+xml"/>
+<Override PartName="/word/header1.xml" ContentType="application/vnd.openxmlformats-officedocument.wordprocessingml.header+xml"/>
+</Types>"""
+_ROOT_RELS = """<?xml version="1.0" encoding="UTF-8" standalone="yes"?>
+<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">
+<Relationship Id="rId1" Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument" Target="word/document.xml"/>
+</Relationships>"""
+_W_NS = "http://schemas.openxmlformats.org/wordprocessingml/2006/main"
+_MC_NS = "http://schemas.openxmlformats.org/markup-compatibility/2006"
+_WPS_NS = "http://schemas.microsoft.com/office/word/2010/wordprocessingShape"
+_V_NS = "urn:schemas-microsoft-com:vml"
+
+
+def _xml_escape(text: str) -> str:
+    return text.replace("&", "&amp;").replace("<", "&lt;").replace(">", "&gt;")
+
+
+def _paragraph(text: str) -> str:
+    return f'<w:p><w:r><w:t xml:space="preserve">{_xml_escape(text)}</w:t></w:r></w:p>'
+
+
+def _text_box(text: str) -> str:
+    """A paragraph anchoring a text box, with the VML fallback copy Word also writes."""
+    content = f"<w:txbxContent>{_paragraph(text)}</w:txbxContent>"
+    return (f'<w:p><w:r><mc:AlternateContent><mc:Choice Requires="wps"><w:drawing><wps:txbx>{content}</wps:txbx>'
+            f'</w:drawing></mc:Choice><mc:Fallback><w:pict><v:textbox>{content}</v:textbox></w:pict></mc:Fallback>'
+            f'</mc:AlternateContent></w:r></w:p>')
+
+
+def make_docx(sections=6, bullets_per_section=6, table_rows=0, text_boxes=0, header=False, seed=0) -> bytes:
+    """
+    A minimal valid DOCX. table_rows adds a skills table, text_boxes adds text boxes and
+    header adds a header part: text that walking python-docx paragraphs misses.
+    """
+    body = [_paragraph(line) for line in resume_lines(sections, bullets_per_section, seed)]
+    for index in range(text_boxes):
+        body.insert(1, _text_box(f"Text box {index}: Certified Kubernetes Administrator"))
+    if table_rows:
+        rng = random.Random(seed)
+        rows = "".join(
+            "<w:tr>" + "".join(f"<w:tc>{_paragraph(cell)}</w:tc>" for cell in (rng.choice(SKILLS), f"{rng.randint(1, 10)} years")) + "</w:tr>"
+            for _ in range(table_rows)
+        )
+        body.append(f"<w:tbl>{rows}</w:tbl>")
+    document = (f'<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+                f'<w:document xmlns:w="{_W_NS}" xmlns:mc="{_MC_NS}" xmlns:wps="{_WPS_NS}" xmlns:v="{_V_NS}">'
+                f'<w:body>{"".join(body)}</w:body></w:document>')
+    out = io.BytesIO()
+    with zipfile.ZipFile(out, "w", zipfile.ZIP_DEFLATED) as archive:
+        archive.writestr("[Content_Types].xml", _CONTENT_TYPES)
+        archive.writestr("_rels/.rels", _ROOT_RELS)
+        archive.writestr("word/document.xml", document)
+        if header:
+            archive.writestr("word/header1.xml", f'<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+                                                 f'<w:hdr xmlns:w="{_W_NS}">{_paragraph(f"Candidate {seed} - Resume - Page header")}</w:hdr>')
+    return out.getvalue()
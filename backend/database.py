@@ -1,20 +1,26 @@
 # backend/database.py
-from pymongo import MongoClient
+from pymongo import ASCENDING, DESCENDING, InsertOne, MongoClient, UpdateOne
+from pymongo.errors import BulkWriteError
 from pymongo.server_api import ServerApi
 import os
 from dotenv import load_dotenv
 import logging
 import atexit # Import atexit here
+import base64
+import json
+import threading
+import time
+from collections import OrderedDict, defaultdict
 from bson import ObjectId
-from datetime import datetime
-import logging
-# Setup logging
-logging.basicConfig(level=logging.DEBUG)
-logger = logging.getLogger(__name__)
-
+from datetime import datetime, timedelta, timezone
+from metrics import time_stage
 # Load environment variables
 load_dotenv()
 
+# Setup logging
+logging.basicConfig(level=os.getenv("LOG_LEVEL", "INFO").upper())
+logger = logging.getLogger(__name__)
+
 # --- Globals for the single client and db instance ---
 client = None
 db = None
@@ -27,8 +33,14 @@ chats_collection = None
 # Get MongoDB connection string (keep this)
 MONGODB_URI = os.getenv("MONGODB_URI", "mongodb://localhost:27017/resumeparser") # Added default for safety
 
+_connect_lock = threading.Lock()
+
 def connect_db():
     """Creates the single MongoDB client and db connection."""
+    with _connect_lock: # Concurrent first requests must not build several clients
+        return _connect_db_locked()
+
+def _connect_db_locked():
     global client, db, users_collection, resumes_collection, interviews_collection, chats_collection
 
     if client: # Avoid reconnecting if already connected
@@ -72,11 +84,25 @@ def connect_db():
         db = None
         raise # Re-raise the exception to signal failure
 
+def ensure_connected():
+    """Connects on first use, so importing the app never blocks on MongoDB. Raises if unreachable."""
+    if db is None:
+        connect_db()
+
+def is_connected() -> bool:
+    """True once a connection has been established (does not ping)."""
+    return client is not None and db is not None
+
 def close_db_connection():
     """Closes the MongoDB connection."""
     global client
     if client:
+        try:
+            write_buffer.flush() # Don't lose buffered writes on shutdown
+        except Exception as e:
+            logger.error(f"Could not flush buffered writes before closing: {e}")
         client.close()
+        client = None # Makes a second call (e.g. from atexit after a worker shutdown hook) a no-op
         logger.info("MongoDB connection closed.")
 
 # Register the close function to run on exit
@@ -86,7 +112,7 @@ atexit.register(close_db_connection)
 # Ensure collections exist (Check if db exists first)
 def ensure_collections_exist():
     """Create collections if they don't exist"""
-    if not db:
+    if db is None:
         logger.error("Database not connected. Cannot ensure collections.")
         raise Exception("Database not connected")
     try:
@@ -104,12 +130,13 @@ def ensure_collections_exist():
 # Apply schema validations (Check if db exists first)
 def apply_schema_validations():
     """Apply schema validations to all collections"""
-    if not db:
+    if db is None:
         logger.error("Database not connected. Cannot apply schemas.")
         raise Exception("Database not connected")
     try:
+        existing_collections = set(db.list_collection_names()) # One round-trip for all four checks
         # --- Users Collection (ensure it exists before collMod) ---
-        if 'users' in db.list_collection_names():
+        if 'users' in existing_collections:
             db.command({
                 'collMod': 'users',
                 'validator': { # Your user schema here
@@ -133,7 +160,7 @@ def apply_schema_validations():
 
 
         # --- Resumes Collection (ensure it exists before collMod) ---
-        if 'resumes' in db.list_collection_names():
+        if 'resumes' in existing_collections:
             db.command({
                 'collMod': 'resumes',
                 'validator': { # Your resume schema here
@@ -150,10 +177,13 @@ def apply_schema_validations():
                                     'skills': {'bsonType': 'array', 'items': {'bsonType': 'string'}},
                                     'experience': {'bsonType': 'array', 'items': {'bsonType': 'object'}},
                                     'projects': {'bsonType': 'array', 'items': {'bsonType': 'object'}},
-                                    'education': {'bsonType': 'array', 'items': {'bsonType': 'object'}}
+                                    'education': {'bsonType': 'array', 'items': {'bsonType': 'object'}},
+                                    'contact': {'bsonType': 'object'} # Filled by local pre-extraction
                                  }
                              },
-                            'uploadedAt': {'bsonType': 'date'}
+                            'uploadedAt': {'bsonType': 'date'},
+                            'contentHash': {'bsonType': 'string'},
+                            'parseCacheKey': {'bsonType': 'string'}
                         }
                     }
                 }
@@ -162,7 +192,7 @@ def apply_schema_validations():
             logger.warning("Collection 'resumes' not found, skipping schema validation.")
 
         # --- Interviews Collection (ensure it exists before collMod) ---
-        if 'interviews' in db.list_collection_names():
+        if 'interviews' in existing_collections:
              db.command({
                 'collMod': 'interviews',
                  'validator': { # Your interview schema here
@@ -175,6 +205,7 @@ def apply_schema_validations():
                             'date': {'bsonType': 'date'},
                             'finalScore': {'bsonType': ['int', 'null']}, # Allow null if not always present
                             'status': {'bsonType': 'string'},
+                            'skills': {'bsonType': 'array', 'items': {'bsonType': 'string'}},
                             'questions': {
                                 'bsonType': 'array',
                                 'items': {
@@ -209,7 +240,7 @@ def apply_schema_validations():
              logger.warning("Collection 'interviews' not found, skipping schema validation.")
 
         # --- Chats Collection (ensure it exists before collMod) ---
-        if 'chats' in db.list_collection_names():
+        if 'chats' in existing_collections:
             db.command({
                 'collMod': 'chats',
                  'validator': { # Your chat schema here
@@ -244,23 +275,303 @@ def apply_schema_validations():
         # Decide if you want to raise the error or just log it
         # raise
 
+# --- Index provisioning ---
+# Declarative index spec: (collection, keys, options). create_index is idempotent,
+# so this runs on every startup; a changed spec with the same name fails loudly.
+INDEX_SPECS = [
+    ('users', [('email', ASCENDING)], {'name': 'email_unique', 'unique': True}),
+    ('resumes', [('userId', ASCENDING), ('uploadedAt', DESCENDING), ('_id', DESCENDING)], {'name': 'userId_uploadedAt_id'}), # Keyset pagination
+    ('resumes', [('parseCacheKey', ASCENDING), ('uploadedAt', DESCENDING)], {'name': 'parseCacheKey_uploadedAt'}), # Persistent parse cache tier
+    ('resumes', [('uploadedAt', ASCENDING)], {'name': 'simhash_uploadedAt', 'partialFilterExpression': {'simhash': {'$exists': True}}}), # Near-duplicate index loads
+    ('interviews', [('interviewId', ASCENDING)], {'name': 'interviewId_unique', 'unique': True}),
+    ('interviews', [('userId', ASCENDING), ('date', DESCENDING), ('_id', DESCENDING)], {'name': 'userId_date_id'}), # Keyset pagination
+    ('chats', [('interviewId', ASCENDING)], {'name': 'interviewId'}),
+    ('interview_rollups', [('scope', ASCENDING), ('key', ASCENDING), ('day', ASCENDING)], {'name': 'scope_key_day'}), # Analytics buckets
+]
+
+# Hot queries that must be served by an index: (collection, filter, sort)
+HOT_QUERY_SHAPES = [
+    ('users', {'email': 'plan-check@example.com'}, None),
+    ('resumes', {'userId': ObjectId('000000000000000000000000')}, [('uploadedAt', DESCENDING), ('_id', DESCENDING)]),
+    ('resumes', {'parseCacheKey': 'plan-check'}, [('uploadedAt', DESCENDING)]),
+    ('resumes', {'simhash': {'$exists': True}, 'uploadedAt': {'$gt': datetime(2000, 1, 1)}}, [('uploadedAt', ASCENDING)]),
+    ('interviews', {'interviewId': 'plan-check'}, None),
+    ('interviews', {'userId': ObjectId('000000000000000000000000')}, [('date', DESCENDING), ('_id', DESCENDING)]),
+    ('chats', {'interviewId': 'plan-check'}, None),
+    ('chats', {'userId': ObjectId('000000000000000000000000'), 'interviewId': 'plan-check'}, None),
+    ('interview_rollups', {'scope': 'user', 'key': 'plan-check', 'day': {'$gte': '2000-01-01'}}, [('day', ASCENDING)]),
+]
+
+DB_CHECK_QUERY_PLANS = os.getenv("DB_CHECK_QUERY_PLANS", "True").lower() == "true"
+
+def ensure_indexes():
+    """Create every index in INDEX_SPECS (no-op for indexes that already exist)"""
+    if db is None:
+        raise Exception("Database not connected")
+    for collection_name, keys, options in INDEX_SPECS:
+        try:
+            db[collection_name].create_index(keys, **options)
+        except Exception as e:
+            # Typically duplicate values under a unique index, or a conflicting existing index
+            logger.error(f"Could not create index {options.get('name')} on '{collection_name}': {e}")
+            raise
+    logger.info(f"Ensured {len(INDEX_SPECS)} indexes.")
+
+def _plan_stages(plan):
+    """Yields every stage name in an explain() plan tree"""
+    if isinstance(plan, dict):
+        if 'stage' in plan:
+            yield plan['stage']
+        for value in plan.values():
+            yield from _plan_stages(value)
+    elif isinstance(plan, list):
+        for value in plan:
+            yield from _plan_stages(value)
+
+def check_query_plans():
+    """Explain each hot query and raise if any winning plan is a collection scan"""
+    if db is None:
+        raise Exception("Database not connected")
+    scans = []
+    for collection_name, query, sort in HOT_QUERY_SHAPES:
+        cursor = db[collection_name].find(query)
+        if sort:
+            cursor = cursor.sort(sort)
+        winning_plan = cursor.explain().get('queryPlanner', {}).get('winningPlan', {})
+        stages = set(_plan_stages(winning_plan))
+        logger.debug(f"Query plan for {collection_name} {list(query)}: {sorted(stages)}")
+        if 'COLLSCAN' in stages:
+            scans.append(f"{collection_name} {list(query)}")
+    if scans:
+        raise Exception(f"Hot queries fall back to COLLSCAN: {', '.join(scans)}")
+    logger.info(f"Query plan check passed for {len(HOT_QUERY_SHAPES)} hot queries.")
+
+# --- Write-behind buffering ---
+# Writes that don't need to be acknowledged before the request returns are queued
+# here and sent as unordered bulk_write batches, one round-trip per collection,
+# when WRITE_BUFFER_MAX_OPS are pending or every WRITE_BUFFER_FLUSH_INTERVAL seconds.
+# Chat message pushes for the same chat are merged before flushing, so message
+# order is preserved even though the batch itself is unordered.
+
+WRITE_BEHIND_ENABLED = os.getenv("DB_WRITE_BEHIND", "True").lower() == "true"
+WRITE_BUFFER_MAX_OPS = int(os.getenv("WRITE_BUFFER_MAX_OPS", "500"))
+WRITE_BUFFER_FLUSH_INTERVAL = float(os.getenv("WRITE_BUFFER_FLUSH_INTERVAL", "1.0"))
+
+class WriteBehindBuffer:
+    """Buffers inserts and chat-message upserts and flushes them with bulk_write."""
+
+    def __init__(self, max_ops=WRITE_BUFFER_MAX_OPS, flush_interval=WRITE_BUFFER_FLUSH_INTERVAL):
+        self.max_ops = max_ops
+        self.flush_interval = flush_interval
+        self._inserts = defaultdict(list) # collection name -> [documents]
+        self._pushes = OrderedDict() # (collection name, filter key) -> [filter, setOnInsert, messages]
+        self._ops = defaultdict(list) # collection name -> [other write operations]
+        self._pending = 0
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock() # One flush at a time
+        self._wakeup = threading.Event()
+        self._thread = None
+        # Metrics
+        self.flushes = 0
+        self.ops_flushed = 0
+        self.write_errors = 0
+        self.failed_flushes = 0
+        self.last_flush_ms = 0.0
+        self.max_flush_ms = 0.0
+        self.total_flush_ms = 0.0
+
+    def _ensure_thread(self):
+        if self._thread is None or not self._thread.is_alive():
+            self._thread = threading.Thread(target=self._run, name="db-write-behind", daemon=True)
+            self._thread.start()
+
+    def _run(self):
+        while True:
+            self._wakeup.wait(self.flush_interval)
+            self._wakeup.clear()
+            try:
+                self.flush()
+            except Exception as e:
+                logger.error(f"Write-behind flush failed: {e}")
+
+    def _added(self, count=1):
+        """Bookkeeping after enqueuing (lock held by caller)."""
+        self._pending += count
+        if self._pending >= self.max_ops:
+            self._wakeup.set() # Flush now on the background thread, not on the caller's
+
+    def insert(self, collection_name, document):
+        """Queues an insert. An _id is assigned up front, as insert_one would."""
+        document.setdefault('_id', ObjectId())
+        with self._lock:
+            self._inserts[collection_name].append(document)
+            self._added()
+            self._ensure_thread()
+        return document['_id']
+
+    def enqueue(self, collection_name, operations):
+        """Queues arbitrary write operations (UpdateOne etc.) whose order doesn't matter."""
+        with self._lock:
+            self._ops[collection_name].extend(operations)
+            self._added(len(operations))
+            self._ensure_thread()
+
+    def push_messages(self, collection_name, filter_doc, messages, set_on_insert):
+        """Queues an upsert that appends messages to the document matching filter_doc."""
+        key = (collection_name, tuple(sorted((k, str(v)) for k, v in filter_doc.items())))
+        with self._lock:
+            entry = self._pushes.get(key)
+            if entry is None:
+                self._pushes[key] = [filter_doc, set_on_insert, list(messages)]
+                self._added()
+            else:
+                entry[2].extend(messages) # Merged into the pending upsert, keeping message order
+            self._ensure_thread()
+
+    def pending(self) -> int:
+        with self._lock:
+            return self._pending
+
+    def flush(self):
+        """Writes everything buffered so far. Safe to call from any thread."""
+        with self._flush_lock:
+            with self._lock:
+                inserts, self._inserts = self._inserts, defaultdict(list)
+                pushes, self._pushes = self._pushes, OrderedDict()
+                other_ops, self._ops = self._ops, defaultdict(list)
+                count, self._pending = self._pending, 0
+            if not count:
+                return 0
+            if db is None:
+                logger.error(f"Write-behind flush skipped: DB not initialized ({count} operations kept).")
+                self._requeue(inserts, pushes, other_ops)
+                return 0
+
+            operations = defaultdict(list)
+            for collection_name, documents in inserts.items():
+                operations[collection_name].extend(InsertOne(doc) for doc in documents)
+            for (collection_name, _), (filter_doc, set_on_insert, messages) in pushes.items():
+                update = {"$push": {"messages": {"$each": messages}}}
+                if set_on_insert:
+                    update["$setOnInsert"] = set_on_insert
+                operations[collection_name].append(UpdateOne(filter_doc, update, upsert=True))
+            for collection_name, ops in other_ops.items():
+                operations[collection_name].extend(ops)
+
+            started = time.perf_counter()
+            written = set() # Collections whose bulk_write was applied (fully or with per-document errors)
+            written_count = 0
+            try:
+                for collection_name, ops in operations.items():
+                    try:
+                        with time_stage("db_write", f"bulk:{collection_name}"):
+                            db[collection_name].bulk_write(ops, ordered=False)
+                    except BulkWriteError as bwe:
+                        # The rest of the batch was applied; only the listed documents failed
+                        errors = bwe.details.get('writeErrors', [])
+                        self.write_errors += len(errors)
+                        logger.error(f"Write-behind flush to '{collection_name}' had {len(errors)} write errors: {errors[:3]}")
+                    written.add(collection_name)
+                    written_count += len(ops)
+            except Exception as e:
+                # Connection-level failure: keep the unwritten collections' operations for the next
+                # flush (re-running written ones would duplicate $push messages and inserts)
+                self.failed_flushes += 1
+                self.ops_flushed += written_count
+                logger.error(f"Write-behind flush failed, requeueing {count - written_count} operations: {e}")
+                self._requeue(
+                    {name: docs for name, docs in inserts.items() if name not in written},
+                    OrderedDict((key, entry) for key, entry in pushes.items() if key[0] not in written),
+                    {name: ops for name, ops in other_ops.items() if name not in written}
+                )
+                raise
+            finally:
+                elapsed_ms = (time.perf_counter() - started) * 1000
+                self.flushes += 1
+                self.last_flush_ms = elapsed_ms
+                self.max_flush_ms = max(self.max_flush_ms, elapsed_ms)
+                self.total_flush_ms += elapsed_ms
+            self.ops_flushed += count
+            logger.debug(f"Write-behind flushed {count} operations in {elapsed_ms:.1f} ms.")
+            return count
+
+    def _requeue(self, inserts, pushes, other_ops):
+        """Puts unflushed operations back in front of anything queued meanwhile."""
+        with self._lock:
+            for collection_name, documents in inserts.items():
+                self._inserts[collection_name][:0] = documents
+            for key, (filter_doc, set_on_insert, messages) in pushes.items():
+                entry = self._pushes.get(key)
+                if entry is None:
+                    self._pushes[key] = [filter_doc, set_on_insert, messages]
+                else:
+                    entry[2][:0] = messages
+            for collection_name, ops in other_ops.items():
+                self._ops[collection_name][:0] = ops
+            self._pending = (sum(len(docs) for docs in self._inserts.values()) + len(self._pushes)
+                             + sum(len(ops) for ops in self._ops.values()))
+
+    def stats(self) -> dict:
+        """Flush latency and throughput metrics."""
+        with self._lock:
+            pending = self._pending
+        return {
+            "pendingOperations": pending,
+            "flushes": self.flushes,
+            "operationsFlushed": self.ops_flushed,
+            "writeErrors": self.write_errors,
+            "failedFlushes": self.failed_flushes,
+            "lastFlushMs": round(self.last_flush_ms, 2),
+            "maxFlushMs": round(self.max_flush_ms, 2),
+            "avgFlushMs": round(self.total_flush_ms / self.flushes, 2) if self.flushes else 0.0,
+        }
+
+write_buffer = WriteBehindBuffer()
+
+def _use_buffer(sync):
+    """sync=None follows DB_WRITE_BEHIND; True forces an acknowledged write."""
+    return WRITE_BEHIND_ENABLED if sync is None else not sync
+
+def bulk_write_behind(collection_name, operations, sync=None):
+    """Unordered bulk write of arbitrary operations, through the write-behind buffer unless sync=True"""
+    if db is None:
+        ensure_connected() # Lazy connect on first use
+    if not operations:
+        return None
+    if _use_buffer(sync):
+        return write_buffer.enqueue(collection_name, operations)
+    try:
+        with time_stage("db_write", f"bulk:{collection_name}"):
+            return db[collection_name].bulk_write(operations, ordered=False)
+    except Exception as e:
+        logger.error(f"Error bulk-writing {len(operations)} operations to '{collection_name}': {e}")
+        raise
+
+def flush_writes():
+    """Flushes the write-behind buffer now (e.g. before shutdown)."""
+    return write_buffer.flush()
+
 # --- Helper Functions --- 
 # Adding the missing functions that app.py is trying to import
 
-def save_interview(interview_data):
-    """Save a new interview document to the database"""
-    if not interviews_collection: 
-        raise Exception("DB not initialized")
+def save_interview(interview_data, sync=None):
+    """Save a new interview document to the database.
+    Buffered (returns the pre-assigned _id) unless sync=True or write-behind is off."""
+    if interviews_collection is None:
+        ensure_connected() # Lazy connect on first use
     try:
-        return interviews_collection.insert_one(interview_data)
+        if _use_buffer(sync):
+            return write_buffer.insert('interviews', interview_data)
+        with time_stage("db_write", "interviews"):
+            return interviews_collection.insert_one(interview_data)
     except Exception as e:
         logger.error(f"Error saving interview: {e}")
         raise
 
 def get_interview(interview_id):
     """Retrieve a single interview by ID"""
-    if not interviews_collection:
-        raise Exception("DB not initialized")
+    if interviews_collection is None:
+        ensure_connected() # Lazy connect on first use
     try:
         # Handle both string and ObjectId types for interview_id
         if isinstance(interview_id, str) and len(interview_id) == 24:
@@ -280,25 +591,20 @@ def get_interview(interview_id):
         logger.error(f"Error getting interview {interview_id}: {e}")
         raise
 
-def get_user_interviews(user_id):
-    """Retrieve all interviews for a specific user"""
-    if not interviews_collection:
-        raise Exception("DB not initialized")
+def get_user_interviews(user_id, view='full'):
+    """Retrieve all interviews for a specific user (prefer get_history_page for dashboards)"""
+    if interviews_collection is None:
+        ensure_connected() # Lazy connect on first use
     try:
-        # Convert string ID to ObjectId if needed
-        if isinstance(user_id, str):
-            user_id = ObjectId(user_id)
-        
-        cursor = interviews_collection.find({"userId": user_id})
-        return list(cursor)  # Convert cursor to list
+        return list(iter_history('interviews', user_id, view))
     except Exception as e:
         logger.error(f"Error getting interviews for user {user_id}: {e}")
         raise
 
 def update_interview_status(interview_id, status):
     """Update the status of an interview"""
-    if not interviews_collection:
-        raise Exception("DB not initialized")
+    if interviews_collection is None:
+        ensure_connected() # Lazy connect on first use
     try:
         # Try to find by interviewId field first
         result = interviews_collection.update_one(
@@ -323,35 +629,180 @@ def update_interview_status(interview_id, status):
         logger.error(f"Error updating interview status for {interview_id}: {e}")
         raise
 
-def save_resume(resume_data):
-    """Save a resume document to the database"""
-    if not resumes_collection:
-        raise Exception("DB not initialized")
+def save_resume(resume_data, sync=None):
+    """Save a resume document to the database (buffered unless sync=True)"""
+    if resumes_collection is None:
+        ensure_connected() # Lazy connect on first use
     try:
-        return resumes_collection.insert_one(resume_data)
+        if _use_buffer(sync):
+            return write_buffer.insert('resumes', resume_data)
+        with time_stage("db_write", "resumes"):
+            return resumes_collection.insert_one(resume_data)
     except Exception as e:
         logger.error(f"Error saving resume: {e}")
         raise
 
-def get_user_resumes(user_id):
-    """Retrieve all resumes for a specific user"""
-    if not resumes_collection:
-        raise Exception("DB not initialized")
+def save_resumes_bulk(resume_docs):
+    """Insert many resume documents in one unordered round-trip (one bad doc doesn't stop the rest)"""
+    if resumes_collection is None:
+        ensure_connected() # Lazy connect on first use
+    if not resume_docs:
+        return None
+    try:
+        with time_stage("db_write", "resumes_bulk"):
+            return resumes_collection.insert_many(resume_docs, ordered=False)
+    except Exception as e:
+        logger.error(f"Error bulk-saving {len(resume_docs)} resumes: {e}")
+        raise
+
+def get_cached_parse(parse_cache_key, max_age_seconds=None):
+    """Return the parsedData of the newest resume stored under a parse cache key, or None"""
+    if resumes_collection is None:
+        ensure_connected() # Lazy connect on first use
+    try:
+        query = {"parseCacheKey": parse_cache_key}
+        if max_age_seconds:
+            query["uploadedAt"] = {"$gte": datetime.now(timezone.utc) - timedelta(seconds=max_age_seconds)}
+        doc = resumes_collection.find_one(query, {"parsedData": 1}, sort=[("uploadedAt", -1)])
+        return doc["parsedData"] if doc else None
+    except Exception as e:
+        logger.error(f"Error getting cached parse {parse_cache_key}: {e}")
+        raise
+
+def iter_resume_fingerprints(since=None):
+    """Yield {_id, simhash, uploadedAt} for fingerprinted resumes, oldest first (uploaded after `since` if given)"""
+    if resumes_collection is None:
+        ensure_connected() # Lazy connect on first use
+    query = {"simhash": {"$exists": True}}
+    if since is not None:
+        query["uploadedAt"] = {"$gt": since}
+    cursor = resumes_collection.find(query, {"simhash": 1, "uploadedAt": 1}).sort("uploadedAt", ASCENDING)
+    yield from cursor.batch_size(2000) # Projected docs are tiny
+
+def get_resume(resume_id, projection=None):
+    """Retrieve one resume document by _id, or None"""
+    if resumes_collection is None:
+        ensure_connected() # Lazy connect on first use
+    try:
+        if not isinstance(resume_id, ObjectId):
+            if not ObjectId.is_valid(resume_id):
+                return None
+            resume_id = ObjectId(resume_id)
+        return resumes_collection.find_one({"_id": resume_id}, projection)
+    except Exception as e:
+        logger.error(f"Error getting resume {resume_id}: {e}")
+        raise
+
+def get_resumes_by_ids(resume_ids, projection=None):
+    """Retrieve resume documents by _id, keyed by _id"""
+    if resumes_collection is None:
+        ensure_connected() # Lazy connect on first use
+    try:
+        return {doc["_id"]: doc for doc in resumes_collection.find({"_id": {"$in": list(resume_ids)}}, projection)}
+    except Exception as e:
+        logger.error(f"Error getting {len(resume_ids)} resumes: {e}")
+        raise
+
+def get_user_resumes(user_id, view='full'):
+    """Retrieve all resumes for a specific user (prefer get_history_page for dashboards)"""
+    if resumes_collection is None:
+        ensure_connected() # Lazy connect on first use
     try:
-        # Convert string ID to ObjectId if needed
-        if isinstance(user_id, str):
-            user_id = ObjectId(user_id)
-            
-        cursor = resumes_collection.find({"userId": user_id})
-        return list(cursor)  # Convert cursor to list
+        return list(iter_history('resumes', user_id, view))
     except Exception as e:
         logger.error(f"Error getting resumes for user {user_id}: {e}")
         raise
 
+# --- Paginated history queries ---
+# Dashboards page through a user's interviews/resumes newest-first with an opaque
+# keyset cursor on (date, _id), so each page is an index range scan of `limit`
+# documents no matter how deep the user pages. Views project away the heavy
+# arrays (conversationHistory, questions, parsedData) unless they are needed.
+
+HISTORY_PAGE_DEFAULT = int(os.getenv("HISTORY_PAGE_DEFAULT", "20"))
+HISTORY_PAGE_MAX = int(os.getenv("HISTORY_PAGE_MAX", "100"))
+HISTORY_EXPORT_BATCH_SIZE = int(os.getenv("HISTORY_EXPORT_BATCH_SIZE", "200"))
+
+# collection -> (date field, {view: projection}); a None projection returns whole documents
+HISTORY_VIEWS = {
+    'interviews': ('date', {
+        'summary': {'interviewId': 1, 'userName': 1, 'date': 1, 'status': 1, 'finalScore': 1},
+        'detail': {'conversationHistory': 0},
+        'full': None,
+    }),
+    'resumes': ('uploadedAt', {
+        'summary': {'fileName': 1, 'uploadedAt': 1, 'parsedData.name': 1, 'contentHash': 1},
+        'detail': {'lineHashes': 0}, # Near-duplicate fingerprint internals
+        'full': None,
+    }),
+}
+
+class InvalidCursorError(ValueError):
+    """Raised for a page cursor that can't be decoded"""
+
+def encode_page_cursor(date_value, object_id):
+    """Opaque cursor pointing just past (date_value, object_id)"""
+    raw = json.dumps([date_value.isoformat() if date_value else None, str(object_id)])
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+def decode_page_cursor(cursor):
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)).decode()
+        date_iso, object_id = json.loads(raw)
+        return (datetime.fromisoformat(date_iso) if date_iso else None), ObjectId(object_id)
+    except Exception as e:
+        raise InvalidCursorError(f"Invalid page cursor: {e}")
+
+def _history_query(collection_name, user_id, view):
+    if db is None:
+        ensure_connected() # Lazy connect on first use
+    if collection_name not in HISTORY_VIEWS:
+        raise ValueError(f"No history views for collection '{collection_name}'")
+    date_field, views = HISTORY_VIEWS[collection_name]
+    if view not in views:
+        raise ValueError(f"Unknown view '{view}'. Expected one of: {', '.join(views)}")
+    if isinstance(user_id, str):
+        user_id = ObjectId(user_id)
+    return db[collection_name], date_field, views[view], {"userId": user_id}
+
+def _history_sort(date_field):
+    return [(date_field, DESCENDING), ('_id', DESCENDING)]
+
+def get_history_page(collection_name, user_id, view='summary', limit=HISTORY_PAGE_DEFAULT, cursor=None):
+    """One newest-first page of a user's documents. Returns (documents, next_cursor or None)."""
+    collection, date_field, projection, query = _history_query(collection_name, user_id, view)
+    limit = max(1, min(int(limit), HISTORY_PAGE_MAX))
+    if cursor:
+        last_date, last_id = decode_page_cursor(cursor)
+        query["$or"] = [
+            {date_field: {"$lt": last_date}},
+            {date_field: last_date, "_id": {"$lt": last_id}},
+        ]
+    try:
+        # Fetch one extra document to know whether another page exists
+        docs = list(collection.find(query, projection).sort(_history_sort(date_field)).limit(limit + 1))
+    except Exception as e:
+        logger.error(f"Error getting {collection_name} page for user {user_id}: {e}")
+        raise
+    next_cursor = None
+    if len(docs) > limit:
+        docs = docs[:limit]
+        next_cursor = encode_page_cursor(docs[-1].get(date_field), docs[-1]['_id'])
+    return docs, next_cursor
+
+def iter_history(collection_name, user_id, view='summary', batch_size=HISTORY_EXPORT_BATCH_SIZE):
+    """Streams all of a user's documents newest-first, holding one cursor batch in memory at a time"""
+    collection, date_field, projection, query = _history_query(collection_name, user_id, view)
+    cursor = collection.find(query, projection).sort(_history_sort(date_field)).batch_size(batch_size)
+    try:
+        yield from cursor
+    finally:
+        cursor.close() # Export aborted (e.g. client disconnected)
+
 def create_user(user_data):
-    """Create a new user in the database"""
-    if not users_collection:
-        raise Exception("DB not initialized")
+    """Create a new user in the database (always acknowledged, so duplicate emails surface)"""
+    if users_collection is None:
+        ensure_connected() # Lazy connect on first use
     
     # Ensure timestamps are added
     if 'createdAt' not in user_data:
@@ -367,70 +818,90 @@ def create_user(user_data):
 
 def get_user_by_email(email):
     """Retrieve a user by email address"""
-    if not users_collection:
-        raise Exception("DB not initialized")
+    if users_collection is None:
+        ensure_connected() # Lazy connect on first use
     try:
         return users_collection.find_one({"email": email})
     except Exception as e:
         logger.error(f"Error getting user by email {email}: {e}")
         raise
 
-def save_chat_message(chat_data):
+def save_chat_message(chat_data, sync=None):
     """Save chat message(s) to the database.
-    This will either create a new chat document or update an existing one."""
-    if not chats_collection:
-        raise Exception("DB not initialized")
-        
+    A single upsert appends the messages, creating the chat document on first write."""
+    if chats_collection is None:
+        ensure_connected() # Lazy connect on first use
+
+    chat_filter = {
+        "userId": chat_data.get("userId"),
+        "interviewId": chat_data.get("interviewId")
+    }
+    messages = chat_data.get("messages", [])
+    # Any other fields are only written when the document is created
+    set_on_insert = {k: v for k, v in chat_data.items() if k not in ("userId", "interviewId", "messages", "_id")}
     try:
-        # Check if a chat document already exists for this interview
-        existing_chat = chats_collection.find_one({
-            "userId": chat_data.get("userId"),
-            "interviewId": chat_data.get("interviewId")
-        })
-        
-        if existing_chat:
-            # Update existing chat with new messages
-            return chats_collection.update_one(
-                {"_id": existing_chat["_id"]},
-                {"$push": {"messages": {"$each": chat_data.get("messages", [])}}}
-            )
-        else:
-            # Create new chat document
-            return chats_collection.insert_one(chat_data)
+        if _use_buffer(sync):
+            return write_buffer.push_messages('chats', chat_filter, messages, set_on_insert)
+        update = {"$push": {"messages": {"$each": messages}}}
+        if set_on_insert:
+            update["$setOnInsert"] = set_on_insert
+        with time_stage("db_write", "chats"):
+            return chats_collection.update_one(chat_filter, update, upsert=True)
     except Exception as e:
         logger.error(f"Error saving chat message: {e}")
         raise
 
 def get_interview_chat(interview_id):
     """Retrieve the chat history for a specific interview"""
-    if not chats_collection:
-        raise Exception("DB not initialized")
+    if chats_collection is None:
+        ensure_connected() # Lazy connect on first use
     try:
         return chats_collection.find_one({"interviewId": interview_id})
     except Exception as e:
         logger.error(f"Error getting chat for interview {interview_id}: {e}")
         raise
 
-# Update the main initialization function
-def initialize_database():
-    """Initialize database connection, collections, and schemas"""
-    global db # Ensure we are modifying the global db
-    try:
-        # Connect and ping
-        _, db = connect_db() # Updates global client and db
-        if not db:
-             raise Exception("Database connection failed during initialization")
-
-        # Create collections if they don't exist
-        ensure_collections_exist()
+# --- Migrations ---
+# Collections, $jsonSchema validators and indexes are applied by an explicit, one-time
+# migration (python database.py migrate) rather than on every process start.
 
-        # Apply schema validations
-        apply_schema_validations()
+def migrate():
+    """Creates collections, applies schema validations and indexes, and checks hot query plans"""
+    connect_db()
+    ensure_collections_exist()
+    apply_schema_validations()
+    # Indexes for every hot lookup, then verify the planner actually uses them
+    ensure_indexes()
+    if DB_CHECK_QUERY_PLANS:
+        check_query_plans()
 
+def initialize_database():
+    """Initialize database connection, collections, schemas and indexes (connect + migrate)"""
+    try:
+        migrate()
         logger.info("Database initialized successfully!")
         return True
     except Exception as e:
         logger.error(f"Database initialization failed: {e}")
         # Close connection if initialization failed halfway
         close_db_connection()
-        return False
\ No newline at end of file
+        return False
+
+def main(argv=None):
+    import argparse
+    parser = argparse.ArgumentParser(description="Database maintenance.")
+    parser.add_argument("command", choices=["migrate"], help="migrate: create collections, validators and indexes")
+    parser.parse_args(argv)
+    started = time.perf_counter()
+    try:
+        migrate()
+    except Exception as e:
+        logger.critical(f"Migration failed: {e}")
+        return 1
+    finally:
+        close_db_connection()
+    logger.info(f"Migration completed in {time.perf_counter() - started:.2f}s.")
+    return 0
+
+if __name__ == "__main__":
+    raise SystemExit(main())
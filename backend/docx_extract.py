@@ -0,0 +1,159 @@
+# backend/docx_extract.py
+# Streaming DOCX text extraction.
+#
+# Reads word/document.xml (plus the header and footer parts) straight from the zip
+# with iterparse instead of building python-docx's object tree. Finished elements
+# are detached as soon as their text has been taken, so memory stays bounded by the
+# largest single paragraph/table row rather than the document. Unlike walking
+# `Document.paragraphs`, this keeps text in tables (one line per row, cells joined
+# with " | "), text boxes and headers/footers.
+import io
+import logging
+import re
+import zipfile
+from dataclasses import dataclass
+from xml.etree.ElementTree import iterparse
+
+logger = logging.getLogger(__name__)
+
+_W = "{http://schemas.openxmlformats.org/wordprocessingml/2006/main}"
+_MC = "{http://schemas.openxmlformats.org/markup-compatibility/2006}"
+DOCUMENT_PART = "word/document.xml"
+_HEADER_PART = re.compile(r"^word/header\d*\.xml$")
+_FOOTER_PART = re.compile(r"^word/footer\d*\.xml$")
+
+_P, _T, _TAB, _BR, _CR = _W + "p", _W + "t", _W + "tab", _W + "br", _W + "cr"
+_TR, _TC, _NO_BREAK_HYPHEN = _W + "tr", _W + "tc", _W + "noBreakHyphen"
+_FALLBACK = _MC + "Fallback" # Legacy (VML) copy of a text box that mc:Choice already holds
+
+
+@dataclass
+class DocxExtractionResult:
+    """Text extracted from a DOCX plus which parts it came from."""
+    text: str
+    parts: list
+    truncated: bool = False
+
+
+class _LimitReached(Exception):
+    pass
+
+
+class _PartReader:
+    """Turns one WordprocessingML part into lines, streaming."""
+
+    def __init__(self, lines, max_chars=None, chars=0):
+        self.lines = lines
+        self.max_chars = max_chars
+        self.chars = chars
+
+    def _emit(self, sinks, text):
+        text = text.strip()
+        if not text:
+            return
+        sinks[-1].append(text)
+        if len(sinks) == 1: # Top level: counts towards the limit
+            self.chars += len(text) + 1
+            if self.max_chars and self.chars >= self.max_chars:
+                raise _LimitReached()
+
+    def read(self, stream):
+        sinks = [self.lines] # Where finished paragraphs go: the output, or the table cell being read
+        paragraphs = [] # Text buffers of the open (possibly nested, e.g. text box) paragraphs
+        rows = [] # Cells of the open table rows
+        stack = [] # Open elements, to detach finished children from their parent
+        skip_depth = 0 # > 0 inside mc:Fallback
+        for event, elem in iterparse(stream, events=("start", "end")):
+            tag = elem.tag
+            if event == "start":
+                stack.append(elem)
+                if tag == _FALLBACK or skip_depth:
+                    skip_depth += 1
+                elif tag == _P:
+                    paragraphs.append([])
+                elif tag == _TR:
+                    rows.append([])
+                elif tag == _TC:
+                    sinks.append([])
+                continue
+
+            stack.pop()
+            if skip_depth:
+                skip_depth -= 1
+            elif tag == _T:
+                if paragraphs and elem.text:
+                    paragraphs[-1].append(elem.text)
+            elif tag == _TAB:
+                if paragraphs:
+                    paragraphs[-1].append("\t")
+            elif tag in (_BR, _CR):
+                if paragraphs:
+                    paragraphs[-1].append("\n")
+            elif tag == _NO_BREAK_HYPHEN:
+                if paragraphs:
+                    paragraphs[-1].append("-")
+            elif tag == _P:
+                for line in "".join(paragraphs.pop()).split("\n"):
+                    self._emit(sinks, line)
+            elif tag == _TC:
+                cell = " ".join(sinks.pop())
+                if rows:
+                    rows[-1].append(cell)
+            elif tag == _TR:
+                self._emit(sinks, " | ".join(cell for cell in rows.pop() if cell))
+
+            # Detach the finished element so the tree never grows beyond the open path
+            if stack:
+                stack[-1].remove(elem)
+            else:
+                elem.clear()
+
+
+def _open_zip(source):
+    if isinstance(source, (bytes, bytearray)):
+        source = io.BytesIO(source)
+    return zipfile.ZipFile(source)
+
+
+def extract_docx_text(source, max_chars=None, filename="N/A") -> DocxExtractionResult:
+    """
+    Extracts text from DOCX bytes or a binary file object: headers, then the body,
+    then footers (repeated header/footer lines are kept once). Stops early once
+    max_chars have been collected. Raises ValueError for files that aren't a DOCX.
+    """
+    try:
+        archive = _open_zip(source)
+    except zipfile.BadZipFile as e:
+        raise ValueError(f"Not a DOCX (zip) file: {e}")
+    with archive:
+        names = archive.namelist()
+        if DOCUMENT_PART not in names:
+            raise ValueError("Not a DOCX file: word/document.xml is missing.")
+        headers = sorted(name for name in names if _HEADER_PART.match(name))
+        footers = sorted(name for name in names if _FOOTER_PART.match(name))
+
+        lines, parts, truncated = [], [], False
+        reader = _PartReader(lines, max_chars)
+        for part in headers + [DOCUMENT_PART] + footers:
+            is_body = part == DOCUMENT_PART
+            part_lines = lines if is_body else []
+            reader.lines = part_lines
+            try:
+                with archive.open(part) as stream:
+                    reader.read(stream)
+            except _LimitReached:
+                truncated = True
+            except Exception as e:
+                if is_body:
+                    raise ValueError(f"Could not read {part}: {e}")
+                logger.warning(f"Skipping unreadable DOCX part {part} in {filename}: {e}")
+                continue
+            finally:
+                if not is_body:
+                    seen = set(lines)
+                    lines.extend(line for line in dict.fromkeys(part_lines) if line not in seen)
+            parts.append(part)
+            if truncated:
+                logger.info(f"Stopped DOCX extraction for {filename} in {part} (text limit reached).")
+                break
+    return DocxExtractionResult("\n".join(lines), parts, truncated)
@@ -0,0 +1,56 @@
+# backend/gunicorn.conf.py
+# Production serving: gunicorn with threaded workers.
+#
+#   gunicorn -c gunicorn.conf.py wsgi:app
+#
+# Request threads mostly wait on the LLM, so each worker runs GUNICORN_THREADS
+# threads (gthread) and the worker count follows the CPU count. The app is not
+# preloaded: the MongoDB client and the LLM gateway's event-loop thread are not
+# fork-safe, so every worker builds its own after the fork.
+import logging
+import multiprocessing
+import os
+
+logger = logging.getLogger("gunicorn.error")
+
+_cores = multiprocessing.cpu_count()
+_session_store = os.getenv("SESSION_STORE", "memory").lower()
+
+wsgi_app = "wsgi:app"
+bind = os.getenv("GUNICORN_BIND", f"0.0.0.0:{os.getenv('PORT', '5000')}")
+worker_class = "gthread"
+threads = int(os.getenv("GUNICORN_THREADS", "8"))
+# In-process sessions only exist in the worker that created them, so the memory
+# store defaults to a single worker; use SESSION_STORE=redis to scale out.
+workers = int(os.getenv("WEB_CONCURRENCY", str(1 if _session_store == "memory" else _cores * 2 + 1)))
+preload_app = False
+timeout = int(os.getenv("GUNICORN_TIMEOUT", "180")) # Above LLM_REQUEST_TIMEOUT_SECONDS
+graceful_timeout = int(os.getenv("GUNICORN_GRACEFUL_TIMEOUT", "30")) # Time to finish requests and persist sessions
+keepalive = int(os.getenv("GUNICORN_KEEPALIVE", "5"))
+max_requests = int(os.getenv("GUNICORN_MAX_REQUESTS", "0")) # 0 disables recycling
+max_requests_jitter = int(os.getenv("GUNICORN_MAX_REQUESTS_JITTER", "0"))
+accesslog = os.getenv("GUNICORN_ACCESS_LOG") # e.g. "-" for stdout; off by default
+loglevel = os.getenv("LOG_LEVEL", "info").lower()
+
+# Split the cores between workers' PDF extraction pools instead of each worker taking all of them
+os.environ.setdefault("PDF_EXTRACT_WORKERS", str(max(1, _cores // workers)))
+
+
+def on_starting(server):
+    if _session_store == "memory" and workers > 1:
+        logger.warning(
+            f"SESSION_STORE=memory with {workers} workers: an interview only exists in the worker that "
+            "started it, so requests routed to other workers will get 404. Use SESSION_STORE=redis "
+            "or WEB_CONCURRENCY=1."
+        )
+    logger.info(f"Starting {workers} workers x {threads} threads ({_cores} cores, session store: {_session_store}).")
+
+
+def post_worker_init(worker):
+    from appp import init_worker
+    init_worker()
+
+
+def worker_exit(server, worker):
+    from appp import shutdown_worker
+    shutdown_worker()
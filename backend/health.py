@@ -0,0 +1,178 @@
+# backend/health.py
+# Dependency health checks that run in the background.
+#
+# Each dependency (MongoDB, the Groq API, the session store) is probed on its own
+# daemon thread at a fixed interval, and the latest result is cached with its
+# timestamp and latency. /health, /ready and /live only read those cached results,
+# so load-balancer checks cost microseconds and never add load to the dependencies.
+import logging
+import os
+import threading
+import time
+import urllib.error
+import urllib.request
+from datetime import datetime, timezone
+
+logger = logging.getLogger(__name__)
+
+HEALTH_PROBE_INTERVAL_SECONDS = float(os.getenv("HEALTH_PROBE_INTERVAL_SECONDS", "15"))
+HEALTH_GROQ_PROBE_INTERVAL_SECONDS = float(os.getenv("HEALTH_GROQ_PROBE_INTERVAL_SECONDS", "60")) # Each probe is a real API call
+HEALTH_PROBE_TIMEOUT_SECONDS = float(os.getenv("HEALTH_PROBE_TIMEOUT_SECONDS", "5"))
+GROQ_DEFAULT_BASE_URL = "https://api.groq.com"
+
+STATUS_UP, STATUS_DOWN, STATUS_UNKNOWN = "up", "down", "unknown"
+
+
+class DependencyProbe:
+    """
+    Periodically runs `check()` (which raises on failure) and caches the outcome.
+    A critical dependency being down makes the instance unready; a non-critical one
+    only marks it degraded.
+    """
+
+    def __init__(self, name, check, interval_seconds=HEALTH_PROBE_INTERVAL_SECONDS, critical=True):
+        self.name = name
+        self.check = check
+        self.interval_seconds = interval_seconds
+        self.critical = critical
+        self._lock = threading.Lock()
+        self._result = {"status": STATUS_UNKNOWN, "checkedAt": None, "latencyMs": None, "error": None, "consecutiveFailures": 0}
+        self._checked_monotonic = None
+        self._was_down = False
+        self._thread = None
+        self._stop = threading.Event()
+
+    def run_once(self):
+        """Runs the check now and stores the result."""
+        started = time.perf_counter()
+        error = None
+        try:
+            self.check()
+        except Exception as e:
+            error = f"{type(e).__name__}: {e}"[:300]
+        latency_ms = round((time.perf_counter() - started) * 1000, 2)
+        with self._lock:
+            failures = self._result["consecutiveFailures"] + 1 if error else 0
+            self._result = {
+                "status": STATUS_DOWN if error else STATUS_UP,
+                "checkedAt": datetime.now(timezone.utc).isoformat(),
+                "latencyMs": latency_ms,
+                "error": error,
+                "consecutiveFailures": failures,
+            }
+            self._checked_monotonic = time.monotonic()
+        if error and failures == 1:
+            logger.warning(f"Health probe '{self.name}' failed: {error}")
+        elif not error and failures == 0 and self._was_down:
+            logger.info(f"Health probe '{self.name}' recovered.")
+        self._was_down = bool(error)
+
+    def result(self) -> dict:
+        """The cached result; a result older than three intervals is reported as stale."""
+        with self._lock:
+            result = dict(self._result)
+            checked = self._checked_monotonic
+        result["critical"] = self.critical
+        result["stale"] = checked is not None and time.monotonic() - checked > 3 * self.interval_seconds
+        return result
+
+    def start(self):
+        if self._thread and self._thread.is_alive():
+            return
+
+        def _run():
+            while True:
+                try:
+                    self.run_once()
+                except Exception as e: # Never let the probe thread die
+                    logger.error(f"Health probe '{self.name}' crashed: {e}")
+                if self._stop.wait(self.interval_seconds):
+                    return
+
+        self._stop.clear()
+        self._thread = threading.Thread(target=_run, name=f"health-{self.name}", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+
+class HealthMonitor:
+    """Owns the probes and derives overall health/readiness from their cached results."""
+
+    def __init__(self, probes=()):
+        self.probes = {probe.name: probe for probe in probes}
+
+    def add(self, probe):
+        self.probes[probe.name] = probe
+        return probe
+
+    def start(self):
+        for probe in self.probes.values():
+            probe.start()
+        logger.info(f"Health monitor started for: {', '.join(self.probes)}.")
+
+    def stop(self):
+        for probe in self.probes.values():
+            probe.stop()
+
+    def snapshot(self) -> dict:
+        """Overall status plus per-dependency results, read from memory."""
+        dependencies = {name: probe.result() for name, probe in self.probes.items()}
+        critical_up = all(d["status"] == STATUS_UP and not d["stale"] for d in dependencies.values() if d["critical"])
+        all_up = all(d["status"] == STATUS_UP and not d["stale"] for d in dependencies.values())
+        if not critical_up:
+            status = "unhealthy"
+        elif not all_up:
+            status = "degraded"
+        else:
+            status = "healthy"
+        return {"status": status, "ready": critical_up, "dependencies": dependencies}
+
+    def is_ready(self) -> bool:
+        return self.snapshot()["ready"]
+
+    def up_gauge(self) -> dict:
+        """{(name,): 1/0} for the dependency-up metrics gauge."""
+        return {(name,): 1 if probe.result()["status"] == STATUS_UP else 0 for name, probe in self.probes.items()}
+
+
+# === Probes ===
+
+def mongo_check():
+    """Pings MongoDB (connecting first if this process hasn't yet)."""
+    import database
+    database.ensure_connected()
+    database.client.admin.command('ping')
+
+
+def make_groq_check(api_key=None, base_url=None, timeout_seconds=HEALTH_PROBE_TIMEOUT_SECONDS):
+    """Lists models on the Groq API: proves DNS, TLS, reachability and that the key is accepted."""
+    api_key = api_key or os.getenv("GROQ_API_KEY", "")
+    base_url = (base_url or os.getenv("GROQ_BASE_URL") or GROQ_DEFAULT_BASE_URL).rstrip("/")
+
+    def check():
+        request = urllib.request.Request(f"{base_url}/openai/v1/models", headers={"Authorization": f"Bearer {api_key}"})
+        try:
+            with urllib.request.urlopen(request, timeout=timeout_seconds) as response:
+                response.read(1)
+        except urllib.error.HTTPError as e:
+            raise RuntimeError(f"HTTP {e.code} from Groq API")
+    return check
+
+
+def make_session_store_check(session_store):
+    def check():
+        if not session_store.ping():
+            raise RuntimeError("Session store ping failed")
+    return check
+
+
+def create_health_monitor(session_store, session_store_critical=True) -> HealthMonitor:
+    """The standard probes: MongoDB and the session store are critical, Groq is not (an
+    outage hits every replica alike, so pulling instances out of rotation wouldn't help)."""
+    return HealthMonitor([
+        DependencyProbe("mongodb", mongo_check),
+        DependencyProbe("groq", make_groq_check(), interval_seconds=HEALTH_GROQ_PROBE_INTERVAL_SECONDS, critical=False),
+        DependencyProbe("session_store", make_session_store_check(session_store), critical=session_store_critical),
+    ])
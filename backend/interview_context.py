@@ -0,0 +1,139 @@
+# backend/interview_context.py
+# Bounded prompt context for long interviews.
+#
+# Instead of resending the whole conversation every turn, the prompt is built from
+# the system prompt, a rolling summary of older turns and the last N turns verbatim.
+# Turns leaving the verbatim window are folded into the summary once (incrementally),
+# and a per-request token budget is enforced, so prompt size stays flat no matter
+# how long the interview runs.
+import logging
+import os
+
+logger = logging.getLogger(__name__)
+
+CONTEXT_RECENT_TURNS = int(os.getenv("CONTEXT_RECENT_TURNS", "6")) # Messages kept verbatim (3 question/answer exchanges)
+CONTEXT_FOLD_BATCH = int(os.getenv("CONTEXT_FOLD_BATCH", "4")) # Extra messages allowed past the window before summarizing
+CONTEXT_TOKEN_BUDGET = int(os.getenv("CONTEXT_TOKEN_BUDGET", "3000")) # Estimated prompt tokens per request
+SUMMARY_MAX_CHARS = int(os.getenv("CONTEXT_SUMMARY_MAX_CHARS", "2000"))
+MIN_RECENT_TURNS = 2 # Never fold the latest exchange, even when over budget
+
+SUMMARY_SYSTEM_PROMPT = (
+    "You maintain a running summary of a technical job interview. Merge the new turns into the "
+    "existing summary. Keep the topics covered, the key points of each answer and any scores given. "
+    "Be concise (under 150 words). Respond with the summary text only."
+)
+
+
+def estimate_tokens(text: str) -> int:
+    """Cheap token estimate (~4 characters per token for English text)."""
+    return len(text) // 4 + 1
+
+
+def estimate_message_tokens(messages: list[dict]) -> int:
+    """Estimated prompt tokens for a chat message list, including per-message overhead."""
+    return sum(estimate_tokens(msg["content"]) + 4 for msg in messages)
+
+
+def format_turns(turns: list[dict]) -> str:
+    """Renders history entries as 'Interviewer: ...' / 'Candidate: ...' lines."""
+    return "\n".join(
+        f"{'Interviewer' if turn['role'] == 'assistant' else 'Candidate'}: {turn['content']}"
+        for turn in turns
+    )
+
+
+def extractive_summary(previous_summary: str, turns: list[dict]) -> str:
+    """Local fallback summarizer: keeps the start of each folded turn, newest lines last."""
+    lines = [previous_summary] if previous_summary else []
+    for turn in turns:
+        speaker = "Interviewer" if turn["role"] == "assistant" else "Candidate"
+        content = " ".join(turn["content"].split())
+        lines.append(f"{speaker}: {content[:160]}{'...' if len(content) > 160 else ''}")
+    summary = "\n".join(lines)
+    return summary[-SUMMARY_MAX_CHARS:]
+
+
+def make_llm_summarizer(complete, model):
+    """
+    Returns a summarizer that merges turns into the summary with a small LLM.
+    `complete` is a gateway-style callable (model=..., messages=..., **kwargs).
+    Falls back to the extractive summary if the call fails.
+    """
+    def summarize(previous_summary: str, turns: list[dict]) -> str:
+        try:
+            completion = complete(
+                model=model,
+                messages=[
+                    {"role": "system", "content": SUMMARY_SYSTEM_PROMPT},
+                    {"role": "user", "content": f"Existing summary:\n{previous_summary or '(none)'}\n\nNew turns:\n{format_turns(turns)}"}
+                ],
+                temperature=0.2,
+                max_tokens=300
+            )
+            return completion.choices[0].message.content.strip()[:SUMMARY_MAX_CHARS]
+        except Exception as e:
+            logger.warning(f"Summary model call failed, using extractive summary instead: {e}")
+            return extractive_summary(previous_summary, turns)
+    return summarize
+
+
+class ContextWindow:
+    """
+    Builds bounded chat messages from a system prompt and a conversation history.
+    Summary bookkeeping lives in a caller-owned `state` dict ('summary',
+    'summarized_count'), so it can be kept alongside the interview state.
+    """
+
+    def __init__(self, recent_turns=CONTEXT_RECENT_TURNS, token_budget=CONTEXT_TOKEN_BUDGET,
+                 summarize=extractive_summary, fold_batch=CONTEXT_FOLD_BATCH):
+        self.recent_turns = max(recent_turns, MIN_RECENT_TURNS)
+        self.fold_batch = fold_batch
+        self.token_budget = token_budget
+        self.summarize = summarize
+
+    def _fold(self, state, history, upto):
+        """Folds history[summarized_count:upto] into the rolling summary."""
+        start = state.get('summarized_count', 0)
+        if upto <= start:
+            return
+        state['summary'] = self.summarize(state.get('summary', ""), history[start:upto])
+        state['summarized_count'] = upto
+        logger.debug(f"Folded {upto - start} turns into the interview summary ({len(state['summary'])} chars).")
+
+    @staticmethod
+    def _assemble(system_prompt, summary, recent):
+        messages = [{"role": "system", "content": system_prompt}]
+        if summary:
+            messages.append({"role": "system", "content": f"Summary of the interview so far:\n{summary}"})
+        messages.extend({"role": turn["role"], "content": turn["content"]} for turn in recent)
+        return messages
+
+    def build(self, system_prompt: str, history: list[dict], state: dict) -> tuple:
+        """Returns (messages, estimated_prompt_tokens) for the next completion."""
+        keep_from = state.get('summarized_count', 0)
+        # Summarize in batches rather than on every turn, to limit summary calls
+        if len(history) - keep_from > self.recent_turns + self.fold_batch:
+            keep_from = len(history) - self.recent_turns
+
+        # Over budget: move more of the oldest turns into the summary. The summary is
+        # bounded by SUMMARY_MAX_CHARS, so reserve that much up front and fold once.
+        summary_reserve = SUMMARY_MAX_CHARS // 4 + 4
+        fixed_tokens = estimate_tokens(system_prompt) + 4 + summary_reserve
+        recent_tokens = [estimate_tokens(turn["content"]) + 4 for turn in history]
+        window_tokens = sum(recent_tokens[keep_from:])
+        while fixed_tokens + window_tokens > self.token_budget and len(history) - keep_from > MIN_RECENT_TURNS:
+            window_tokens -= recent_tokens[keep_from]
+            keep_from += 1
+
+        self._fold(state, history, keep_from)
+        summary = state.get('summary', "")
+        messages = self._assemble(system_prompt, summary, history[keep_from:])
+        tokens = estimate_message_tokens(messages)
+
+        # Still over budget (e.g. a very long answer): send only the newest part of the summary
+        if tokens > self.token_budget and summary:
+            summary = summary[(tokens - self.token_budget) * 4:]
+            messages = self._assemble(system_prompt, summary, history[keep_from:])
+            tokens = estimate_message_tokens(messages)
+
+        return messages, tokens
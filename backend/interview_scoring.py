@@ -0,0 +1,85 @@
+# backend/interview_scoring.py
+# Extraction of the '**Feedback:** ... **Score:** N/10' block from interviewer
+# replies, for complete responses and for streamed ones chunk by chunk.
+# Kept free of Flask and database imports so it can be benchmarked on its own.
+import logging
+import re
+
+logger = logging.getLogger(__name__)
+
+FEEDBACK_SCORE_PATTERN = re.compile(
+    r"\*\*Feedback:\*\*\s*(.*?)(?=\s*\*\*Score:\*\*|\Z).*\*\*Score:\*\*\s*(\d{1,2})\s*/\s*10",
+    re.IGNORECASE | re.DOTALL
+)
+SCORE_PATTERN = re.compile(r"\*\*Score:\*\*\s*(\d{1,2})\s*/\s*10", re.IGNORECASE)
+
+
+def extract_feedback_and_score(ai_response_content: str, interview_id: str) -> tuple:
+    """Extracts the '**Feedback:** ... **Score:** N/10' parts of an interviewer reply."""
+    feedback = "Feedback not provided." # Default
+    score = None # Default
+
+    # Looks for "**Feedback:**" followed by text, until "**Score:**" or end of string
+    # Then looks for "**Score:**" followed by number/10
+    match = FEEDBACK_SCORE_PATTERN.search(ai_response_content)
+
+    if match:
+        feedback = match.group(1).strip()
+        try:
+            score = int(match.group(2))
+            logger.info(f"Interview {interview_id}: Extracted Feedback and Score={score}")
+        except ValueError:
+            logger.warning(f"Interview {interview_id}: Could not parse score from matched group '{match.group(2)}'")
+            feedback = "Feedback provided, but score extraction failed." # Update feedback if score fails
+    else:
+        # Try finding score separately if the combined pattern failed
+        score_match = SCORE_PATTERN.search(ai_response_content)
+        if score_match:
+            try:
+                score = int(score_match.group(1))
+                logger.info(f"Interview {interview_id}: Extracted Score={score} (Feedback pattern not matched)")
+            except ValueError:
+                logger.warning(f"Interview {interview_id}: Could not parse score from group '{score_match.group(1)}' (Feedback pattern not matched)")
+        else:
+            logger.warning(f"Interview {interview_id}: Feedback/Score pattern not found in response: {ai_response_content[:100]}...")
+    return feedback, score
+
+
+class StreamingFeedbackScanner:
+    """
+    Incrementally watches a streamed interviewer reply for the '**Feedback:**' marker
+    and the '**Score:** N/10' pattern, so they can be surfaced as soon as they arrive.
+    Only the new tail of the text (plus a small overlap for markers split across
+    chunks) is searched on each feed.
+    """
+    _OVERLAP = 32 # Longer than any marker/score pattern, so split matches are still found
+
+    def __init__(self):
+        self._parts = []
+        self._tail = ""
+        self.feedback_started = False
+        self.score = None
+
+    def feed(self, delta: str) -> list[tuple[str, dict]]:
+        """Consumes a chunk and returns any newly detected (event, payload) pairs."""
+        self._parts.append(delta)
+        window = self._tail + delta
+        events = []
+        if not self.feedback_started and re.search(r"\*\*Feedback:\*\*", window, re.IGNORECASE):
+            self.feedback_started = True
+            events.append(("feedback", {"started": True}))
+        if self.feedback_started:
+            score_match = None
+            for score_match in SCORE_PATTERN.finditer(window):
+                pass # Keep the last complete match in the window
+            if score_match is not None:
+                score = int(score_match.group(1))
+                if score != self.score:
+                    self.score = score
+                    events.append(("score", {"score": score}))
+        self._tail = window[-self._OVERLAP:]
+        return events
+
+    @property
+    def text(self) -> str:
+        return "".join(self._parts)
@@ -0,0 +1,477 @@
+# backend/llm_gateway.py
+# Asyncio-based gateway for Groq chat completions.
+#
+# A single AsyncGroq client (backed by one pooled httpx connection pool) lives on
+# a dedicated event loop thread. Request threads hand completions to that loop and
+# wait on the result, so many concurrent interviews share a handful of keep-alive
+# connections instead of each blocking call opening its own. In-flight requests
+# are capped per model with a semaphore; callers beyond the cap wait in line (up to
+# their deadline, then QueueTimeoutError), and once the line itself is full new calls
+# are rejected with GatewayBusyError. Neither counts against the circuit breaker, and
+# attempt timeouts and hedge delays only start once a slot is held.
+# Completions can also be streamed back to the caller chunk by chunk. Retries,
+# deadlines, hedging and the per-model circuit breaker (see llm_resilience) are
+# applied here, so the Groq client itself is created with max_retries=0.
+import asyncio
+import logging
+import os
+import queue
+import threading
+import time
+from collections import defaultdict
+from contextlib import asynccontextmanager
+
+import groq
+import httpx
+
+from llm_resilience import (
+    CIRCUIT_STATE_VALUES,
+    LLM_ATTEMPT_TIMEOUT_SECONDS,
+    LLM_CALL_DEADLINE_SECONDS,
+    LLM_HEDGE_ENABLED,
+    LLM_MAX_ATTEMPTS,
+    CircuitBreaker,
+    DeadlineExceeded,
+    LatencyTracker,
+    backoff_seconds,
+    is_upstream_failure,
+    retry_reason,
+)
+from metrics import LLM_TOKENS, REGISTRY, time_stage
+
+logger = logging.getLogger(__name__)
+
+LLM_MAX_CONNECTIONS = int(os.getenv("LLM_MAX_CONNECTIONS", "100"))
+LLM_MAX_KEEPALIVE_CONNECTIONS = int(os.getenv("LLM_MAX_KEEPALIVE_CONNECTIONS", "20"))
+LLM_MAX_CONCURRENCY_PER_MODEL = int(os.getenv("LLM_MAX_CONCURRENCY_PER_MODEL", "32"))
+LLM_MAX_QUEUE_PER_MODEL = int(os.getenv("LLM_MAX_QUEUE_PER_MODEL", "500"))
+LLM_REQUEST_TIMEOUT_SECONDS = float(os.getenv("LLM_REQUEST_TIMEOUT_SECONDS", "120")) # httpx read timeout; per streamed chunk
+
+# Message kinds passed from the loop thread to a streaming caller
+_STREAM_DELTA, _STREAM_ERROR, _STREAM_END = "delta", "error", "end"
+
+
+LLM_RETRIES = REGISTRY.counter(
+    "resumep_llm_retries_total",
+    "LLM attempts retried after a transient failure, by model and reason.",
+    ("model", "reason")
+)
+LLM_HEDGES = REGISTRY.counter(
+    "resumep_llm_hedges_total",
+    "Hedged duplicate LLM requests by model and outcome (won, lost, failed).",
+    ("model", "outcome")
+)
+LLM_CIRCUIT_REJECTIONS = REGISTRY.counter(
+    "resumep_llm_circuit_rejections_total",
+    "LLM calls failed fast because the model's circuit was open.",
+    ("model",)
+)
+
+
+class GatewayBusyError(Exception):
+    """Raised when a model's wait queue is full; callers should answer 503."""
+
+
+class CircuitOpenError(GatewayBusyError):
+    """Raised without calling upstream while a model's circuit breaker is open."""
+
+
+class QueueTimeoutError(GatewayBusyError):
+    """Raised when no in-flight slot frees up before the call's deadline (local saturation, not an upstream failure)."""
+
+
+class LLMGateway:
+    """Pooled, concurrency-limited access to Groq chat completions."""
+
+    def __init__(self, api_key, base_url=None, max_connections=LLM_MAX_CONNECTIONS,
+                 max_keepalive_connections=LLM_MAX_KEEPALIVE_CONNECTIONS,
+                 max_concurrency_per_model=LLM_MAX_CONCURRENCY_PER_MODEL,
+                 max_queue_per_model=LLM_MAX_QUEUE_PER_MODEL):
+        self.max_concurrency_per_model = max_concurrency_per_model
+        self.max_queue_per_model = max_queue_per_model
+        self._semaphores = {} # model -> asyncio.Semaphore (only touched on the loop thread)
+        self._queued = defaultdict(int)
+        self._in_flight = defaultdict(int)
+        self._completed = defaultdict(int)
+        self._failed = defaultdict(int)
+        self._rejected = defaultdict(int)
+        self._stats_lock = threading.Lock()
+        self._breakers = defaultdict(CircuitBreaker) # model -> CircuitBreaker
+        self._latencies = defaultdict(LatencyTracker) # model -> successful attempt latencies
+
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._loop.run_forever, name="llm-gateway", daemon=True)
+        self._thread.start()
+
+        # The client (and its connection pool) must be created on the loop it will be used from
+        async def _make_client():
+            http_client = httpx.AsyncClient(
+                limits=httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_keepalive_connections),
+                timeout=httpx.Timeout(LLM_REQUEST_TIMEOUT_SECONDS, connect=10.0)
+            )
+            # Retries are done by the gateway (deadline-aware, with backoff and a breaker), not the SDK
+            return groq.AsyncGroq(api_key=api_key, base_url=base_url, http_client=http_client, max_retries=0)
+        self._client = asyncio.run_coroutine_threadsafe(_make_client(), self._loop).result()
+        logger.info(f"LLM gateway started (max {max_connections} connections, {max_concurrency_per_model} in flight per model).")
+
+    # --- Coroutine API (runs on the gateway loop) ---
+
+    def _semaphore_for(self, model):
+        semaphore = self._semaphores.get(model)
+        if semaphore is None:
+            semaphore = self._semaphores[model] = asyncio.Semaphore(self.max_concurrency_per_model)
+        return semaphore
+
+    @asynccontextmanager
+    async def _slot(self, model, deadline):
+        """Holds one of the model's in-flight slots for the duration of the block, waiting for one until `deadline`."""
+        with self._stats_lock:
+            if self._queued[model] >= self.max_queue_per_model:
+                self._rejected[model] += 1
+                raise GatewayBusyError(f"LLM queue for model '{model}' is full ({self.max_queue_per_model} waiting).")
+            self._queued[model] += 1
+        acquired = False
+        semaphore = self._semaphore_for(model)
+        try:
+            try:
+                await asyncio.wait_for(semaphore.acquire(), max(deadline - time.monotonic(), 0))
+            except asyncio.TimeoutError:
+                with self._stats_lock:
+                    self._rejected[model] += 1
+                raise QueueTimeoutError(f"No free LLM slot for model '{model}' before the call deadline.") from None
+            try:
+                with self._stats_lock:
+                    self._queued[model] -= 1
+                    self._in_flight[model] += 1
+                acquired = True
+                try:
+                    yield
+                except Exception:
+                    with self._stats_lock:
+                        self._failed[model] += 1
+                    raise
+                else:
+                    with self._stats_lock:
+                        self._completed[model] += 1
+                finally:
+                    with self._stats_lock:
+                        self._in_flight[model] -= 1
+            finally:
+                semaphore.release()
+        finally:
+            if not acquired: # Cancelled while still waiting in line
+                with self._stats_lock:
+                    self._queued[model] -= 1
+
+    @staticmethod
+    def _record_usage(model, usage):
+        if usage is not None:
+            LLM_TOKENS.labels(model, "prompt").inc(getattr(usage, "prompt_tokens", 0) or 0)
+            LLM_TOKENS.labels(model, "completion").inc(getattr(usage, "completion_tokens", 0) or 0)
+
+    def _breaker_for(self, model) -> CircuitBreaker:
+        with self._stats_lock:
+            return self._breakers[model]
+
+    def _latency_for(self, model) -> LatencyTracker:
+        with self._stats_lock:
+            return self._latencies[model]
+
+    def _check_circuit(self, model, breaker):
+        if not breaker.allow():
+            LLM_CIRCUIT_REJECTIONS.labels(model).inc()
+            raise CircuitOpenError(f"LLM circuit for model '{model}' is open; failing fast.")
+
+    @staticmethod
+    def _record_outcome(breaker, error):
+        if is_upstream_failure(error):
+            breaker.record_failure()
+        else:
+            breaker.release_probe()
+
+    @staticmethod
+    def _retry_delay(model, error, attempts, deadline):
+        """Backoff before the next attempt, or None when the error is final (not transient, out of attempts or time)."""
+        reason = retry_reason(error)
+        if reason is None or isinstance(error, DeadlineExceeded) or attempts >= LLM_MAX_ATTEMPTS:
+            return None
+        delay = backoff_seconds(attempts, error)
+        if time.monotonic() + delay >= deadline:
+            logger.warning(f"Not retrying {model} ({reason}): a {delay:.2f}s wait would overrun the call deadline.")
+            return None
+        LLM_RETRIES.labels(model, reason).inc()
+        logger.warning(f"LLM call to {model} failed ({reason}: {error}); retry {attempts} in {delay:.2f}s.")
+        return delay
+
+    async def _attempt(self, model, messages, deadline, on_slot=None, **kwargs):
+        """
+        One request. The slot wait is bounded by the call deadline only; the attempt
+        timeout starts once the slot is held (and `on_slot`, an asyncio.Event, is set).
+        """
+        async with self._slot(model, deadline):
+            if on_slot is not None:
+                on_slot.set()
+            timeout = min(LLM_ATTEMPT_TIMEOUT_SECONDS, deadline - time.monotonic())
+            if timeout <= 0:
+                raise DeadlineExceeded(f"Deadline for the call to model '{model}' has passed.")
+            with time_stage("llm_call", model): # Excludes time spent waiting for the slot
+                started = time.monotonic()
+                completion = await asyncio.wait_for(
+                    self._client.chat.completions.create(model=model, messages=messages, **kwargs), timeout)
+                self._latency_for(model).observe(time.monotonic() - started)
+        self._record_usage(model, getattr(completion, "usage", None))
+        return completion
+
+    async def _hedged_attempt(self, model, messages, deadline, **kwargs):
+        """
+        An attempt plus, once it has held its slot for longer than the model's p95 latency,
+        a duplicate; the first answer wins. No duplicate is sent while all slots are busy.
+        """
+        hedge_delay = self._latency_for(model).hedge_delay() if LLM_HEDGE_ENABLED else None
+        if hedge_delay is None or hedge_delay >= deadline - time.monotonic():
+            return await self._attempt(model, messages, deadline, **kwargs)
+        has_slot = asyncio.Event()
+        primary = asyncio.ensure_future(self._attempt(model, messages, deadline, on_slot=has_slot, **kwargs))
+        slot_wait = asyncio.ensure_future(has_slot.wait())
+        tasks = {primary}
+        started = [primary]
+        try:
+            await asyncio.wait({primary, slot_wait}, return_when=asyncio.FIRST_COMPLETED)
+            if primary.done():
+                return primary.result()
+            done, _ = await asyncio.wait(tasks, timeout=hedge_delay) # The hedge clock starts with the upstream call
+            if done:
+                return primary.result()
+            if self._semaphore_for(model).locked():
+                return await primary # A duplicate would only queue behind the saturated slots
+            hedge = asyncio.ensure_future(self._attempt(model, messages, deadline, **kwargs))
+            tasks.add(hedge)
+            started.append(hedge)
+            error = None
+            while tasks:
+                done, tasks = await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        LLM_HEDGES.labels(model, "won" if task is hedge else "lost").inc()
+                        return task.result()
+                    error = error or task.exception()
+            LLM_HEDGES.labels(model, "failed").inc()
+            raise error
+        finally:
+            slot_wait.cancel()
+            for task in tasks:
+                task.cancel() # The slower request (or both, if we were cancelled)
+            for task in started:
+                if task.done() and not task.cancelled():
+                    task.exception() # Mark a losing request's error as retrieved
+
+    async def acomplete(self, model, messages, deadline=None, **kwargs):
+        """
+        Creates a chat completion, waiting for a free per-model slot first. Transient
+        failures are retried until `deadline` (a time.monotonic() value).
+        """
+        deadline = deadline or time.monotonic() + LLM_CALL_DEADLINE_SECONDS
+        breaker = self._breaker_for(model)
+        attempts = 0
+        while True:
+            self._check_circuit(model, breaker)
+            attempts += 1
+            try:
+                completion = await self._hedged_attempt(model, messages, deadline, **kwargs)
+            except Exception as e:
+                self._record_outcome(breaker, e)
+                delay = self._retry_delay(model, e, attempts, deadline)
+                if delay is None:
+                    raise
+                await asyncio.sleep(delay)
+                continue
+            except BaseException: # Cancelled by the caller
+                breaker.release_probe()
+                raise
+            breaker.record_success()
+            return completion
+
+    async def astream(self, model, messages, deadline=None, **kwargs):
+        """
+        Streams a chat completion as text deltas; the slot is held until the stream ends.
+        Failures before the first delta are retried like acomplete; later ones are raised,
+        since text already sent can't be taken back.
+        """
+        deadline = deadline or time.monotonic() + LLM_CALL_DEADLINE_SECONDS
+        breaker = self._breaker_for(model)
+        attempts = 0
+        while True:
+            self._check_circuit(model, breaker)
+            attempts += 1
+            sent_output = False
+            try:
+                async with self._slot(model, deadline):
+                    with time_stage("llm_stream", model):
+                        timeout = deadline - time.monotonic()
+                        if timeout <= 0:
+                            raise DeadlineExceeded(f"Deadline for the stream from model '{model}' has passed.")
+                        stream = await asyncio.wait_for(
+                            self._client.chat.completions.create(model=model, messages=messages, stream=True, **kwargs),
+                            min(LLM_ATTEMPT_TIMEOUT_SECONDS, timeout)
+                        )
+                        async for chunk in stream:
+                            # Groq reports usage on the final chunk under x_groq
+                            self._record_usage(model, getattr(getattr(chunk, "x_groq", None), "usage", None))
+                            delta = chunk.choices[0].delta.content if chunk.choices else None
+                            if delta:
+                                sent_output = True
+                                yield delta
+            except Exception as e:
+                self._record_outcome(breaker, e)
+                delay = None if sent_output else self._retry_delay(model, e, attempts, deadline)
+                if delay is None:
+                    raise
+                await asyncio.sleep(delay)
+                continue
+            except BaseException: # Cancelled, or the consumer closed the stream
+                breaker.release_probe()
+                raise
+            breaker.record_success()
+            return
+
+    # --- Blocking API (for request threads) ---
+
+    def complete(self, model, messages, timeout=LLM_CALL_DEADLINE_SECONDS, **kwargs):
+        """
+        Runs a chat completion on the gateway loop and blocks the calling thread until it
+        finishes. `timeout` is the call's deadline, retries and backoff included.
+        """
+        deadline = time.monotonic() + timeout
+        future = asyncio.run_coroutine_threadsafe(self.acomplete(model, messages, deadline=deadline, **kwargs), self._loop)
+        try:
+            return future.result(timeout + 1) # The coroutine enforces the deadline; this is a backstop
+        except BaseException:
+            future.cancel() # Frees the semaphore slot / connection if we stopped waiting
+            raise
+
+    def stream(self, model, messages, timeout=LLM_REQUEST_TIMEOUT_SECONDS, **kwargs):
+        """
+        Blocking generator over the text deltas of a streamed completion. `timeout`
+        bounds the wait for each chunk. Closing the generator early (e.g. the client
+        disconnected) cancels the upstream request.
+        """
+        chunks = queue.Queue()
+
+        async def _pump():
+            try:
+                async for delta in self.astream(model, messages, **kwargs):
+                    chunks.put((_STREAM_DELTA, delta))
+            except Exception as e:
+                chunks.put((_STREAM_ERROR, e))
+            else:
+                chunks.put((_STREAM_END, None))
+
+        future = asyncio.run_coroutine_threadsafe(_pump(), self._loop)
+        try:
+            while True:
+                try:
+                    kind, value = chunks.get(timeout=timeout)
+                except queue.Empty:
+                    raise TimeoutError(f"No streamed output from model '{model}' within {timeout}s.")
+                if kind == _STREAM_DELTA:
+                    yield value
+                elif kind == _STREAM_ERROR:
+                    raise value
+                else:
+                    return
+        finally:
+            future.cancel()
+
+    def stats(self) -> dict:
+        """Returns per-model queue depth, in-flight and outcome counters, circuit state and p95 latency."""
+        with self._stats_lock:
+            models = set(self._queued) | set(self._in_flight) | set(self._completed) | set(self._failed) | set(self._rejected)
+            stats = {
+                model: {
+                    "queued": self._queued[model],
+                    "inFlight": self._in_flight[model],
+                    "completed": self._completed[model],
+                    "failed": self._failed[model],
+                    "rejected": self._rejected[model],
+                }
+                for model in sorted(models | set(self._breakers))
+            }
+            breakers = dict(self._breakers)
+            latencies = dict(self._latencies)
+        for model, model_stats in stats.items():
+            if model in breakers:
+                model_stats["circuit"] = breakers[model].snapshot()
+            p95 = latencies[model].percentile(0.95) if model in latencies else None
+            model_stats["p95Ms"] = round(p95 * 1000, 1) if p95 is not None else None
+        return stats
+
+    def circuit_states(self) -> dict:
+        """{(model,): 0 closed / 1 half-open / 2 open}, for the circuit-state gauge."""
+        with self._stats_lock:
+            breakers = dict(self._breakers)
+        return {(model,): CIRCUIT_STATE_VALUES[breaker.state] for model, breaker in breakers.items()}
+
+    def close(self):
+        """Closes the connection pool and stops the loop thread."""
+        if not self._loop.is_running():
+            return
+        try:
+            asyncio.run_coroutine_threadsafe(self._client.close(), self._loop).result(5)
+        except Exception as e:
+            logger.warning(f"Error closing LLM gateway client: {e}")
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join(5)
+        logger.info("LLM gateway stopped.")
+
+
+_gateway = None
+_gateway_lock = threading.Lock()
+
+
+def get_gateway() -> LLMGateway:
+    """Returns the process-wide gateway, creating it from GROQ_API_KEY on first use."""
+    global _gateway
+    if _gateway is None:
+        with _gateway_lock:
+            if _gateway is None:
+                api_key = os.getenv("GROQ_API_KEY")
+                if not api_key:
+                    raise ValueError("Missing GROQ_API_KEY in environment variables.")
+                _gateway = LLMGateway(api_key=api_key, base_url=os.getenv("GROQ_BASE_URL") or None)
+    return _gateway
+
+
+def gateway_started() -> bool:
+    """True once get_gateway() has built the process-wide gateway."""
+    return _gateway is not None
+
+
+class LazyGateway:
+    """
+    Module-level stand-in for the process-wide gateway: attribute access builds it
+    on first use, so importing the app doesn't start the loop thread or the client.
+    """
+
+    def __getattr__(self, name):
+        return getattr(get_gateway(), name)
+
+    # Defined explicitly so `lazy.complete` can be handed out as a callable without building the gateway
+    def complete(self, *args, **kwargs):
+        return get_gateway().complete(*args, **kwargs)
+
+    def stream(self, *args, **kwargs):
+        return get_gateway().stream(*args, **kwargs)
+
+    def stats(self) -> dict:
+        return _gateway.stats() if _gateway is not None else {}
+
+    def circuit_states(self) -> dict:
+        return _gateway.circuit_states() if _gateway is not None else {}
+
+    def close(self):
+        if _gateway is not None:
+            _gateway.close()
+
+    @property
+    def started(self) -> bool:
+        return gateway_started()
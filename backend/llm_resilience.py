@@ -0,0 +1,180 @@
+# backend/llm_resilience.py
+# Retry, hedging and circuit-breaking policy for the LLM gateway.
+#
+# Every completion runs under an overall deadline (queueing, attempts and backoff
+# included). Transient failures (timeouts, connection errors, 429, 408/409, 5xx)
+# are retried with full-jitter exponential backoff; a Retry-After header from the
+# API is honoured instead when present, and the call gives up early if the wait
+# would overrun the deadline. Once enough latencies have been seen for a model, a
+# second identical request is started when the first is still running after the
+# model's p95 latency; whichever answers first wins. A per-model circuit breaker
+# opens after consecutive upstream failures and fails calls fast until a single
+# half-open probe succeeds.
+import asyncio
+import email.utils
+import logging
+import os
+import random
+import threading
+import time
+from collections import deque
+from datetime import datetime, timezone
+
+import groq
+import httpx
+
+logger = logging.getLogger(__name__)
+
+LLM_CALL_DEADLINE_SECONDS = float(os.getenv("LLM_CALL_DEADLINE_SECONDS", "60")) # Whole call, retries included
+LLM_ATTEMPT_TIMEOUT_SECONDS = float(os.getenv("LLM_ATTEMPT_TIMEOUT_SECONDS", "30"))
+LLM_MAX_ATTEMPTS = int(os.getenv("LLM_MAX_ATTEMPTS", "4"))
+LLM_BACKOFF_BASE_SECONDS = float(os.getenv("LLM_BACKOFF_BASE_SECONDS", "0.5"))
+LLM_BACKOFF_MAX_SECONDS = float(os.getenv("LLM_BACKOFF_MAX_SECONDS", "8"))
+LLM_HEDGE_ENABLED = os.getenv("LLM_HEDGE_ENABLED", "True").lower() == "true"
+LLM_HEDGE_MIN_SAMPLES = int(os.getenv("LLM_HEDGE_MIN_SAMPLES", "20")) # No hedging until p95 is meaningful
+LLM_HEDGE_MIN_DELAY_SECONDS = float(os.getenv("LLM_HEDGE_MIN_DELAY_SECONDS", "0.5"))
+LLM_LATENCY_WINDOW = int(os.getenv("LLM_LATENCY_WINDOW", "200"))
+LLM_CIRCUIT_FAILURE_THRESHOLD = int(os.getenv("LLM_CIRCUIT_FAILURE_THRESHOLD", "5")) # Consecutive failures
+LLM_CIRCUIT_RESET_SECONDS = float(os.getenv("LLM_CIRCUIT_RESET_SECONDS", "30"))
+
+CIRCUIT_CLOSED, CIRCUIT_HALF_OPEN, CIRCUIT_OPEN = "closed", "half_open", "open"
+CIRCUIT_STATE_VALUES = {CIRCUIT_CLOSED: 0, CIRCUIT_HALF_OPEN: 1, CIRCUIT_OPEN: 2}
+
+
+class DeadlineExceeded(TimeoutError):
+    """The call's overall deadline passed (or a required wait would overrun it)."""
+
+
+def retry_reason(error):
+    """Why `error` is worth retrying ('timeout', 'connection', 'rate_limited', 'server_error'), or None."""
+    if isinstance(error, (groq.APITimeoutError, httpx.TimeoutException, asyncio.TimeoutError)):
+        return "timeout"
+    if isinstance(error, (groq.APIConnectionError, httpx.TransportError)):
+        return "connection"
+    status = getattr(error, "status_code", None)
+    if status == 429:
+        return "rate_limited"
+    if status in (408, 409) or (status is not None and status >= 500):
+        return "server_error"
+    return None
+
+
+def is_upstream_failure(error) -> bool:
+    """True for errors that say the upstream is unhealthy (these trip the circuit breaker; 429 doesn't)."""
+    return not isinstance(error, DeadlineExceeded) and retry_reason(error) in ("timeout", "connection", "server_error")
+
+
+def retry_after_seconds(error):
+    """Seconds requested by the error's Retry-After (or retry-after-ms) header, or None."""
+    response = getattr(error, "response", None)
+    headers = getattr(response, "headers", None)
+    if not headers:
+        return None
+    value = headers.get("retry-after-ms")
+    if value:
+        try:
+            return max(float(value) / 1000, 0.0)
+        except ValueError:
+            pass
+    value = headers.get("retry-after")
+    if not value:
+        return None
+    try:
+        return max(float(value), 0.0)
+    except ValueError:
+        pass
+    try:
+        retry_at = email.utils.parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    return max((retry_at - datetime.now(timezone.utc)).total_seconds(), 0.0)
+
+
+def backoff_seconds(retry_number, error=None, rng=random):
+    """Delay before retry `retry_number` (1-based): Retry-After if given, else full-jitter exponential."""
+    requested = retry_after_seconds(error) if error is not None else None
+    if requested is not None:
+        return requested + rng.uniform(0, min(requested * 0.1, 1.0)) # Spread retries that were told the same time
+    return rng.uniform(0, min(LLM_BACKOFF_MAX_SECONDS, LLM_BACKOFF_BASE_SECONDS * (2 ** (retry_number - 1))))
+
+
+class LatencyTracker:
+    """Sliding window of successful attempt latencies for one model."""
+
+    def __init__(self, window=LLM_LATENCY_WINDOW):
+        self._samples = deque(maxlen=window)
+        self._lock = threading.Lock()
+
+    def observe(self, seconds):
+        with self._lock:
+            self._samples.append(seconds)
+
+    def percentile(self, fraction):
+        with self._lock:
+            if not self._samples:
+                return None
+            ordered = sorted(self._samples)
+        return ordered[min(int(len(ordered) * fraction), len(ordered) - 1)]
+
+    def hedge_delay(self):
+        """Seconds after which to hedge (the window's p95), or None while samples are too few."""
+        with self._lock:
+            if len(self._samples) < LLM_HEDGE_MIN_SAMPLES:
+                return None
+            ordered = sorted(self._samples)
+        return max(ordered[min(int(len(ordered) * 0.95), len(ordered) - 1)], LLM_HEDGE_MIN_DELAY_SECONDS)
+
+
+class CircuitBreaker:
+    """
+    Consecutive-failure circuit breaker. `allow()` is False while open; after
+    reset_seconds one caller is let through as the half-open probe.
+    """
+
+    def __init__(self, failure_threshold=LLM_CIRCUIT_FAILURE_THRESHOLD, reset_seconds=LLM_CIRCUIT_RESET_SECONDS):
+        self.failure_threshold = failure_threshold
+        self.reset_seconds = reset_seconds
+        self.state = CIRCUIT_CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self.times_opened = 0
+        self._probe_in_flight = False
+        self._lock = threading.Lock()
+
+    def allow(self) -> bool:
+        with self._lock:
+            if self.state == CIRCUIT_CLOSED:
+                return True
+            if self.state == CIRCUIT_OPEN and time.monotonic() - self.opened_at >= self.reset_seconds:
+                self.state = CIRCUIT_HALF_OPEN
+                self._probe_in_flight = False
+            if self.state == CIRCUIT_HALF_OPEN and not self._probe_in_flight:
+                self._probe_in_flight = True
+                return True
+            return False
+
+    def record_success(self):
+        with self._lock:
+            if self.state != CIRCUIT_CLOSED:
+                logger.info("LLM circuit closed again after a successful probe.")
+            self.state = CIRCUIT_CLOSED
+            self.failures = 0
+            self._probe_in_flight = False
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self.state == CIRCUIT_HALF_OPEN or (self.state == CIRCUIT_CLOSED and self.failures >= self.failure_threshold):
+                self.state = CIRCUIT_OPEN
+                self.opened_at = time.monotonic()
+                self.times_opened += 1
+                self._probe_in_flight = False
+
+    def release_probe(self):
+        """The probe ended without telling anything about the upstream (e.g. it was cancelled)."""
+        with self._lock:
+            self._probe_in_flight = False
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {"state": self.state, "consecutiveFailures": self.failures, "timesOpened": self.times_opened}
@@ -0,0 +1,427 @@
+# backend/local_extract.py
+# Deterministic pre-extraction that runs before the resume LLM call.
+#
+# Compiled regexes pull emails, phone numbers and URLs; an Aho-Corasick automaton
+# over a skills vocabulary finds every known skill in one pass over the text; a
+# heuristic picks the name from the first lines. Contact lines, page furniture
+# (page numbers, repeats of the name, and in PDFs the lines repeated at the top or
+# bottom of most pages) and skills sections made only of known skills are then
+# stripped, so the model is sent less text. With
+# RESUME_LOCAL_EXTRACTION=skip_llm, simple resumes (no experience or projects to
+# structure) are answered without any LLM call.
+import logging
+import os
+import re
+from collections import Counter, deque
+
+from resume_sections import SECTION_EXPERIENCE, SECTION_PROJECTS, has_date_range, heading_kind, normalize_heading, segment_sections
+
+logger = logging.getLogger(__name__)
+
+RESUME_LOCAL_EXTRACTION = os.getenv("RESUME_LOCAL_EXTRACTION", "assist").lower() # 'off', 'assist' or 'skip_llm'
+RESUME_LOCAL_ONLY_MAX_CHARS = int(os.getenv("RESUME_LOCAL_ONLY_MAX_CHARS", "1500")) # Leftover text a 'simple' resume may have
+SKILLS_VOCABULARY_FILE = os.getenv("SKILLS_VOCABULARY_FILE") # Extra skills, one per line ('alias=Canonical' or 'Canonical')
+PAGE_EDGE_LINES = 3 # Lines at the top and bottom of a PDF page that may be a running header/footer
+
+EMAIL_PATTERN = re.compile(r"\b[\w.+-]+@[\w-]+(?:\.[\w-]+)*\.[a-z]{2,}\b", re.IGNORECASE)
+URL_PATTERN = re.compile(
+    r"\b(?:https?://|www\.)[^\s|,;<>()]+|\b(?:linkedin\.com|github\.com|gitlab\.com|behance\.net|dribbble\.com)/[^\s|,;<>()]+",
+    re.IGNORECASE
+)
+PHONE_PATTERN = re.compile(r"(?<![\w/])(?:\+\d{1,3}[\s.-]?)?(?:\(\d{2,4}\)[\s.-]?)?\d{2,4}(?:[\s.-]\d{2,4}){1,4}(?![\w/])")
+_CONTACT_LABELS = re.compile(r"\b(?:e-?mail|phone|mobile|tel|cell|linkedin|github|portfolio|website|address|contact)\b:?", re.IGNORECASE)
+_BOILERPLATE_LINE = re.compile(
+    r"^(?:page\s*\d+(?:\s*(?:of|/)\s*\d+)?|\d+\s*/\s*\d+|-\s*\d+\s*-|references?\s+(?:are\s+)?available\s+(?:up)?on\s+request\.?"
+    r"|curriculum\s+vitae|resume|r[ée]sum[ée]|cv)$",
+    re.IGNORECASE
+)
+_DATE_SEQUENCE = re.compile(r"^(?:(?:19|20)\d{2}(?:[./-](?:0?[1-9]|1[0-2]))?(?:\s*[-–—/|.]?\s*|$))+$")
+_NAME_TOKEN = re.compile(r"^[A-Z][A-Za-z'’.-]*$")
+_SKILL_SEPARATORS = re.compile(r"[,;|•·▪●]|\s-\s|\band\b|\t")
+SKILL_HEADINGS = {"skills", "technical skills", "core competencies", "competencies", "technologies", "tools",
+                  "skills and tools", "skills & tools", "languages and tools", "expertise", "areas of expertise"}
+
+# alias (lower case) -> canonical name; a bare entry is its own canonical name
+DEFAULT_SKILLS = """
+Python
+Java
+JavaScript
+js=JavaScript
+TypeScript
+ts=TypeScript
+Go
+golang=Go
+Rust
+C
+C++
+C#
+Ruby
+PHP
+Kotlin
+Swift
+Scala
+R
+MATLAB
+Perl
+Bash
+Shell
+SQL
+NoSQL
+HTML
+CSS
+Sass
+React
+react.js=React
+reactjs=React
+Angular
+Vue
+vue.js=Vue
+Next.js
+Node.js
+nodejs=Node.js
+Express
+Django
+Flask
+FastAPI
+Spring
+Spring Boot
+Rails
+ruby on rails=Rails
+.NET
+asp.net=.NET
+Laravel
+GraphQL
+REST
+gRPC
+MongoDB
+mongo=MongoDB
+PostgreSQL
+postgres=PostgreSQL
+MySQL
+SQLite
+Redis
+Elasticsearch
+Cassandra
+DynamoDB
+Oracle
+Kafka
+RabbitMQ
+Spark
+apache spark=Spark
+Hadoop
+Airflow
+Snowflake
+BigQuery
+dbt
+Pandas
+NumPy
+SciPy
+scikit-learn
+sklearn=scikit-learn
+TensorFlow
+PyTorch
+Keras
+OpenCV
+NLP
+Machine Learning
+ml=Machine Learning
+Deep Learning
+Computer Vision
+LLM
+Docker
+Kubernetes
+k8s=Kubernetes
+Terraform
+Ansible
+Jenkins
+GitHub Actions
+GitLab CI
+CI/CD
+AWS
+amazon web services=AWS
+GCP
+google cloud=GCP
+Azure
+Linux
+Unix
+Git
+Nginx
+Microservices
+Serverless
+Lambda
+Prometheus
+Grafana
+Tableau
+Power BI
+Excel
+Figma
+Jira
+Agile
+Scrum
+TDD
+Unit Testing
+Selenium
+Cypress
+Jest
+Pytest
+Android
+iOS
+Flutter
+React Native
+Solidity
+Blockchain
+Hibernate
+Celery
+WebSockets
+OAuth
+Data Structures
+Algorithms
+System Design
+Distributed Systems
+"""
+# Short or everyday words that only count when written exactly like this, and not
+# joined to a neighbouring word ('R&D', 'Excel-lent', 'C. Smith')
+CASE_SENSITIVE_SKILLS = {"Go", "R", "C", "Swift", "Rust", "Spring", "Express", "Shell", "Lambda", "Excel", "REST", "ML", "TS"}
+_JOINED_BEFORE = re.compile(r"[A-Za-z][&'’.-]$")
+_JOINED_AFTER = re.compile(r"^(?:[&'’-][A-Za-z]|\.\s*[A-Za-z])")
+# Too short to trust in prose ('I will Go home'): only counted as a list item
+LIST_ONLY_SKILLS = {"Go", "R", "C"}
+_LIST_BEFORE = re.compile(r"(?:^|[,;|/•·▪●(:\t]|\s[-–]|\s(?:and|or|&))\s*$", re.IGNORECASE)
+_LIST_AFTER = re.compile(r"^\s*(?:$|\.\s*$|[,;|/•·▪●):\t]|[-–]\s|(?:and|or|&)\s)", re.IGNORECASE)
+
+
+# === Aho-Corasick ===
+
+class AhoCorasick:
+    """Multi-pattern matcher: finds every occurrence of every pattern in one pass."""
+
+    def __init__(self, patterns):
+        self._goto = [{}]
+        self._fail = [0]
+        self._out = [[]]
+        for pattern in patterns:
+            node = 0
+            for char in pattern:
+                nxt = self._goto[node].get(char)
+                if nxt is None:
+                    nxt = len(self._goto)
+                    self._goto[node][char] = nxt
+                    self._goto.append({})
+                    self._fail.append(0)
+                    self._out.append([])
+                node = nxt
+            self._out[node].append(pattern)
+        # Breadth-first failure links
+        queue = deque(self._goto[0].values())
+        while queue:
+            node = queue.popleft()
+            for char, child in self._goto[node].items():
+                queue.append(child)
+                fallback = self._fail[node]
+                while fallback and char not in self._goto[fallback]:
+                    fallback = self._fail[fallback]
+                self._fail[child] = self._goto[fallback].get(char, 0) if node else 0
+                self._out[child] = self._out[child] + self._out[self._fail[child]]
+
+    def iter_matches(self, text):
+        """Yields (end index exclusive, pattern) for every match."""
+        goto, fail, out = self._goto, self._fail, self._out
+        node = 0
+        for index, char in enumerate(text):
+            while node and char not in goto[node]:
+                node = fail[node]
+            node = goto[node].get(char, 0)
+            for pattern in out[node]:
+                yield index + 1, pattern
+
+
+def _load_vocabulary():
+    vocabulary = {}
+    lines = DEFAULT_SKILLS.splitlines()
+    if SKILLS_VOCABULARY_FILE:
+        try:
+            with open(SKILLS_VOCABULARY_FILE, encoding="utf-8") as f:
+                lines.extend(f.read().splitlines())
+        except OSError as e:
+            logger.error(f"Could not read SKILLS_VOCABULARY_FILE '{SKILLS_VOCABULARY_FILE}': {e}")
+    for line in lines:
+        line = line.strip()
+        if not line or line.startswith("#"):
+            continue
+        alias, _, canonical = line.partition("=")
+        vocabulary[alias.strip().lower()] = (canonical or alias).strip()
+    return vocabulary
+
+
+SKILL_VOCABULARY = _load_vocabulary()
+_SKILL_MATCHER = AhoCorasick(SKILL_VOCABULARY)
+_CASE_SENSITIVE = {skill.lower(): skill for skill in CASE_SENSITIVE_SKILLS}
+
+
+def _is_word_char(char):
+    return char.isalnum() or char in "+#"
+
+
+def _ambiguous_skill_in_context(text, start, end, exact):
+    """Checks a case-sensitive skill's spelling and surroundings (LIST_ONLY_SKILLS need list punctuation)."""
+    if text[start:end] != exact:
+        return False
+    line_start = text.rfind("\n", 0, start) + 1
+    line_end = text.find("\n", end)
+    before, after = text[line_start:start], text[end:line_end if line_end != -1 else len(text)]
+    if _JOINED_BEFORE.search(before) or _JOINED_AFTER.match(after):
+        return False
+    return exact not in LIST_ONLY_SKILLS or bool(_LIST_BEFORE.search(before) and _LIST_AFTER.match(after))
+
+
+def find_skills(text: str) -> list:
+    """Canonical names of vocabulary skills found in the text, in order of first appearance."""
+    lowered = text.lower()
+    found = {}
+    for end, alias in _SKILL_MATCHER.iter_matches(lowered):
+        start = end - len(alias)
+        if start > 0 and _is_word_char(lowered[start - 1]) and _is_word_char(alias[0]):
+            continue
+        if end < len(lowered) and _is_word_char(lowered[end]) and _is_word_char(alias[-1]):
+            continue
+        exact = _CASE_SENSITIVE.get(alias)
+        if exact is not None and not _ambiguous_skill_in_context(text, start, end, exact):
+            continue
+        found.setdefault(SKILL_VOCABULARY[alias], start)
+    return sorted(found, key=found.get)
+
+
+# === Extraction ===
+
+def _guess_name(lines):
+    for line in lines[:5]:
+        candidate = line.strip()
+        if not candidate or EMAIL_PATTERN.search(candidate) or any(ch.isdigit() for ch in candidate):
+            continue
+        tokens = candidate.split()
+        if 2 <= len(tokens) <= 4 and all(_NAME_TOKEN.match(token) for token in tokens) and heading_kind(candidate) is None:
+            return candidate.title() if candidate.isupper() else candidate
+        return None # The first real line isn't name-shaped: leave the name to the model
+    return None
+
+
+def _is_phone(candidate):
+    """Filters PHONE_PATTERN matches: enough digits, and not dates ('2019-2021', '2015 2019', '2019.06 - 2021.08')."""
+    return (sum(ch.isdigit() for ch in candidate) >= 7 and not has_date_range(candidate)
+            and not _DATE_SEQUENCE.match(candidate.strip()))
+
+
+def _is_contact_line(line):
+    """True when a line holds nothing but contact details (and their labels/separators)."""
+    without_links = URL_PATTERN.sub(" ", EMAIL_PATTERN.sub(" ", line))
+    phones = [match.group() for match in PHONE_PATTERN.finditer(without_links) if _is_phone(match.group())]
+    if not (phones or EMAIL_PATTERN.search(line) or URL_PATTERN.search(line)):
+        return False
+    rest = PHONE_PATTERN.sub(lambda match: " " if _is_phone(match.group()) else match.group(), without_links)
+    rest = _CONTACT_LABELS.sub(" ", rest)
+    return not re.sub(r"[\W_]+", "", rest)
+
+
+def _skills_section_covered(section):
+    """True when every item listed in a skills section is a vocabulary skill."""
+    items = [item.strip(" .:-") for line in section.lines[1:] for item in _SKILL_SEPARATORS.split(line)]
+    items = [item for item in items if item]
+    return bool(items) and all(find_skills(item) for item in items)
+
+
+class LocalExtraction:
+    def __init__(self, name, emails, phones, urls, skills, remaining_text, simple, original_chars):
+        self.name = name
+        self.emails = emails
+        self.phones = phones
+        self.urls = urls
+        self.skills = skills
+        self.remaining_text = remaining_text
+        self.simple = simple
+        self.original_chars = original_chars
+
+    def contact(self) -> dict:
+        return {"emails": self.emails, "phones": self.phones, "urls": self.urls}
+
+    def as_parsed(self) -> dict:
+        """The parsed-resume structure from local extraction alone (for LLM-free parses)."""
+        return {"name": self.name or "", "skills": list(self.skills), "experience": [], "projects": [], "contact": self.contact()}
+
+    def merge_into(self, parsed_data: dict) -> dict:
+        """Fills the fields the model may have missed: name, vocabulary skills and contact details."""
+        if not parsed_data.get("name") and self.name:
+            parsed_data["name"] = self.name
+        skills = parsed_data.get("skills")
+        if not isinstance(skills, list):
+            skills = [skills] if skills else []
+        seen = {str(skill).strip().lower() for skill in skills}
+        skills.extend(skill for skill in self.skills if skill.lower() not in seen)
+        parsed_data["skills"] = skills
+        parsed_data["contact"] = self.contact()
+        return parsed_data
+
+
+def _page_furniture(text):
+    """
+    Short lines found at the top or bottom of most pages of a PDF (pdf_extract separates
+    pages with a form feed). DOCX and plain text have no page breaks and yield nothing.
+    """
+    pages = text.split("\f")
+    if len(pages) < 2:
+        return set()
+    counts = Counter()
+    for page in pages:
+        lines = [line.strip() for line in page.splitlines() if line.strip()]
+        edges = set(lines[:PAGE_EDGE_LINES] + lines[-PAGE_EDGE_LINES:])
+        counts.update(line for line in edges if len(line) <= 80 and heading_kind(line) is None)
+    min_pages = max(2, (len(pages) + 1) // 2)
+    return {line for line, count in counts.items() if count >= min_pages}
+
+
+def _is_name_line(line, name):
+    """True for the candidate's name alone or with a page number/contact details (e.g. 'Jane Doe - Page 2')."""
+    if not name or not line.lower().startswith(name.lower()):
+        return False
+    rest = line[len(name):].strip(" \t|-–—•·,")
+    return not rest or bool(_BOILERPLATE_LINE.match(rest)) or _is_contact_line(rest)
+
+
+def _unique(values):
+    return list(dict.fromkeys(value.strip().rstrip(".") for value in values))
+
+
+def extract_local(text: str) -> LocalExtraction:
+    """Runs the local extraction and computes the reduced text to send to the model."""
+    lines = text.splitlines()
+    emails = _unique(EMAIL_PATTERN.findall(text))
+    urls = _unique(url for url in URL_PATTERN.findall(text) if "@" not in url)
+    phones = _unique(phone for phone in PHONE_PATTERN.findall(URL_PATTERN.sub(" ", text)) if _is_phone(phone))
+    skills = find_skills(text)
+    name = _guess_name(lines)
+
+    repeated = _page_furniture(text) # Headers/footers at the page boundaries of a PDF
+    name_seen = False
+
+    sections = segment_sections(text)
+    kept = []
+    for section in sections:
+        if normalize_heading(section.heading) in SKILL_HEADINGS and _skills_section_covered(section):
+            continue # Every listed skill is already in `skills`
+        for line in section.lines:
+            stripped = line.strip()
+            if stripped and (stripped in repeated or _BOILERPLATE_LINE.match(stripped) or _is_contact_line(stripped)):
+                continue
+            if _is_name_line(stripped, name):
+                if name_seen:
+                    continue # Running header repeating the name
+                name_seen = True
+            kept.append(line)
+    remaining_text = re.sub(r"\n{3,}", "\n\n", "\n".join(kept)).strip()
+
+    simple = (
+        name is not None
+        and not any(section.kind in (SECTION_EXPERIENCE, SECTION_PROJECTS) for section in sections)
+        and not has_date_range(remaining_text)
+        and len(remaining_text) <= RESUME_LOCAL_ONLY_MAX_CHARS
+    )
+    return LocalExtraction(name, emails, phones, urls, skills, remaining_text, simple, len(text))
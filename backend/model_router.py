@@ -0,0 +1,130 @@
+# backend/model_router.py
+# Per-task model selection with escalation.
+#
+# Each task (resume parsing, the first interview question, follow-up turns, context
+# summaries) has a route: a comma-separated list of models, fastest first, set with
+# MODEL_ROUTE_<TASK>. A call tries the first tier; when the caller's check of the
+# answer raises ValueError (unparseable JSON, missing keys, no score...) the same
+# request is retried on the next tier. The last tier's answer is always accepted
+# (the caller is told it is final, so it can repair rather than reject). Network
+# and API errors are not escalated: they propagate unchanged.
+import logging
+import os
+import threading
+import time
+from collections import defaultdict
+
+from metrics import REGISTRY
+
+logger = logging.getLogger(__name__)
+
+SMALL_MODEL = "llama3-8b-8192"
+LARGE_MODEL = "llama3-70b-8192"
+
+TASK_PARSE = "parse"
+TASK_START = "start"
+TASK_CONTINUE = "continue"
+TASK_SUMMARIZE = "summarize"
+
+DEFAULT_ROUTES = {
+    TASK_PARSE: f"{SMALL_MODEL},{LARGE_MODEL}", # Low-temperature JSON extraction: the small model is usually enough
+    TASK_START: LARGE_MODEL,
+    TASK_CONTINUE: LARGE_MODEL,
+    TASK_SUMMARIZE: SMALL_MODEL,
+}
+
+MODEL_TIER_SECONDS = REGISTRY.histogram(
+    "resumep_model_tier_seconds",
+    "Latency of one routed LLM attempt (call plus answer check), by task and model.",
+    ("task", "model")
+)
+MODEL_TIER_CALLS = REGISTRY.counter(
+    "resumep_model_tier_calls_total",
+    "Routed LLM attempts by task, model and outcome (accepted, escalated, error).",
+    ("task", "model", "outcome")
+)
+MODEL_ESCALATIONS = REGISTRY.counter(
+    "resumep_model_escalations_total",
+    "Answers rejected by a tier and retried on the next one, by task and reason.",
+    ("task", "reason")
+)
+
+
+class IncompleteAnswer(ValueError):
+    """Valid answer that lacks required content (e.g. JSON keys); escalated like invalid JSON."""
+    reason = "missing_keys"
+
+
+def parse_route(value: str) -> list:
+    return [model.strip() for model in value.split(",") if model.strip()]
+
+
+def load_routes() -> dict:
+    return {task: parse_route(os.getenv(f"MODEL_ROUTE_{task.upper()}", default)) or parse_route(default)
+            for task, default in DEFAULT_ROUTES.items()}
+
+
+class ModelRouter:
+    """Runs task attempts along a route of models, escalating rejected answers."""
+
+    def __init__(self, routes=None):
+        self.routes = routes or load_routes()
+        self._lock = threading.Lock()
+        self._attempts = defaultdict(int) # (task, model) -> attempts
+        self._escalated = defaultdict(int) # (task, model) -> answers rejected by that tier
+
+    def models(self, task) -> list:
+        return self.routes[task]
+
+    def primary_model(self, task) -> str:
+        """First (fastest) tier; for calls whose answer isn't checked."""
+        return self.routes[task][0]
+
+    def final_model(self, task) -> str:
+        """Last tier; for streamed answers, which can't be retried once sent."""
+        return self.routes[task][-1]
+
+    def run(self, task, attempt, label="N/A", min_attempts=1):
+        """
+        Calls `attempt(model, final)` on each tier until one returns. A ValueError
+        from a non-final attempt moves on to the next tier. With min_attempts > the
+        route length, the last tier is retried (e.g. one retry on a single-model route).
+        """
+        tiers = list(self.routes[task])
+        tiers += [tiers[-1]] * (min_attempts - len(tiers))
+        for index, model in enumerate(tiers):
+            final = index == len(tiers) - 1
+            started = time.perf_counter()
+            outcome = "error"
+            try:
+                result = attempt(model, final)
+                outcome = "accepted"
+                return result
+            except ValueError as e:
+                if final:
+                    raise
+                outcome = "escalated"
+                reason = getattr(e, "reason", "invalid_json")
+                MODEL_ESCALATIONS.labels(task, reason).inc()
+                logger.warning(f"{task} answer from {model} rejected for '{label}' ({reason}: {e}); retrying on {tiers[index + 1]}.")
+            finally:
+                MODEL_TIER_SECONDS.labels(task, model).observe(time.perf_counter() - started)
+                MODEL_TIER_CALLS.labels(task, model, outcome).inc()
+                with self._lock:
+                    self._attempts[(task, model)] += 1
+                    self._escalated[(task, model)] += outcome == "escalated"
+
+    def stats(self) -> dict:
+        with self._lock:
+            tiers = {}
+            for (task, model), attempts in self._attempts.items():
+                escalated = self._escalated[(task, model)]
+                tiers.setdefault(task, {})[model] = {
+                    "attempts": attempts,
+                    "escalated": escalated,
+                    "escalationRate": round(escalated / attempts, 4) if attempts else 0.0,
+                }
+        return {"routes": self.routes, "tiers": tiers}
+
+
+model_router = ModelRouter()
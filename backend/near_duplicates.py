@@ -0,0 +1,238 @@
+# backend/near_duplicates.py
+# Near-duplicate detection for extracted resume text.
+#
+# Each resume gets a 64-bit SimHash over word 3-shingles plus a hash per normalized
+# line; both are stored on its `resumes` document. Every worker keeps an in-memory
+# index of the SimHashes, split into NEAR_DUP_MAX_DISTANCE + 1 bands: two hashes
+# within that Hamming distance must agree exactly on at least one band (pigeonhole),
+# so a lookup only compares against a few bucket entries instead of every resume.
+# The line hashes tell an exact re-export (same lines, different file) apart from
+# a lightly edited resume, which can be patched from the earlier parsedData.
+import hashlib
+import logging
+import os
+import re
+import threading
+import time
+from collections import defaultdict
+from datetime import datetime, timedelta, timezone
+
+logger = logging.getLogger(__name__)
+
+NEAR_DUP_ENABLED = os.getenv("NEAR_DUP_ENABLED", "True").lower() == "true"
+NEAR_DUP_MAX_DISTANCE = int(os.getenv("NEAR_DUP_MAX_DISTANCE", "5")) # Hamming distance out of 64 bits
+NEAR_DUP_MAX_DIFF_LINES = int(os.getenv("NEAR_DUP_MAX_DIFF_LINES", "12")) # Added + removed lines still worth patching
+NEAR_DUP_REFRESH_SECONDS = float(os.getenv("NEAR_DUP_REFRESH_SECONDS", "30"))
+NEAR_DUP_REFRESH_OVERLAP_SECONDS = 120 # Re-read recent docs: other workers' buffered inserts land late
+
+SIMHASH_BITS = 64
+SHINGLE_SIZE = 3
+_WORD = re.compile(r"[a-z0-9+#]+")
+_LINE_STRIP = re.compile(r"^[\W_]+|[\W_]+$")
+
+
+class ResumeFingerprint:
+    """SimHash of the whole text plus the (display line, line hash) pairs."""
+
+    def __init__(self, simhash, lines, line_hashes):
+        self.simhash = simhash
+        self.lines = lines
+        self.line_hashes = line_hashes
+
+    def document_fields(self) -> dict:
+        """Fields stored on the resumes document."""
+        return {"simhash": to_signed64(self.simhash), "lineHashes": sorted(set(self.line_hashes))}
+
+
+def _hash64(text: str) -> int:
+    return int.from_bytes(hashlib.blake2b(text.encode("utf-8"), digest_size=8).digest(), "big")
+
+
+def to_signed64(value: int) -> int:
+    """MongoDB stores signed 64-bit integers."""
+    return value - (1 << 64) if value >= (1 << 63) else value
+
+
+def from_signed64(value: int) -> int:
+    return value + (1 << 64) if value < 0 else value
+
+
+def _normalize_line(line: str) -> str:
+    return _LINE_STRIP.sub("", " ".join(line.lower().split()))
+
+
+def simhash(tokens) -> int:
+    """64-bit SimHash of a token sequence, using word shingles as features."""
+    if len(tokens) < SHINGLE_SIZE:
+        features = [" ".join(tokens)] if tokens else []
+    else:
+        features = [" ".join(tokens[i:i + SHINGLE_SIZE]) for i in range(len(tokens) - SHINGLE_SIZE + 1)]
+    if not features:
+        return 0
+    # Per-bit majority vote; zip over fixed-width bit strings keeps the counting in C
+    bit_strings = [format(_hash64(feature), "064b") for feature in features]
+    threshold = len(bit_strings) / 2
+    value = 0
+    for column in zip(*bit_strings):
+        value = (value << 1) | (column.count("1") > threshold)
+    return value
+
+
+def fingerprint_text(text: str) -> ResumeFingerprint:
+    """Fingerprints extracted resume text (case, whitespace and bullet characters are ignored)."""
+    lines, line_hashes = [], []
+    for raw_line in text.splitlines():
+        normalized = _normalize_line(raw_line)
+        if len(normalized) < 3:
+            continue
+        lines.append(raw_line.strip())
+        line_hashes.append(hashlib.blake2b(normalized.encode("utf-8"), digest_size=6).hexdigest())
+    return ResumeFingerprint(simhash(_WORD.findall(text.lower())), lines, line_hashes)
+
+
+def hamming(a: int, b: int) -> int:
+    return (a ^ b).bit_count()
+
+
+class NearDuplicateIndex:
+    """
+    Thread-safe in-memory SimHash index of resume ids. `load(since)` yields
+    {'_id', 'simhash', 'uploadedAt'} docs (all of them when since is None); `start()`
+    does a full load, then refreshes incrementally every NEAR_DUP_REFRESH_SECONDS.
+    """
+
+    def __init__(self, load=None, max_distance=NEAR_DUP_MAX_DISTANCE, refresh_seconds=NEAR_DUP_REFRESH_SECONDS):
+        self.load = load
+        self.max_distance = max_distance
+        self.refresh_seconds = refresh_seconds
+        # Band boundaries over the 64 bits, as even as possible
+        bands = max_distance + 1
+        edges = [round(i * SIMHASH_BITS / bands) for i in range(bands + 1)]
+        self._bands = [(edges[i], (1 << (edges[i + 1] - edges[i])) - 1) for i in range(bands)] # (shift, mask)
+        self._buckets = [defaultdict(list) for _ in range(bands)]
+        self._hashes = {} # resume id -> simhash
+        self._lock = threading.Lock()
+        self._loaded_until = None
+        self._thread = None
+        self._stop = threading.Event()
+        self.lookups = 0
+        self.matches = 0
+
+    def add(self, resume_id, simhash_value):
+        """Indexes a resume; re-adding a known id is a no-op."""
+        simhash_value = from_signed64(simhash_value)
+        with self._lock:
+            if resume_id in self._hashes:
+                return
+            self._hashes[resume_id] = simhash_value
+            for (shift, mask), buckets in zip(self._bands, self._buckets):
+                buckets[(simhash_value >> shift) & mask].append(resume_id)
+
+    def query(self, simhash_value, max_distance=None, limit=10, exclude=None) -> list:
+        """Returns [(resume_id, distance)] within max_distance, closest first."""
+        simhash_value = from_signed64(simhash_value)
+        max_distance = self.max_distance if max_distance is None else min(max_distance, self.max_distance)
+        found = {}
+        with self._lock:
+            for (shift, mask), buckets in zip(self._bands, self._buckets):
+                for resume_id in buckets.get((simhash_value >> shift) & mask, ()):
+                    if resume_id not in found and resume_id != exclude:
+                        distance = hamming(simhash_value, self._hashes[resume_id])
+                        if distance <= max_distance:
+                            found[resume_id] = distance
+            self.lookups += 1
+            self.matches += bool(found)
+        return sorted(found.items(), key=lambda item: item[1])[:limit]
+
+    def refresh(self):
+        """Loads documents uploaded since the last refresh (everything on the first call)."""
+        since = self._loaded_until - timedelta(seconds=NEAR_DUP_REFRESH_OVERLAP_SECONDS) if self._loaded_until else None
+        started = time.perf_counter()
+        before = len(self._hashes)
+        newest = self._loaded_until
+        for doc in self.load(since):
+            self.add(doc["_id"], doc["simhash"])
+            uploaded_at = doc.get("uploadedAt")
+            if uploaded_at is not None:
+                if uploaded_at.tzinfo is None:
+                    uploaded_at = uploaded_at.replace(tzinfo=timezone.utc) # PyMongo returns naive UTC
+                newest = max(newest, uploaded_at) if newest else uploaded_at
+        self._loaded_until = newest or datetime.now(timezone.utc)
+        added = len(self._hashes) - before
+        if since is None or added:
+            logger.info(f"Near-duplicate index loaded {added} resumes in {(time.perf_counter() - started) * 1000:.0f}ms (total {len(self._hashes)}).")
+
+    def start(self):
+        if self.load is None or (self._thread and self._thread.is_alive()):
+            return
+
+        def _run():
+            while True:
+                try:
+                    self.refresh()
+                except Exception as e:
+                    logger.warning(f"Near-duplicate index refresh failed: {e}")
+                if self._stop.wait(self.refresh_seconds):
+                    return
+
+        self._stop.clear()
+        self._thread = threading.Thread(target=_run, name="near-dup-index", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "entries": len(self._hashes),
+                "bands": len(self._bands),
+                "maxDistance": self.max_distance,
+                "loadedUntil": self._loaded_until.isoformat() if self._loaded_until else None,
+                "lookups": self.lookups,
+                "matches": self.matches,
+            }
+
+
+class NearDuplicateMatch:
+    """The closest usable earlier resume and how its lines differ from the new text."""
+
+    def __init__(self, resume_id, distance, parsed_data, added_lines, removed_count):
+        self.resume_id = resume_id
+        self.distance = distance
+        self.parsed_data = parsed_data
+        self.added_lines = added_lines
+        self.removed_count = removed_count
+
+    @property
+    def identical_lines(self) -> bool:
+        return not self.added_lines and not self.removed_count
+
+    @property
+    def patchable(self) -> bool:
+        return len(self.added_lines) + self.removed_count <= NEAR_DUP_MAX_DIFF_LINES
+
+    def info(self, mode) -> dict:
+        return {"mode": mode, "resumeId": str(self.resume_id), "distance": self.distance,
+                "addedLines": len(self.added_lines), "removedLines": self.removed_count}
+
+
+def find_near_duplicate(fingerprint, index, load_resume, candidates=3):
+    """
+    Returns a NearDuplicateMatch for the closest indexed resume whose document (read
+    with `load_resume(resume_id)`, which returns parsedData and lineHashes) is usable,
+    or None.
+    """
+    new_hashes = set(fingerprint.line_hashes)
+    for resume_id, distance in index.query(fingerprint.simhash, limit=candidates):
+        doc = load_resume(resume_id)
+        if not doc or not doc.get("parsedData") or "lineHashes" not in doc:
+            continue # Still in another worker's write buffer, or stored before fingerprints
+        old_hashes = set(doc["lineHashes"])
+        added, seen = [], set()
+        for line, line_hash in zip(fingerprint.lines, fingerprint.line_hashes):
+            if line_hash not in old_hashes and line_hash not in seen:
+                seen.add(line_hash)
+                added.append(line)
+        return NearDuplicateMatch(resume_id, distance, doc["parsedData"], added, len(old_hashes - new_hashes))
+    return None
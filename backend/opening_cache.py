@@ -0,0 +1,136 @@
+# backend/opening_cache.py
+# Speculatively generated interview openings (greeting + first question).
+#
+# The opening prompt depends only on the parsed resume (name, top skills, number of
+# positions and projects), so it can be generated in the background as soon as a
+# resume is parsed, before the candidate asks to start. Openings are kept per process
+# in a small LRU with a short TTL, keyed by a fingerprint of the prompt inputs, and
+# handed out once: a second interview for the same resume gets a fresh opening. A
+# /start-interview that arrives while the generation is running waits for it (up to
+# about one LLM call) instead of starting a second identical call; a generation still
+# queued behind other prewarms is cancelled and the opening is generated live.
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeoutError
+
+from metrics import REGISTRY
+
+logger = logging.getLogger(__name__)
+
+OPENING_PREWARM_ENABLED = os.getenv("OPENING_PREWARM_ENABLED", "True").lower() == "true"
+OPENING_CACHE_TTL_SECONDS = float(os.getenv("OPENING_CACHE_TTL_SECONDS", "900"))
+OPENING_CACHE_MAX_ENTRIES = int(os.getenv("OPENING_CACHE_MAX_ENTRIES", "2000"))
+OPENING_PREWARM_WORKERS = int(os.getenv("OPENING_PREWARM_WORKERS", "4"))
+OPENING_PREWARM_MAX_PENDING = int(os.getenv("OPENING_PREWARM_MAX_PENDING", "32")) # Beyond this, prewarming is skipped
+OPENING_JOIN_WAIT_SECONDS = float(os.getenv("OPENING_JOIN_WAIT_SECONDS", "5")) # Wait on a running prewarm (~one LLM call) before calling live
+
+OPENING_CACHE_OUTCOMES = REGISTRY.counter(
+    "resumep_opening_cache_total",
+    "Interview opening lookups and prewarms by outcome (hit, joined, miss, prewarmed, skipped, cancelled, failed).",
+    ("outcome",)
+)
+
+
+class OpeningCache:
+    """Thread-safe LRU + TTL cache of prewarmed openings, with in-flight de-duplication."""
+
+    def __init__(self, max_entries=OPENING_CACHE_MAX_ENTRIES, ttl_seconds=OPENING_CACHE_TTL_SECONDS,
+                 workers=OPENING_PREWARM_WORKERS, max_pending=OPENING_PREWARM_MAX_PENDING):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.max_pending = max_pending
+        self._entries = OrderedDict() # key -> (stored_at_monotonic, opening)
+        self._pending = {} # key -> Future of an opening being generated
+        self._claimed = set() # Pending futures whose opening a waiting request has already taken
+        self._lock = threading.Lock()
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="opening-prewarm")
+        self.counts = {"hit": 0, "joined": 0, "miss": 0, "prewarmed": 0, "skipped": 0, "cancelled": 0, "failed": 0, "expired": 0}
+
+    def _count(self, outcome):
+        self.counts[outcome] += 1 # Callers hold self._lock
+        OPENING_CACHE_OUTCOMES.labels(outcome).inc()
+
+    def prewarm(self, key, generate):
+        """Starts `generate()` in the background unless the opening is cached, pending or the queue is full."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if key in self._pending or (entry is not None and time.monotonic() - entry[0] <= self.ttl_seconds):
+                return
+            if len(self._pending) >= self.max_pending:
+                self._count("skipped")
+                return
+            future = self._pending[key] = self._pool.submit(generate)
+        future.add_done_callback(lambda done: self._finish(key, done))
+
+    def _finish(self, key, future):
+        with self._lock:
+            if self._pending.get(key) is future:
+                del self._pending[key]
+            if future.cancelled():
+                self._count("cancelled")
+                return
+            if future in self._claimed:
+                self._claimed.discard(future)
+                return
+            if future.exception() is not None:
+                self._count("failed")
+                logger.warning(f"Prewarming interview opening {key} failed: {future.exception()}")
+                return
+            opening = future.result()
+            if not opening or not opening.strip():
+                self._count("failed")
+                return
+            self._entries[key] = (time.monotonic(), opening)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+            self._count("prewarmed")
+
+    def take(self, key, wait_seconds=0.0):
+        """
+        Returns (opening, outcome) and removes the opening from the cache. A running
+        generation is waited on for up to wait_seconds; one still queued is cancelled,
+        since the caller's live call would finish first. Returns (None, 'miss') otherwise.
+        """
+        with self._lock:
+            entry = self._entries.pop(key, None)
+            if entry is not None:
+                if time.monotonic() - entry[0] <= self.ttl_seconds:
+                    self._count("hit")
+                    return entry[1], "hit"
+                self._count("expired")
+            future = self._pending.get(key)
+        if future is not None and not future.running() and future.cancel():
+            future = None # _finish drops it from _pending
+        if future is not None and wait_seconds > 0:
+            try:
+                opening = future.result(wait_seconds)
+            except FutureTimeoutError:
+                opening = None
+            except Exception:
+                opening = None # Already logged by _finish
+            if opening and opening.strip():
+                with self._lock:
+                    # Only one waiter gets it; if _finish already cached it, it must still be there
+                    finished = future.done() and self._pending.get(key) is not future
+                    if future not in self._claimed and (not finished or self._entries.get(key, (0, None))[1] is opening):
+                        if finished:
+                            del self._entries[key]
+                        else:
+                            self._claimed.add(future)
+                        self._count("joined")
+                        return opening, "joined"
+        with self._lock:
+            self._count("miss")
+        return None, "miss"
+
+    def stats(self) -> dict:
+        with self._lock:
+            return dict(self.counts, entries=len(self._entries), pending=len(self._pending), ttlSeconds=self.ttl_seconds)
+
+    def close(self):
+        self._pool.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,134 @@
+# backend/parse_cache.py
+# Content-addressed cache for /parse-resume results.
+#
+# Entries are keyed on a hash of the raw upload bytes together with the parse
+# prompt and model, so a prompt or model change never serves stale results.
+# There are two tiers: an in-process LRU (fast, per worker) and an optional
+# persistent tier backed by the `resumes` collection (shared across workers).
+import hashlib
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+
+logger = logging.getLogger(__name__)
+
+PARSE_CACHE_MAX_ENTRIES = int(os.getenv("PARSE_CACHE_MAX_ENTRIES", "1024"))
+PARSE_CACHE_TTL_SECONDS = int(os.getenv("PARSE_CACHE_TTL_SECONDS", str(7 * 24 * 3600)))  # One week
+
+
+def hash_bytes(data: bytes) -> str:
+    """Returns the hex SHA-256 digest of the raw upload bytes."""
+    return hashlib.sha256(data).hexdigest()
+
+
+def hash_stream(stream, chunk_size=1024 * 1024) -> str:
+    """Like hash_bytes, reading a seekable stream in chunks (left rewound)."""
+    h = hashlib.sha256()
+    stream.seek(0)
+    for chunk in iter(lambda: stream.read(chunk_size), b""):
+        h.update(chunk)
+    stream.seek(0)
+    return h.hexdigest()
+
+
+def prompt_fingerprint(*prompt_parts: str) -> str:
+    """Returns a short, stable fingerprint of the prompt text used for parsing."""
+    h = hashlib.sha256()
+    for part in prompt_parts:
+        h.update(part.encode("utf-8"))
+        h.update(b"\x00")  # Separator so ("ab", "c") != ("a", "bc")
+    return h.hexdigest()[:16]
+
+
+def make_cache_key(content_hash: str, prompt_version: str, model: str) -> str:
+    """Builds the cache key from the upload hash, prompt fingerprint and model name."""
+    return f"{model}:{prompt_version}:{content_hash}"
+
+
+class ParseCache:
+    """
+    Thread-safe LRU + TTL cache of parsed resume data, with an optional
+    persistent tier. `persistent_get(key, max_age_seconds)` is consulted on a
+    memory miss; a hit there is promoted into memory.
+    """
+
+    def __init__(self, max_entries=PARSE_CACHE_MAX_ENTRIES, ttl_seconds=PARSE_CACHE_TTL_SECONDS, persistent_get=None):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.persistent_get = persistent_get
+        self._entries = OrderedDict()  # key -> (stored_at_monotonic, parsed_data)
+        self._lock = threading.Lock()
+        self.memory_hits = 0
+        self.persistent_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def get(self, key):
+        """
+        Returns (parsed_data, tier) where tier is 'memory', 'persistent' or None on a miss.
+        The returned dict is shared with the cache and must be treated as read-only.
+        """
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                stored_at, parsed_data = entry
+                if now - stored_at <= self.ttl_seconds:
+                    self._entries.move_to_end(key)
+                    self.memory_hits += 1
+                    return parsed_data, "memory"
+                del self._entries[key]
+                self.expirations += 1
+
+        if self.persistent_get is not None:
+            try:
+                parsed_data = self.persistent_get(key, self.ttl_seconds)
+            except Exception as e:
+                # The persistent tier is an optimization; never fail a parse because of it
+                logger.warning(f"Parse cache persistent lookup failed for {key}: {e}")
+                parsed_data = None
+            if parsed_data is not None:
+                self._store(key, parsed_data, now)
+                with self._lock:
+                    self.persistent_hits += 1
+                return parsed_data, "persistent"
+
+        with self._lock:
+            self.misses += 1
+        return None, None
+
+    def put(self, key, parsed_data):
+        """Stores a freshly parsed result in the in-memory tier."""
+        self._store(key, parsed_data, time.monotonic())
+
+    def _store(self, key, parsed_data, stored_at):
+        with self._lock:
+            self._entries[key] = (stored_at, parsed_data)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        """Drops every in-memory entry (counters are kept)."""
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> dict:
+        """Returns a snapshot of cache size and hit/miss counters."""
+        with self._lock:
+            lookups = self.memory_hits + self.persistent_hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "maxEntries": self.max_entries,
+                "ttlSeconds": self.ttl_seconds,
+                "memoryHits": self.memory_hits,
+                "persistentHits": self.persistent_hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "hitRatio": round((self.memory_hits + self.persistent_hits) / lookups, 4) if lookups else 0.0,
+            }
@@ -0,0 +1,202 @@
+# backend/pdf_extract.py
+# Page-parallel PDF text extraction.
+#
+# Pages are split into one contiguous range per pool worker, so the PDF bytes are
+# pickled to each worker once, and the ranges are consumed in page order. When the
+# text is capped at max_chars, short ranges are submitted a few at a time instead,
+# and submitting stops once the collected text (plus what is in flight) should reach
+# the cap, so pages past it are never parsed. Small documents are extracted inline,
+# where the pool round-trip would cost more than it saves. Pages are separated by
+# a form feed (as pdftotext does), so later stages can tell page headers/footers apart.
+import hashlib
+import io
+import logging
+import multiprocessing
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from dataclasses import dataclass, field
+
+from PyPDF2 import PdfReader
+
+logger = logging.getLogger(__name__)
+
+PDF_EXTRACT_WORKERS = int(os.getenv("PDF_EXTRACT_WORKERS", str(os.cpu_count() or 2)))
+PDF_PARALLEL_MIN_PAGES = int(os.getenv("PDF_PARALLEL_MIN_PAGES", "4")) # Fewer pages than this are extracted inline
+PDF_LIMITED_RANGE_PAGES = int(os.getenv("PDF_LIMITED_RANGE_PAGES", "2")) # Range length when extraction stops at max_chars
+PAGE_SEPARATOR = "\n\f" # str.splitlines() treats the form feed as a line break
+
+_pool = None
+_pool_lock = threading.Lock()
+
+# Per-worker cache of the most recently opened document, so a worker that gets a
+# second range of the same PDF doesn't re-parse the cross-reference table.
+_worker_reader = None # (digest, PdfReader)
+
+
+@dataclass
+class PdfExtractionResult:
+    """Text extracted from a PDF plus per-page timing information."""
+    text: str
+    page_count: int
+    pages_extracted: int
+    truncated: bool # True if extraction stopped early because max_chars was reached
+    total_seconds: float
+    page_timings: list = field(default_factory=list) # [(page_index, seconds, chars), ...]
+
+
+def get_extraction_pool():
+    """Returns the shared extraction process pool, creating it on first use."""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            # 'spawn' keeps workers independent of the (threaded) web server's state
+            _pool = ProcessPoolExecutor(
+                max_workers=PDF_EXTRACT_WORKERS,
+                mp_context=multiprocessing.get_context("spawn")
+            )
+            logger.info(f"Started PDF extraction pool with {PDF_EXTRACT_WORKERS} workers.")
+        return _pool
+
+
+def shutdown_extraction_pool():
+    """Shuts down the shared extraction pool (if it was started)."""
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown(wait=False, cancel_futures=True)
+            _pool = None
+            logger.info("PDF extraction pool shut down.")
+
+
+def _extract_page_batch(digest, pdf_bytes, page_indices, max_chars=None):
+    """
+    Worker entry point: extracts the given pages, returning [(index, text, seconds), ...].
+    Stops after the page that brings this range to max_chars.
+    """
+    global _worker_reader
+    if _worker_reader is None or _worker_reader[0] != digest:
+        _worker_reader = (digest, PdfReader(io.BytesIO(pdf_bytes)))
+    reader = _worker_reader[1]
+    results = []
+    collected = 0
+    for index in page_indices:
+        started = time.perf_counter()
+        page_text = reader.pages[index].extract_text() or ""
+        results.append((index, page_text, time.perf_counter() - started))
+        collected += len(page_text) + len(PAGE_SEPARATOR)
+        if max_chars and collected >= max_chars:
+            break
+    return results
+
+
+def _extract_inline(reader, max_chars):
+    """Sequential extraction in the calling process, stopping once max_chars is reached."""
+    parts, timings = [], []
+    collected = 0
+    truncated = False
+    for index, page in enumerate(reader.pages):
+        started = time.perf_counter()
+        page_text = page.extract_text() or ""
+        timings.append((index, time.perf_counter() - started, len(page_text)))
+        if page_text:
+            parts.append(page_text)
+            collected += len(page_text) + len(PAGE_SEPARATOR)
+        if max_chars and collected >= max_chars and index < len(reader.pages) - 1:
+            truncated = True
+            break
+    return parts, timings, truncated
+
+
+def _extract_parallel(pdf_bytes, page_count, max_chars):
+    """
+    Pooled extraction in contiguous page ranges, consumed in page order. Without a
+    text limit, each worker gets one range and all are submitted at once. With
+    max_chars, ranges are PDF_LIMITED_RANGE_PAGES long, at most one per worker is in
+    flight, and no range is submitted once the text collected plus what the ranges
+    in flight should add (at the average page length so far) reaches the limit.
+    """
+    pool = get_extraction_pool()
+    digest = hashlib.sha1(pdf_bytes).hexdigest()
+    pages_per_range = -(-page_count // PDF_EXTRACT_WORKERS) # ceil: the bytes go to each worker once
+    if max_chars:
+        pages_per_range = max(1, min(pages_per_range, PDF_LIMITED_RANGE_PAGES))
+    pending_starts = deque(range(0, page_count, pages_per_range))
+    max_in_flight = PDF_EXTRACT_WORKERS if max_chars else len(pending_starts)
+    in_flight = deque() # (future, pages in the range), in page order
+
+    parts, timings = [], []
+    collected = 0
+    truncated = False
+
+    def submit_ranges():
+        while pending_starts and len(in_flight) < max_in_flight:
+            if max_chars and timings:
+                expected = sum(pages for _, pages in in_flight) * collected / len(timings)
+                if collected + expected >= max_chars:
+                    return # The ranges in flight should be enough; decide again when one returns
+            start = pending_starts.popleft()
+            pages = list(range(start, min(start + pages_per_range, page_count)))
+            in_flight.append((pool.submit(_extract_page_batch, digest, pdf_bytes, pages, max_chars), len(pages)))
+
+    try:
+        submit_ranges()
+        while in_flight:
+            future, _ = in_flight.popleft()
+            for index, page_text, seconds in future.result():
+                if max_chars and collected >= max_chars:
+                    truncated = True # The range itself ran past the limit
+                    break
+                timings.append((index, seconds, len(page_text)))
+                if page_text:
+                    parts.append(page_text)
+                    collected += len(page_text) + len(PAGE_SEPARATOR)
+
+            if max_chars and collected >= max_chars:
+                if in_flight or pending_starts or timings[-1][0] < page_count - 1:
+                    truncated = True
+                break
+            submit_ranges()
+    finally:
+        for future, _ in in_flight:
+            future.cancel() # Pages past the limit are dropped (already-running ones just finish)
+    return parts, timings, truncated
+
+
+def extract_pdf_text(pdf_bytes: bytes, max_chars: int = None, filename: str = "N/A", parallel: bool = True) -> PdfExtractionResult:
+    """
+    Extracts text from PDF bytes, joining pages with PAGE_SEPARATOR. If max_chars is
+    given, extraction stops at the first page boundary past that many characters.
+    Pass parallel=False from inside a pool worker to avoid nested pools.
+    """
+    started = time.perf_counter()
+    reader = PdfReader(io.BytesIO(pdf_bytes))
+    page_count = len(reader.pages)
+
+    if parallel and page_count >= PDF_PARALLEL_MIN_PAGES and PDF_EXTRACT_WORKERS > 1:
+        try:
+            parts, timings, truncated = _extract_parallel(pdf_bytes, page_count, max_chars)
+        except BrokenProcessPool as e:
+            logger.error(f"PDF extraction pool failed for {filename}, falling back to inline extraction: {e}")
+            shutdown_extraction_pool()
+            parts, timings, truncated = _extract_inline(reader, max_chars)
+    else:
+        parts, timings, truncated = _extract_inline(reader, max_chars)
+
+    result = PdfExtractionResult(
+        text=PAGE_SEPARATOR.join(parts),
+        page_count=page_count,
+        pages_extracted=len(timings),
+        truncated=truncated,
+        total_seconds=time.perf_counter() - started,
+        page_timings=timings
+    )
+    logger.debug(
+        f"Extracted {result.pages_extracted}/{page_count} pages ({len(result.text)} chars) from {filename} "
+        f"in {result.total_seconds * 1000:.1f} ms; per page (ms): "
+        + ", ".join(f"p{index + 1}={seconds * 1000:.1f}" for index, seconds, _ in timings)
+    )
+    return result
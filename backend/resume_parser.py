@@ -0,0 +1,323 @@
+# backend/resume_parser.py
+# Resume parsing core shared by the /parse-resume route, the batch endpoint and the
+# batch CLI: prompt definition, text extraction from raw bytes, the LLM call and
+# JSON clean-up. Kept free of Flask and module-level connections so it can be
+# imported from worker processes and scripts.
+import json
+import logging
+import os
+import re
+from concurrent.futures import ThreadPoolExecutor
+
+from docx_extract import extract_docx_text
+from local_extract import RESUME_LOCAL_EXTRACTION, SKILL_VOCABULARY, extract_local
+from metrics import REGISTRY, time_stage
+from model_router import TASK_PARSE, IncompleteAnswer, model_router
+from parse_cache import prompt_fingerprint
+from pdf_extract import extract_pdf_text
+from resume_sections import SECTION_EXPERIENCE, SECTION_FULL, SECTION_PROFILE, SECTION_PROJECTS, chunk_sections, segment_sections
+
+logger = logging.getLogger(__name__)
+
+RESUME_PARSE_MODEL = ",".join(model_router.models(TASK_PARSE)) # Route (fast model first) used in cache keys
+RESUME_PARSE_SYSTEM_PROMPT = "You are an expert resume parser. Your sole task is to extract information and return it as a valid JSON object according to the user's specified format. Respond ONLY with the JSON object."
+RESUME_PARSE_PROMPT_TEMPLATE = """
+        **Task:** Extract key information from the following resume text.
+        **Output Format:** Return ONLY a valid JSON object with these exact keys: "name" (string), "skills" (list of strings), "experience" (list of objects, each representing a job), and "projects" (list of objects, each representing a project). If information for a key isn't found, use an empty string or empty list as appropriate.
+
+        **Resume Text:**
+        ```
+        {resume_text}
+        ```
+
+        **JSON Output:**
+        """
+# Long resumes are split into sections and parsed as several smaller prompts in parallel
+RESUME_CHUNK_PROMPT_TEMPLATE = """
+        **Task:** The text below is one part ({part}) of a longer resume. Extract {fields} from it.
+        **Output Format:** Return ONLY a valid JSON object with these exact keys: {keys}. If information for a key isn't found, use an empty string or empty list as appropriate.
+
+        **Resume Text ({part}):**
+        ```
+        {resume_text}
+        ```
+
+        **JSON Output:**
+        """
+_FIELD_DESCRIPTIONS = {
+    "name": '"name" (string, the candidate\'s name)',
+    "skills": '"skills" (list of strings)',
+    "experience": '"experience" (list of objects, each representing a job)',
+    "projects": '"projects" (list of objects, each representing a project)',
+}
+CHUNK_KEYS = {
+    SECTION_PROFILE: ("name", "skills"),
+    SECTION_EXPERIENCE: ("experience",),
+    SECTION_PROJECTS: ("projects",),
+    SECTION_FULL: ("name", "skills", "experience", "projects"),
+}
+RESUME_CHUNK_THRESHOLD_CHARS = int(os.getenv("RESUME_CHUNK_THRESHOLD_CHARS", "8000")) # Shorter texts use one prompt
+RESUME_CHUNK_CHARS = int(os.getenv("RESUME_CHUNK_CHARS", "6000")) # ~1.5k tokens per chunk prompt
+RESUME_CHUNK_CONCURRENCY = int(os.getenv("RESUME_CHUNK_CONCURRENCY", "4")) # Per resume; the gateway caps the total
+MAX_RESUME_TEXT_LENGTH = 200000 # Safety cap only; long documents are parsed in section chunks, not truncated
+# Any change to the prompt text, chunking or length limit yields a new fingerprint, invalidating old cache entries
+RESUME_PARSE_PROMPT_VERSION = prompt_fingerprint(
+    RESUME_PARSE_SYSTEM_PROMPT, RESUME_PARSE_PROMPT_TEMPLATE, str(MAX_RESUME_TEXT_LENGTH),
+    RESUME_CHUNK_PROMPT_TEMPLATE, str(RESUME_CHUNK_THRESHOLD_CHARS), str(RESUME_CHUNK_CHARS),
+    RESUME_LOCAL_EXTRACTION, str(len(SKILL_VOCABULARY))
+)
+RESUME_TEXT_CHARS = REGISTRY.counter(
+    "resumep_resume_text_chars_total",
+    "Resume text characters extracted from uploads vs. sent to the LLM after local pre-extraction.",
+    ("stage",)
+)
+RESUME_LLM_SKIPPED = REGISTRY.counter(
+    "resumep_resume_llm_skipped_total",
+    "Resumes answered from local extraction alone (RESUME_LOCAL_EXTRACTION=skip_llm)."
+)
+REQUIRED_RESUME_KEYS = {"name", "skills", "experience", "projects"}
+SUPPORTED_RESUME_EXTENSIONS = ('.pdf', '.docx')
+EMPTY_RESUME = {"name": "", "skills": [], "experience": [], "projects": []}
+# Near-duplicate uploads: the earlier result plus only the changed lines, instead of the whole text
+RESUME_PATCH_PROMPT_TEMPLATE = """
+        **Task:** Below is the JSON extracted from an earlier version of a resume, followed by the lines that are new or changed in the updated version. {removed_count} line(s) of the earlier version are no longer present. Update the JSON so it describes the updated resume.
+        **Output Format:** Return ONLY a valid JSON object with the same keys: "name", "skills", "experience" and "projects".
+
+        **Earlier JSON:**
+        ```
+        {previous_json}
+        ```
+
+        **New or changed lines:**
+        ```
+        {added_lines}
+        ```
+
+        **JSON Output:**
+        """
+
+
+def extract_text_from_bytes(filename: str, data: bytes, max_chars: int = None, parallel: bool = True) -> str:
+    """
+    Extracts text from raw PDF/DOCX bytes. Pass parallel=False when already running
+    inside a worker process. Raises ValueError for unsupported or unreadable files.
+    """
+    filename_lower = filename.lower()
+    try:
+        if filename_lower.endswith('.pdf'):
+            with time_stage("extraction", "pdf"):
+                return extract_pdf_text(data, max_chars=max_chars, filename=filename, parallel=parallel).text
+        if filename_lower.endswith('.docx'):
+            with time_stage("extraction", "docx"):
+                return extract_docx_text(data, max_chars=max_chars, filename=filename).text
+    except Exception as e:
+        raise ValueError(f"Could not process file {filename}: {e}")
+    raise ValueError("Unsupported file type. Only PDF and DOCX are allowed.")
+
+
+def parse_llm_json_response(llm_content: str, filename: str = "N/A") -> dict:
+    """Attempts to parse JSON from LLM output, handling common formatting issues."""
+    try:
+        # Attempt direct parsing first (ideal case, especially with JSON mode)
+        return json.loads(llm_content)
+    except json.JSONDecodeError:
+        logger.warning(f"Direct JSON parsing failed for response related to {filename}. Trying cleanup...")
+        # Fallback: Clean common markdown code fences and retry
+        cleaned = re.sub(r"^```(?:json)?\s*|\s*```$", "", llm_content.strip(), flags=re.MULTILINE | re.DOTALL)
+        # Fallback: Find the first '{' and last '}' - use with caution
+        start = cleaned.find('{')
+        end = cleaned.rfind('}')
+        if start != -1 and end != -1 and end > start:
+            json_like_part = cleaned[start:end+1]
+            try:
+                return json.loads(json_like_part)
+            except json.JSONDecodeError as e_fallback:
+                logger.error(f"JSON parsing failed even after cleanup for {filename}. Error: {e_fallback}. Cleaned content: {json_like_part[:500]}...") # Log snippet
+                raise ValueError("Failed to parse JSON data from LLM response.")
+        else:
+             logger.error(f"Could not find valid JSON structure after cleanup for {filename}. Cleaned content: {cleaned[:500]}...")
+             raise ValueError("Could not find valid JSON structure in LLM response.")
+
+
+def parse_resume_text(resume_text: str, complete, filename: str = "N/A") -> dict:
+    """
+    Sends extracted resume text to the LLM and returns the structured data.
+    `complete` is a gateway-style callable (model=..., messages=..., **kwargs).
+    Texts longer than RESUME_CHUNK_THRESHOLD_CHARS are parsed section by section.
+    Unless RESUME_LOCAL_EXTRACTION=off, name, contact details and known skills are
+    extracted locally first and the model only sees the remaining text.
+    """
+    # Truncate if necessary (adjust length as needed)
+    if len(resume_text) > MAX_RESUME_TEXT_LENGTH:
+        logger.warning(f"Resume text for '{filename}' truncated to {MAX_RESUME_TEXT_LENGTH} characters.")
+        resume_text = resume_text[:MAX_RESUME_TEXT_LENGTH]
+    RESUME_TEXT_CHARS.labels("extracted").inc(len(resume_text))
+
+    local = None
+    if RESUME_LOCAL_EXTRACTION != "off":
+        with time_stage("local_extract", "resume"):
+            local = extract_local(resume_text)
+        if RESUME_LOCAL_EXTRACTION == "skip_llm" and local.simple:
+            logger.info(f"Resume '{filename}' parsed locally (no experience or projects); skipping the LLM.")
+            RESUME_LLM_SKIPPED.inc()
+            return local.as_parsed()
+        logger.debug(f"Local pre-extraction reduced '{filename}' from {len(resume_text)} to {len(local.remaining_text)} chars.")
+        resume_text = local.remaining_text or resume_text
+    RESUME_TEXT_CHARS.labels("sent").inc(len(resume_text))
+
+    if len(resume_text) > RESUME_CHUNK_THRESHOLD_CHARS:
+        parsed_data = parse_resume_chunked(resume_text, complete, filename)
+    else:
+        parsed_data = _parse_single(resume_text, complete, filename)
+    return local.merge_into(parsed_data) if local is not None else parsed_data
+
+
+def _parse_single(resume_text: str, complete, filename: str) -> dict:
+    """One prompt for the whole text."""
+    # Prepare prompt for LLM
+    prompt = RESUME_PARSE_PROMPT_TEMPLATE.format(resume_text=resume_text)
+
+    # Call Groq API (fast model first, escalating on invalid or incomplete JSON)
+    logger.debug(f"Sending resume text for '{filename}' to Groq API for parsing.")
+    parsed_data = _complete_json(complete, prompt, filename, "resume", REQUIRED_RESUME_KEYS)
+    return _fill_missing_keys(parsed_data, filename)
+
+
+def _complete_json(complete, prompt, filename, stage, required_keys=(), min_attempts=1) -> dict:
+    """
+    Runs a JSON-mode extraction prompt along the parse route. A non-final tier's answer
+    is rejected (and retried on the next model) if it isn't valid JSON or lacks required keys.
+    """
+    def attempt(model, final):
+        chat_completion = complete(
+            model=model,
+            messages=[
+                {"role": "system", "content": RESUME_PARSE_SYSTEM_PROMPT},
+                {"role": "user", "content": prompt}
+            ],
+            temperature=0.1, # Very low temperature for deterministic extraction
+            response_format={"type": "json_object"} # Use JSON mode
+        )
+        logger.debug(f"Received Groq API response for '{filename}' from {model}.")
+        with time_stage("json_parse", stage):
+            data = parse_llm_json_response(chat_completion.choices[0].message.content, filename)
+        if not isinstance(data, dict):
+            raise ValueError("LLM response JSON is not an object.")
+        missing = set(required_keys) - data.keys()
+        if missing and not final:
+            raise IncompleteAnswer(f"missing keys {sorted(missing)}")
+        return data
+    return model_router.run(TASK_PARSE, attempt, filename, min_attempts)
+
+
+def _parse_chunk(kind, text, part, complete, filename):
+    keys = CHUNK_KEYS[kind]
+    prompt = RESUME_CHUNK_PROMPT_TEMPLATE.format(
+        part=part,
+        fields=", ".join(_FIELD_DESCRIPTIONS[key] for key in keys),
+        keys=", ".join(f'"{key}"' for key in keys),
+        resume_text=text
+    )
+    # At least two attempts: a malformed answer for one chunk shouldn't fail the whole resume
+    return _complete_json(complete, prompt, f"{filename} ({part})", "resume_chunk", keys, min_attempts=2)
+
+
+def _as_list(value):
+    if value is None or value == "":
+        return []
+    return value if isinstance(value, list) else [value]
+
+
+def merge_chunk_results(results) -> dict:
+    """
+    Merges [(kind, partial dict)] in document order: the first non-empty name wins,
+    skills are de-duplicated case-insensitively, experience/projects are concatenated.
+    Only the keys a chunk was asked for are taken from it.
+    """
+    merged = dict(EMPTY_RESUME, skills=[], experience=[], projects=[])
+    seen_skills, seen_items = set(), set()
+    for kind, data in results:
+        keys = CHUNK_KEYS[kind]
+        name = data.get("name")
+        if "name" in keys and not merged["name"] and isinstance(name, str) and name.strip():
+            merged["name"] = name.strip()
+        if "skills" in keys:
+            for skill in _as_list(data.get("skills")):
+                skill_key = str(skill).strip().lower()
+                if skill_key and skill_key not in seen_skills:
+                    seen_skills.add(skill_key)
+                    merged["skills"].append(skill)
+        for field in ("experience", "projects"):
+            if field in keys:
+                for item in _as_list(data.get(field)):
+                    item_key = (field, json.dumps(item, sort_keys=True, default=str))
+                    if item_key not in seen_items:
+                        seen_items.add(item_key)
+                        merged[field].append(item)
+    return merged
+
+
+def parse_resume_chunked(resume_text: str, complete, filename: str = "N/A") -> dict:
+    """
+    Splits the text into sections, parses the chunks concurrently with smaller
+    prompts and merges the partial results. Raises if any chunk can't be parsed.
+    """
+    chunks = chunk_sections(segment_sections(resume_text), RESUME_CHUNK_CHARS)
+    logger.info(f"Parsing '{filename}' ({len(resume_text)} chars) in {len(chunks)} chunks: {', '.join(kind for kind, _ in chunks)}.")
+    with ThreadPoolExecutor(max_workers=max(min(len(chunks), RESUME_CHUNK_CONCURRENCY), 1), thread_name_prefix="resume-chunk") as pool:
+        futures = [
+            pool.submit(_parse_chunk, kind, text, f"{kind} {index}/{len(chunks)}", complete, filename)
+            for index, (kind, text) in enumerate(chunks, start=1)
+        ]
+        results = [(kind, future.result()) for (kind, _), future in zip(chunks, futures)]
+    return merge_chunk_results(results)
+
+
+def update_parsed_resume(previous_data: dict, added_lines: list, removed_count: int, complete,
+                         filename: str = "N/A", resume_text: str = None) -> dict:
+    """
+    Re-parses a near-duplicate upload by sending the earlier parsedData and only the
+    changed lines to the LLM. Raises ValueError when the answer isn't valid JSON.
+    The locally extracted contact details are not sent; like parse_resume_text, they
+    are re-extracted from `resume_text` (unless RESUME_LOCAL_EXTRACTION=off).
+    """
+    previous_data = {key: value for key, value in previous_data.items() if key != "contact"}
+    prompt = RESUME_PATCH_PROMPT_TEMPLATE.format(
+        removed_count=removed_count,
+        previous_json=json.dumps(previous_data, ensure_ascii=False),
+        added_lines="\n".join(added_lines) or "(none)"
+    )
+    logger.debug(f"Sending {len(added_lines)} changed lines of '{filename}' to Groq API for patching.")
+    parsed_data = _fill_missing_keys(_complete_json(complete, prompt, filename, "resume_patch", REQUIRED_RESUME_KEYS), filename)
+    if RESUME_LOCAL_EXTRACTION != "off" and resume_text:
+        with time_stage("local_extract", "resume"):
+            local = extract_local(resume_text[:MAX_RESUME_TEXT_LENGTH])
+        parsed_data = local.merge_into(parsed_data)
+    return parsed_data
+
+
+def _fill_missing_keys(parsed_data: dict, filename: str) -> dict:
+    # Optional: Basic validation of the parsed structure
+    if not REQUIRED_RESUME_KEYS.issubset(parsed_data.keys()):
+        logger.warning(f"Parsed data for '{filename}' is missing required keys. Found: {parsed_data.keys()}")
+        # Decide how to handle - return error or fill missing keys? Filling is safer.
+        for key in REQUIRED_RESUME_KEYS:
+            if key not in parsed_data:
+                parsed_data[key] = [] if key in ["skills", "experience", "projects"] else ""
+    return parsed_data
+
+
+def build_resume_document(user_object_id, filename, content_hash, cache_key, parsed_data, uploaded_at, fingerprint=None):
+    """Builds a resumes-collection document for a parsed upload (with near-duplicate fields if fingerprinted)."""
+    doc = {
+        'userId': user_object_id,
+        'fileName': filename,
+        'fileUrl': f"sha256:{content_hash}", # Content-addressed reference to the upload
+        'parsedData': parsed_data,
+        'uploadedAt': uploaded_at,
+        'contentHash': content_hash,
+        'parseCacheKey': cache_key
+    }
+    if fingerprint is not None:
+        doc.update(fingerprint.document_fields())
+    return doc
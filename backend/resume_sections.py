@@ -0,0 +1,148 @@
+# backend/resume_sections.py
+# Splits extracted resume text into sections and prompt-sized chunks.
+#
+# Headings are recognised from a vocabulary of common resume/CV section titles
+# (short lines, any case, optional trailing colon). Each section is mapped to the
+# parsed field it feeds: experience, projects, or "profile" (skills, education and
+# everything else, which only contributes skills). Long sections are cut at entry
+# boundaries (blank lines or lines carrying a date range) so a job or
+# project is rarely split across two prompts.
+import re
+
+SECTION_EXPERIENCE = "experience"
+SECTION_PROJECTS = "projects"
+SECTION_PROFILE = "profile"
+SECTION_FULL = "full" # No recognisable headings: every chunk may contain any field
+
+_HEADINGS = {
+    SECTION_EXPERIENCE: (
+        "experience", "work experience", "professional experience", "relevant experience", "employment",
+        "employment history", "work history", "career history", "professional background", "positions held",
+        "academic appointments", "appointments", "research experience", "teaching experience",
+        "industry experience", "internships", "internship experience", "leadership experience",
+    ),
+    SECTION_PROJECTS: (
+        "projects", "personal projects", "selected projects", "academic projects", "research projects",
+        "key projects", "side projects", "open source", "open source contributions", "portfolio",
+    ),
+    SECTION_PROFILE: (
+        "skills", "technical skills", "core competencies", "competencies", "technologies", "tools",
+        "skills and tools", "skills & tools", "languages and tools", "expertise", "areas of expertise",
+        "education", "academic background", "qualifications", "certifications", "licenses and certifications",
+        "summary", "professional summary", "profile", "objective", "about me", "publications",
+        "selected publications", "awards", "honors", "honors and awards", "awards and honors", "grants",
+        "presentations", "talks", "conference talks", "teaching", "service", "professional service",
+        "activities", "volunteer", "volunteering", "interests", "languages", "patents", "memberships",
+        "references", "courses", "coursework", "relevant coursework", "achievements", "leadership",
+    ),
+}
+_HEADING_KINDS = {title: kind for kind, titles in _HEADINGS.items() for title in titles}
+_HEADING_MAX_CHARS = 48
+_DATE_RANGE = re.compile(
+    r"\b(?:(?:jan|feb|mar|apr|may|jun|jul|aug|sep|sept|oct|nov|dec)[a-z]*\.?\s+)?(?:19|20)\d{2}\s*(?:-|–|—|to)\s*"
+    r"(?:(?:(?:jan|feb|mar|apr|may|jun|jul|aug|sep|sept|oct|nov|dec)[a-z]*\.?\s+)?(?:19|20)\d{2}|present|current|now)\b",
+    re.IGNORECASE
+)
+
+
+class Section:
+    def __init__(self, kind, heading, lines):
+        self.kind = kind
+        self.heading = heading
+        self.lines = lines
+
+    @property
+    def text(self) -> str:
+        return "\n".join(self.lines)
+
+
+def normalize_heading(line: str) -> str:
+    """Lower-cased heading text without punctuation ('' for lines too long to be a heading)."""
+    stripped = line.strip()
+    if len(stripped) > _HEADING_MAX_CHARS:
+        return ""
+    return " ".join(re.sub(r"[^\w&/ ]+", " ", stripped.lower()).split())
+
+
+def heading_kind(line: str):
+    """The section kind if the line is a recognised heading, else None."""
+    return _HEADING_KINDS.get(normalize_heading(line))
+
+
+def has_date_range(text: str) -> bool:
+    return _DATE_RANGE.search(text) is not None
+
+
+def segment_sections(text: str) -> list:
+    """
+    Splits resume text into Sections in document order. Text before the first
+    heading (name and contact details) becomes a 'profile' section headed 'header'.
+    """
+    sections = [Section(SECTION_PROFILE, "header", [])]
+    for line in text.splitlines():
+        kind = heading_kind(line)
+        if kind is not None:
+            sections.append(Section(kind, line.strip(), [line.strip()]))
+        else:
+            sections[-1].lines.append(line)
+    return [section for section in sections if any(line.strip() for line in section.lines)]
+
+
+def _entry_blocks(lines):
+    """Groups lines into entries: a new block starts after a blank line or at a date-range line."""
+    blocks, current = [], []
+    for line in lines:
+        if not line.strip():
+            if current:
+                blocks.append(current)
+                current = []
+            continue
+        if current and _DATE_RANGE.search(line) and len(current) > 1:
+            blocks.append(current)
+            current = []
+        current.append(line)
+    if current:
+        blocks.append(current)
+    return blocks
+
+
+def _pack(blocks, max_chars):
+    """Greedily packs line blocks into texts of at most max_chars (oversized blocks are split by line)."""
+    chunks, current, size = [], [], 0
+    for block in blocks:
+        block_size = sum(len(line) + 1 for line in block)
+        if block_size > max_chars:
+            pieces = [[line] for line in block]
+        else:
+            pieces = [block]
+        for piece in pieces:
+            piece_size = sum(len(line) + 1 for line in piece)
+            if current and size + piece_size > max_chars:
+                chunks.append("\n".join(current).rstrip())
+                current, size = [], 0
+            current.extend(line[:max_chars] for line in piece)
+            size += piece_size
+        if block_size <= max_chars:
+            current.append("") # Keep the entry separator inside the chunk
+            size += 1
+    if any(line.strip() for line in current):
+        chunks.append("\n".join(current).rstrip())
+    return chunks
+
+
+def chunk_sections(sections, max_chars) -> list:
+    """
+    Returns [(kind, text)] chunks of at most ~max_chars, in document order. Sections
+    of the same kind are packed together, so a short resume yields one chunk per kind.
+    """
+    if not any(section.kind in (SECTION_EXPERIENCE, SECTION_PROJECTS) for section in sections):
+        blocks = [block for section in sections for block in _entry_blocks(section.lines)]
+        return [(SECTION_FULL, text) for text in _pack(blocks, max_chars)]
+    by_kind = {}
+    for section in sections:
+        by_kind.setdefault(section.kind, []).extend(_entry_blocks(section.lines))
+    chunks = []
+    for kind in (SECTION_PROFILE, SECTION_EXPERIENCE, SECTION_PROJECTS):
+        for text in _pack(by_kind.get(kind, []), max_chars):
+            chunks.append((kind, text))
+    return chunks
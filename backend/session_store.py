@@ -0,0 +1,390 @@
+# backend/session_store.py
+# Pluggable storage for live interview sessions.
+#
+# Sessions used to live in a module-global dict, which pinned every interview to
+# one process and lost them all on restart. A SessionStore keeps them behind a
+# small interface instead, with an in-process backend (single worker / tests) and
+# a Redis-protocol backend (shared by every worker and node).
+#
+# Sessions are serialized compactly (minified JSON, zlib-compressed past a size
+# threshold), expire after a per-session TTL, and are updated with optimistic
+# concurrency: each save must present the version it loaded, otherwise it fails
+# with SessionConflictError instead of silently overwriting a concurrent update.
+import json
+import logging
+import os
+import threading
+import time
+import zlib
+from collections import OrderedDict
+from datetime import datetime
+
+logger = logging.getLogger(__name__)
+
+SESSION_STORE_BACKEND = os.getenv("SESSION_STORE", "memory").lower() # 'memory' or 'redis'
+SESSION_TTL_SECONDS = int(os.getenv("SESSION_TTL_SECONDS", str(2 * 3600)))
+SESSION_MAX_ENTRIES = int(os.getenv("SESSION_MAX_ENTRIES", "10000")) # In-process backend only
+SESSION_MAX_BYTES = int(os.getenv("SESSION_MAX_BYTES", str(256 * 1024 * 1024))) # In-process backend only
+SESSION_SWEEP_INTERVAL_SECONDS = int(os.getenv("SESSION_SWEEP_INTERVAL_SECONDS", "60"))
+SESSION_COMPRESS_MIN_BYTES = int(os.getenv("SESSION_COMPRESS_MIN_BYTES", "512"))
+REDIS_URL = os.getenv("REDIS_URL", "redis://localhost:6379/0")
+REDIS_KEY_PREFIX = os.getenv("SESSION_KEY_PREFIX", "interview:")
+
+_RAW, _ZLIB = b"j", b"z" # One-byte payload headers
+
+
+class SessionConflictError(Exception):
+    """Raised when a session was changed (or removed) since it was loaded."""
+
+
+# === Serialization ===
+
+def _json_default(obj):
+    if isinstance(obj, datetime):
+        return {"$dt": obj.isoformat()}
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+def _json_object_hook(obj):
+    if len(obj) == 1 and "$dt" in obj:
+        return datetime.fromisoformat(obj["$dt"])
+    return obj
+
+
+def serialize_session(state: dict) -> bytes:
+    """Encodes a session (datetimes included) as compact, optionally compressed bytes."""
+    body = {key: value for key, value in state.items() if key != 'version'}
+    payload = json.dumps(body, separators=(",", ":"), default=_json_default).encode("utf-8")
+    if len(payload) >= SESSION_COMPRESS_MIN_BYTES:
+        return _ZLIB + zlib.compress(payload, 6)
+    return _RAW + payload
+
+
+def deserialize_session(data: bytes) -> dict:
+    """Inverse of serialize_session."""
+    header, payload = data[:1], data[1:]
+    if header == _ZLIB:
+        payload = zlib.decompress(payload)
+    return json.loads(payload, object_hook=_json_object_hook)
+
+
+# === Interface ===
+
+class SessionStore:
+    """
+    Interface for session backends. Loaded sessions carry their version in
+    state['version']; save() checks and bumps it.
+    """
+
+    def get(self, session_id):
+        """Returns the session state (with 'version'), or None if missing/expired."""
+        raise NotImplementedError
+
+    def save(self, session_id, state, ttl_seconds=None):
+        """
+        Stores the session if its stored version still equals state['version']
+        (0 or missing for a new session). Sets state['version'] to the new version.
+        Raises SessionConflictError otherwise.
+        """
+        raise NotImplementedError
+
+    def delete(self, session_id):
+        """Removes the session (no error if it does not exist)."""
+        raise NotImplementedError
+
+    def count(self) -> int:
+        """Number of live sessions (approximate for shared backends)."""
+        raise NotImplementedError
+
+    def ping(self) -> bool:
+        """True if the backend is reachable."""
+        return True
+
+    def create(self, session_id, state, ttl_seconds=None):
+        """Stores a brand new session; fails if the ID is already taken."""
+        state['version'] = 0
+        return self.save(session_id, state, ttl_seconds)
+
+    def start_sweeper(self, interval_seconds=SESSION_SWEEP_INTERVAL_SECONDS):
+        """Starts background expiry, if the backend needs it (call after any fork)."""
+
+    def stop_sweeper(self):
+        """Stops background expiry."""
+
+    def close(self):
+        """Releases background threads/connections on shutdown."""
+
+
+# === In-process backend ===
+
+class InMemorySessionStore(SessionStore):
+    """
+    Process-local backend. Sessions are stored serialized, so readers never share
+    mutable state and the bytes retained are known exactly.
+
+    Memory is bounded: sessions idle for longer than the TTL are removed by a
+    background sweeper (start_sweeper) and on access, and once max_entries or
+    max_bytes is exceeded the least recently used sessions are spilled. Every
+    removal other than delete() is reported to `on_evict(session_id, state, reason)`,
+    e.g. to persist abandoned interviews.
+    """
+
+    def __init__(self, ttl_seconds=SESSION_TTL_SECONDS, max_entries=SESSION_MAX_ENTRIES,
+                 max_bytes=SESSION_MAX_BYTES, on_evict=None):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.on_evict = on_evict
+        self._sessions = OrderedDict() # session_id -> (version, expires_at_monotonic, payload), LRU order
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self._sweeper = None
+        self._stop_sweeper = threading.Event()
+        self.evictions = {"idle": 0, "capacity": 0}
+
+    def get(self, session_id):
+        expired = None
+        with self._lock:
+            entry = self._sessions.get(session_id)
+            if entry is None:
+                return None
+            version, expires_at, payload = entry
+            if time.monotonic() >= expires_at:
+                expired = self._remove_locked(session_id)
+                self.evictions["idle"] += 1
+            else:
+                # Reading counts as activity: refresh the idle deadline and LRU position
+                self._sessions[session_id] = (version, time.monotonic() + self.ttl_seconds, payload)
+                self._sessions.move_to_end(session_id)
+        if expired is not None:
+            self._notify_evicted([(session_id, expired, "idle")])
+            return None
+        state = deserialize_session(payload)
+        state['version'] = version
+        return state
+
+    def save(self, session_id, state, ttl_seconds=None):
+        payload = serialize_session(state)
+        expected = state.get('version', 0)
+        expires_at = time.monotonic() + (ttl_seconds or self.ttl_seconds)
+        with self._lock:
+            entry = self._sessions.get(session_id)
+            current = entry[0] if entry and time.monotonic() < entry[1] else 0
+            if current != expected:
+                raise SessionConflictError(f"Session {session_id} is at version {current}, expected {expected}.")
+            if entry:
+                self._bytes -= len(entry[2])
+            self._sessions[session_id] = (current + 1, expires_at, payload)
+            self._sessions.move_to_end(session_id)
+            self._bytes += len(payload)
+            spilled = self._spill_locked(keep=session_id)
+        state['version'] = current + 1
+        self._notify_evicted(spilled)
+        return state['version']
+
+    def delete(self, session_id):
+        with self._lock:
+            self._remove_locked(session_id)
+
+    def count(self) -> int:
+        with self._lock:
+            return len(self._sessions)
+
+    def bytes_retained(self) -> int:
+        """Total serialized size of the live sessions."""
+        with self._lock:
+            return self._bytes
+
+    def stats(self) -> dict:
+        """Gauges and eviction counters for monitoring."""
+        with self._lock:
+            return {
+                "liveSessions": len(self._sessions),
+                "bytesRetained": self._bytes,
+                "maxEntries": self.max_entries,
+                "maxBytes": self.max_bytes,
+                "idleEvictions": self.evictions["idle"],
+                "capacityEvictions": self.evictions["capacity"],
+            }
+
+    # --- Eviction ---
+
+    def _remove_locked(self, session_id):
+        """Removes a session (lock held); returns its payload or None."""
+        entry = self._sessions.pop(session_id, None)
+        if entry is None:
+            return None
+        self._bytes -= len(entry[2])
+        return entry[2]
+
+    def _spill_locked(self, keep=None):
+        """Evicts least recently used sessions until within limits (lock held)."""
+        spilled = []
+        while self._sessions and (len(self._sessions) > self.max_entries or self._bytes > self.max_bytes):
+            session_id = next(iter(self._sessions))
+            if session_id == keep:
+                break # Only the session just saved is left; keep it even if oversized
+            spilled.append((session_id, self._remove_locked(session_id), "capacity"))
+            self.evictions["capacity"] += 1
+        return spilled
+
+    def sweep(self) -> int:
+        """Removes every session idle past its deadline. Returns how many were evicted."""
+        now = time.monotonic()
+        with self._lock:
+            expired_ids = [session_id for session_id, (_, expires_at, _) in self._sessions.items() if now >= expires_at]
+            expired = [(session_id, self._remove_locked(session_id), "idle") for session_id in expired_ids]
+            self.evictions["idle"] += len(expired)
+        self._notify_evicted(expired)
+        if expired:
+            logger.info(f"Session sweeper evicted {len(expired)} idle sessions; {self.count()} live.")
+        return len(expired)
+
+    def _notify_evicted(self, evicted):
+        """Runs the eviction callback outside the lock; failures are logged, never raised."""
+        if not self.on_evict:
+            return
+        for session_id, payload, reason in evicted:
+            try:
+                self.on_evict(session_id, deserialize_session(payload), reason)
+            except Exception as e:
+                logger.error(f"Eviction callback failed for session {session_id}: {e}")
+
+    def start_sweeper(self, interval_seconds=SESSION_SWEEP_INTERVAL_SECONDS):
+        """Starts the background thread that periodically evicts idle sessions."""
+        if self._sweeper and self._sweeper.is_alive():
+            return
+
+        def _run():
+            while not self._stop_sweeper.wait(interval_seconds):
+                try:
+                    self.sweep()
+                except Exception as e:
+                    logger.error(f"Session sweep failed: {e}")
+
+        self._stop_sweeper.clear()
+        self._sweeper = threading.Thread(target=_run, name="session-sweeper", daemon=True)
+        self._sweeper.start()
+        logger.info(f"Session sweeper started (every {interval_seconds}s, idle TTL {self.ttl_seconds}s).")
+
+    def stop_sweeper(self):
+        """Stops the background sweeper thread."""
+        self._stop_sweeper.set()
+        if self._sweeper:
+            self._sweeper.join(5)
+            self._sweeper = None
+
+    def drain(self, reason="shutdown") -> int:
+        """
+        Removes every session, reporting each to on_evict with `reason`, so a
+        stopping worker can persist in-flight interviews. Returns how many were drained.
+        """
+        with self._lock:
+            drained = [(session_id, entry[2], reason) for session_id, entry in self._sessions.items()]
+            self._sessions.clear()
+            self._bytes = 0
+        self._notify_evicted(drained)
+        return len(drained)
+
+    def close(self):
+        self.stop_sweeper()
+        drained = self.drain()
+        if drained:
+            logger.info(f"Drained {drained} in-flight sessions on shutdown.")
+
+
+# === Redis-protocol backend ===
+
+# Compare-and-set in one round trip: the hash holds the version ('v') and payload ('d').
+# Returns the new version, -1 on a version mismatch, -2 if the session no longer exists.
+_CAS_SAVE_SCRIPT = """
+local current = redis.call('HGET', KEYS[1], 'v')
+local expected = tonumber(ARGV[1])
+if current == false then
+    if expected ~= 0 then return -2 end
+    current = 0
+else
+    current = tonumber(current)
+    if current ~= expected then return -1 end
+end
+redis.call('HSET', KEYS[1], 'v', current + 1, 'd', ARGV[2])
+redis.call('EXPIRE', KEYS[1], ARGV[3])
+return current + 1
+"""
+
+
+class RedisSessionStore(SessionStore):
+    """
+    Backend for Redis or any server speaking its protocol. Pass `client` to reuse an
+    existing connection (e.g. a fakeredis instance in tests); otherwise one is created
+    from REDIS_URL.
+    """
+
+    def __init__(self, client=None, url=REDIS_URL, ttl_seconds=SESSION_TTL_SECONDS, key_prefix=REDIS_KEY_PREFIX):
+        if client is None:
+            import redis # Optional dependency, only needed for this backend
+            client = redis.Redis.from_url(url, socket_timeout=5, socket_connect_timeout=5, health_check_interval=30)
+        self.client = client
+        self.ttl_seconds = ttl_seconds
+        self.key_prefix = key_prefix
+        self._cas_save = client.register_script(_CAS_SAVE_SCRIPT)
+
+    def _key(self, session_id):
+        return f"{self.key_prefix}{session_id}"
+
+    def get(self, session_id):
+        version, payload = self.client.hmget(self._key(session_id), "v", "d")
+        if version is None or payload is None:
+            return None
+        state = deserialize_session(payload)
+        state['version'] = int(version)
+        return state
+
+    def save(self, session_id, state, ttl_seconds=None):
+        expected = state.get('version', 0)
+        result = self._cas_save(
+            keys=[self._key(session_id)],
+            args=[expected, serialize_session(state), ttl_seconds or self.ttl_seconds]
+        )
+        if result == -1:
+            raise SessionConflictError(f"Session {session_id} was modified concurrently (expected version {expected}).")
+        if result == -2:
+            raise SessionConflictError(f"Session {session_id} no longer exists (expired or ended).")
+        state['version'] = int(result)
+        return state['version']
+
+    def delete(self, session_id):
+        self.client.delete(self._key(session_id))
+
+    def count(self) -> int:
+        # SCAN is O(keyspace); fine for a gauge, not for the hot path
+        return sum(1 for _ in self.client.scan_iter(match=f"{self.key_prefix}*", count=1000))
+
+    def ping(self) -> bool:
+        try:
+            return bool(self.client.ping())
+        except Exception as e:
+            logger.warning(f"Session store ping failed: {e}")
+            return False
+
+    def close(self):
+        # Sessions live on in Redis; other workers pick them up
+        try:
+            self.client.close()
+        except Exception as e:
+            logger.warning(f"Error closing session store connection: {e}")
+
+
+def create_session_store(backend=SESSION_STORE_BACKEND, on_evict=None) -> SessionStore:
+    """
+    Builds the configured session store backend. `on_evict` only applies to the
+    in-process backend; Redis expires idle sessions on its own via key TTLs. No
+    thread is started here: the caller runs start_sweeper() once per worker process.
+    """
+    if backend == "redis":
+        logger.info(f"Using Redis session store at {REDIS_URL}.")
+        return RedisSessionStore()
+    if backend != "memory":
+        raise ValueError(f"Unknown SESSION_STORE backend '{backend}' (expected 'memory' or 'redis').")
+    logger.info("Using in-process session store (sessions are local to this worker).")
+    return InMemorySessionStore(on_evict=on_evict)
@@ -0,0 +1,6 @@
+# backend/tests/conftest.py
+# Tests import the backend's flat modules directly (run `python -m pytest` from backend/).
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
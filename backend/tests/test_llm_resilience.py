@@ -0,0 +1,264 @@
+# backend/tests/test_llm_resilience.py
+# Retry, hedging and circuit-breaker policy: every CircuitBreaker transition (on a
+# fake clock), Retry-After parsing in its three forms, backoff bounds, the hedge
+# threshold, and gateway runs against the fake Groq server: injected 500s and 429s,
+# and a saturated slot queue that must not open the circuit. Skipped when the groq SDK or httpx isn't installed.
+import email.utils
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from types import SimpleNamespace
+
+import pytest
+
+groq = pytest.importorskip("groq")
+httpx = pytest.importorskip("httpx")
+
+import llm_resilience
+from llm_resilience import (
+    CIRCUIT_CLOSED,
+    CIRCUIT_HALF_OPEN,
+    CIRCUIT_OPEN,
+    CircuitBreaker,
+    DeadlineExceeded,
+    LatencyTracker,
+    backoff_seconds,
+    is_upstream_failure,
+    retry_after_seconds,
+    retry_reason,
+)
+
+REQUEST = httpx.Request("POST", "http://fake-groq/openai/v1/chat/completions")
+
+
+def _status_error(error_class, status, headers=None):
+    return error_class("injected", response=httpx.Response(status, headers=headers, request=REQUEST), body=None)
+
+
+def _with_headers(headers):
+    return SimpleNamespace(response=httpx.Response(429, headers=headers, request=REQUEST))
+
+
+class _UpperBound:
+    """rng stand-in whose uniform() returns the top of the range."""
+    @staticmethod
+    def uniform(low, high):
+        return high
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(llm_resilience, "time", SimpleNamespace(monotonic=lambda: now[0]))
+    return now
+
+
+# === Error classification ===
+
+def test_retry_reasons():
+    assert retry_reason(groq.APITimeoutError(request=REQUEST)) == "timeout"
+    assert retry_reason(httpx.ConnectError("refused")) == "connection"
+    assert retry_reason(_status_error(groq.RateLimitError, 429)) == "rate_limited"
+    assert retry_reason(_status_error(groq.InternalServerError, 503)) == "server_error"
+    assert retry_reason(_status_error(groq.BadRequestError, 400)) is None
+
+
+def test_rate_limits_and_deadlines_are_not_upstream_failures():
+    assert is_upstream_failure(_status_error(groq.InternalServerError, 500))
+    assert not is_upstream_failure(_status_error(groq.RateLimitError, 429))
+    assert not is_upstream_failure(DeadlineExceeded("late"))
+
+
+# === Retry-After ===
+
+def test_retry_after_seconds_form():
+    assert retry_after_seconds(_with_headers({"Retry-After": "7"})) == 7.0
+    assert retry_after_seconds(_with_headers({"Retry-After": "-3"})) == 0.0
+
+
+def test_retry_after_http_date_form():
+    retry_at = datetime.now(timezone.utc) + timedelta(seconds=30)
+    seconds = retry_after_seconds(_with_headers({"Retry-After": email.utils.format_datetime(retry_at, usegmt=True)}))
+    assert 28 <= seconds <= 30
+    past = email.utils.format_datetime(datetime.now(timezone.utc) - timedelta(minutes=5), usegmt=True)
+    assert retry_after_seconds(_with_headers({"Retry-After": past})) == 0.0
+
+
+def test_retry_after_ms_takes_precedence():
+    assert retry_after_seconds(_with_headers({"retry-after-ms": "250", "Retry-After": "9"})) == 0.25
+    assert retry_after_seconds(_with_headers({"retry-after-ms": "soon", "Retry-After": "9"})) == 9.0
+
+
+def test_retry_after_missing_or_invalid():
+    assert retry_after_seconds(_with_headers({})) is None
+    assert retry_after_seconds(_with_headers({"Retry-After": "tomorrow-ish"})) is None
+    assert retry_after_seconds(ValueError("no response")) is None
+
+
+# === Backoff ===
+
+def test_backoff_is_capped_full_jitter(monkeypatch):
+    monkeypatch.setattr(llm_resilience, "LLM_BACKOFF_BASE_SECONDS", 0.5)
+    monkeypatch.setattr(llm_resilience, "LLM_BACKOFF_MAX_SECONDS", 8.0)
+    assert [backoff_seconds(n, rng=_UpperBound) for n in (1, 2, 3, 4, 5, 6)] == [0.5, 1.0, 2.0, 4.0, 8.0, 8.0]
+    assert backoff_seconds(1, rng=SimpleNamespace(uniform=lambda low, high: low)) == 0.0
+
+
+def test_backoff_honours_retry_after_with_bounded_spread():
+    error = _with_headers({"Retry-After": "2"})
+    assert backoff_seconds(1, error, rng=SimpleNamespace(uniform=lambda low, high: low)) == 2.0
+    assert backoff_seconds(1, error, rng=_UpperBound) == pytest.approx(2.2)
+    assert backoff_seconds(1, _with_headers({"Retry-After": "60"}), rng=_UpperBound) == 61.0
+
+
+# === Hedge threshold ===
+
+def test_hedge_delay_needs_min_samples(monkeypatch):
+    monkeypatch.setattr(llm_resilience, "LLM_HEDGE_MIN_SAMPLES", 20)
+    monkeypatch.setattr(llm_resilience, "LLM_HEDGE_MIN_DELAY_SECONDS", 0.5)
+    tracker = LatencyTracker(window=100)
+    for n in range(1, 20):
+        tracker.observe(n / 10)
+    assert tracker.hedge_delay() is None
+    tracker.observe(2.0)
+    assert tracker.hedge_delay() == 2.0 # p95 of 0.1 .. 2.0
+
+
+def test_hedge_delay_has_a_floor_and_follows_the_window(monkeypatch):
+    monkeypatch.setattr(llm_resilience, "LLM_HEDGE_MIN_SAMPLES", 5)
+    monkeypatch.setattr(llm_resilience, "LLM_HEDGE_MIN_DELAY_SECONDS", 0.5)
+    tracker = LatencyTracker(window=5)
+    for _ in range(5):
+        tracker.observe(0.1)
+    assert tracker.hedge_delay() == 0.5
+    for _ in range(5):
+        tracker.observe(3.0) # Pushes the fast samples out of the window
+    assert tracker.hedge_delay() == 3.0
+
+
+# === Circuit breaker ===
+
+def test_breaker_opens_after_consecutive_failures(clock):
+    breaker = CircuitBreaker(failure_threshold=3, reset_seconds=10)
+    breaker.record_failure()
+    breaker.record_failure()
+    breaker.record_success() # Resets the streak
+    breaker.record_failure()
+    breaker.record_failure()
+    assert breaker.state == CIRCUIT_CLOSED and breaker.allow()
+    breaker.record_failure()
+    assert breaker.state == CIRCUIT_OPEN
+    assert not breaker.allow()
+    assert breaker.snapshot() == {"state": CIRCUIT_OPEN, "consecutiveFailures": 3, "timesOpened": 1}
+
+
+def test_breaker_failures_while_open_do_not_extend_it(clock):
+    breaker = CircuitBreaker(failure_threshold=1, reset_seconds=10)
+    breaker.record_failure()
+    clock[0] += 9
+    breaker.record_failure() # A call that was already in flight
+    clock[0] += 1
+    assert breaker.allow()
+    assert breaker.state == CIRCUIT_HALF_OPEN
+    assert breaker.times_opened == 1
+
+
+def test_breaker_lets_one_half_open_probe_through(clock):
+    breaker = CircuitBreaker(failure_threshold=1, reset_seconds=10)
+    breaker.record_failure()
+    clock[0] += 9.9
+    assert not breaker.allow()
+    clock[0] += 0.1
+    assert breaker.allow() # The probe
+    assert breaker.state == CIRCUIT_HALF_OPEN
+    assert not breaker.allow() # Everyone else fails fast while it runs
+
+
+def test_breaker_closes_when_the_probe_succeeds(clock):
+    breaker = CircuitBreaker(failure_threshold=1, reset_seconds=10)
+    breaker.record_failure()
+    clock[0] += 10
+    assert breaker.allow()
+    breaker.record_success()
+    assert breaker.state == CIRCUIT_CLOSED and breaker.failures == 0
+    assert breaker.allow() and breaker.allow()
+
+
+def test_breaker_reopens_when_the_probe_fails(clock):
+    breaker = CircuitBreaker(failure_threshold=1, reset_seconds=10)
+    breaker.record_failure()
+    clock[0] += 10
+    assert breaker.allow()
+    breaker.record_failure()
+    assert breaker.state == CIRCUIT_OPEN and breaker.times_opened == 2
+    clock[0] += 5
+    assert not breaker.allow() # The reset timer restarted with the failed probe
+    clock[0] += 5
+    assert breaker.allow()
+
+
+def test_breaker_release_probe_allows_a_new_probe(clock):
+    breaker = CircuitBreaker(failure_threshold=1, reset_seconds=10)
+    breaker.record_failure()
+    clock[0] += 10
+    assert breaker.allow()
+    assert not breaker.allow()
+    breaker.release_probe() # e.g. the probe was cancelled or rate limited
+    assert breaker.state == CIRCUIT_HALF_OPEN
+    assert breaker.allow()
+    assert not breaker.allow()
+
+
+# === Gateway against the fake Groq API ===
+
+def test_gateway_retries_through_injected_500s_and_429s(monkeypatch):
+    import llm_gateway
+    from benchmarks.fake_groq import FakeGroqConfig, start_fake_groq
+
+    monkeypatch.setattr(llm_gateway, "LLM_MAX_ATTEMPTS", 8)
+    monkeypatch.setattr(llm_gateway, "LLM_HEDGE_ENABLED", False) # One upstream request per attempt
+    monkeypatch.setattr(llm_resilience, "LLM_BACKOFF_BASE_SECONDS", 0.01)
+    monkeypatch.setattr(llm_resilience, "LLM_BACKOFF_MAX_SECONDS", 0.05)
+    config = FakeGroqConfig(latency_ms=1, tokens_per_second=1_000_000, error_rate=0.25, rate_limit_rate=0.25,
+                            retry_after_seconds=0.01, seed=7)
+    server, base_url = start_fake_groq(config=config)
+    gateway = llm_gateway.LLMGateway(api_key="test", base_url=base_url)
+    try:
+        for _ in range(20):
+            completion = gateway.complete("fake-model", [{"role": "user", "content": "Hello"}], timeout=30)
+            assert completion.choices[0].message.content
+        assert server.faults.get("error", 0) > 0
+        assert server.faults.get("rate_limited", 0) > 0
+        assert server.requests == 20 + sum(server.faults.values())
+        stats = gateway.stats()["fake-model"]
+        assert stats["circuit"]["state"] == CIRCUIT_CLOSED
+        assert stats["completed"] == 20 and stats["failed"] == sum(server.faults.values()) # Failed attempts
+    finally:
+        gateway.close()
+        server.shutdown()
+
+
+def test_gateway_queue_timeouts_do_not_open_the_circuit():
+    import llm_gateway
+    from benchmarks.fake_groq import FakeGroqConfig, start_fake_groq
+
+    server, base_url = start_fake_groq(config=FakeGroqConfig(latency_ms=2000, tokens_per_second=1_000_000))
+    gateway = llm_gateway.LLMGateway(api_key="test", base_url=base_url, max_concurrency_per_model=1)
+    messages = [{"role": "user", "content": "Hello"}]
+    try:
+        holder = threading.Thread(target=gateway.complete, args=("fake-model", messages), kwargs={"timeout": 30})
+        holder.start()
+        while gateway.stats().get("fake-model", {}).get("inFlight") != 1:
+            time.sleep(0.01)
+        for _ in range(llm_resilience.LLM_CIRCUIT_FAILURE_THRESHOLD + 1):
+            with pytest.raises(llm_gateway.QueueTimeoutError):
+                gateway.complete("fake-model", messages, timeout=0.1)
+        stats = gateway.stats()["fake-model"]
+        assert stats["circuit"] == {"state": CIRCUIT_CLOSED, "consecutiveFailures": 0, "timesOpened": 0}
+        assert stats["rejected"] == llm_resilience.LLM_CIRCUIT_FAILURE_THRESHOLD + 1
+        assert server.requests == 1 # Queued calls never reached upstream
+        holder.join(10)
+        assert gateway.stats()["fake-model"]["completed"] == 1
+    finally:
+        gateway.close()
+        server.shutdown()
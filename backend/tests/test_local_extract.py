@@ -0,0 +1,55 @@
+# backend/tests/test_local_extract.py
+# Page-furniture stripping in local extraction: lines repeated at PDF page boundaries
+# are dropped, other repeated lines (and text without page breaks) are kept. Dates
+# are not mistaken for phone numbers, and short skills need a list-like context.
+from local_extract import extract_local, find_skills
+
+
+def test_pdf_page_headers_and_footers_are_stripped():
+    text = (
+        "Jane Doe\njane@example.com\nEXPERIENCE\nAcme 2019-2021\nBuilt things\nConfidential\n"
+        "\fJane Doe - Page 2\nMore work\nConfidential\n"
+        "\fJane Doe - Page 3\nEDUCATION\nMIT\nConfidential"
+    )
+    remaining = extract_local(text).remaining_text.splitlines()
+    assert "Confidential" not in remaining
+    assert "Jane Doe - Page 2" not in remaining and "Jane Doe - Page 3" not in remaining
+    assert remaining.count("Jane Doe") == 1
+    assert "Built things" in remaining and "More work" in remaining
+
+
+def test_repeated_lines_without_page_breaks_are_kept():
+    text = "Jane Doe\nEXPERIENCE\n- Led the team\n- Led the team\n- Led the team\nPage 2\nGo\nGo\nGo"
+    remaining = extract_local(text).remaining_text.splitlines()
+    assert remaining.count("- Led the team") == 3
+    assert remaining.count("Go") == 3
+    assert "Page 2" not in remaining
+
+
+def test_line_repeated_mid_page_is_not_page_furniture():
+    text = (
+        "Jane Doe\nSummary\nOne\nTwo\nShipped on time\nThree\nFour\n"
+        "\fFive\nSix\nSeven\nShipped on time\nEight\nNine\nTen"
+    )
+    remaining = extract_local(text).remaining_text.splitlines()
+    assert remaining.count("Shipped on time") == 2
+
+
+def test_date_only_lines_under_experience_survive():
+    text = (
+        "Jane Doe\n+1 555 123 4567\nEXPERIENCE\nAcme Corp\n2019-2021\n2015 2019\n"
+        "2019.06 - 2021.08\n1998-2002 | 2002-2004\nBuilt things"
+    )
+    extraction = extract_local(text)
+    remaining = extraction.remaining_text.splitlines()
+    for line in ("2019-2021", "2015 2019", "2019.06 - 2021.08", "1998-2002 | 2002-2004"):
+        assert line in remaining
+    assert "+1 555 123 4567" not in remaining
+    assert extraction.phones == ["+1 555 123 4567"]
+
+
+def test_ambiguous_short_skills_need_context():
+    for text in ("R&D budget", "C. Smith", "I will Go home", "Excel-lent results"):
+        assert find_skills(text) == [], text
+    assert find_skills("Languages: Python, Go, R, C") == ["Python", "Go", "R", "C"]
+    assert find_skills("Microsoft Excel") == ["Excel"]
@@ -0,0 +1,146 @@
+# backend/tests/test_session_store.py
+# Optimistic-concurrency (compare-and-set), TTL refresh and eviction semantics of
+# both session store backends. The Redis tests run against fakeredis (with Lua
+# support via lupa), or a real server when REDIS_TEST_URL is set, and are skipped
+# when neither is available.
+import os
+import time
+import uuid
+
+import pytest
+
+from session_store import InMemorySessionStore, RedisSessionStore, SessionConflictError
+
+
+def _state(**extra):
+    return dict({"status": "in_progress", "conversation_history": []}, **extra)
+
+
+# === In-process backend ===
+
+def test_memory_conflicting_cas_write_is_rejected():
+    store = InMemorySessionStore(ttl_seconds=60)
+    store.create("s1", _state())
+    first, second = store.get("s1"), store.get("s1")
+    first["status"] = "a"
+    assert store.save("s1", first) == 2
+    second["status"] = "b"
+    with pytest.raises(SessionConflictError):
+        store.save("s1", second)
+    assert store.get("s1")["status"] == "a"
+
+
+def test_memory_create_fails_if_session_exists():
+    store = InMemorySessionStore(ttl_seconds=60)
+    store.create("s1", _state())
+    with pytest.raises(SessionConflictError):
+        store.create("s1", _state())
+
+
+def test_memory_get_refreshes_idle_deadline():
+    store = InMemorySessionStore(ttl_seconds=0.3)
+    store.create("s1", _state())
+    for _ in range(3):
+        time.sleep(0.15)
+        assert store.get("s1") is not None # Each read pushes the deadline out again
+    time.sleep(0.35)
+    assert store.get("s1") is None
+
+
+def test_memory_sweep_evicts_idle_sessions_and_reports_them():
+    evicted = []
+    store = InMemorySessionStore(ttl_seconds=0.1, on_evict=lambda sid, state, reason: evicted.append((sid, reason)))
+    store.create("idle", _state())
+    time.sleep(0.15)
+    store.create("fresh", _state())
+    assert store.sweep() == 1
+    assert evicted == [("idle", "idle")]
+    assert store.count() == 1
+    assert store.stats()["idleEvictions"] == 1
+
+
+def test_memory_capacity_spills_least_recently_used():
+    evicted = []
+    store = InMemorySessionStore(ttl_seconds=60, max_entries=2, on_evict=lambda sid, state, reason: evicted.append((sid, reason)))
+    store.create("a", _state())
+    store.create("b", _state())
+    store.get("a") # 'b' is now least recently used
+    store.create("c", _state())
+    assert evicted == [("b", "capacity")]
+    assert store.get("a") is not None and store.get("b") is None
+
+
+def test_memory_save_after_expiry_is_a_conflict():
+    store = InMemorySessionStore(ttl_seconds=0.1)
+    store.create("s1", _state())
+    state = store.get("s1")
+    time.sleep(0.15)
+    with pytest.raises(SessionConflictError):
+        store.save("s1", state)
+
+
+# === Redis-protocol backend ===
+
+@pytest.fixture
+def redis_client():
+    url = os.getenv("REDIS_TEST_URL")
+    if url:
+        redis = pytest.importorskip("redis")
+        client = redis.Redis.from_url(url)
+        try:
+            client.ping()
+        except Exception as e:
+            pytest.skip(f"Redis at {url} unavailable: {e}")
+    else:
+        fakeredis = pytest.importorskip("fakeredis")
+        client = fakeredis.FakeRedis()
+        try:
+            client.eval("return 1", 0)
+        except Exception as e:
+            pytest.skip(f"fakeredis without Lua support (install lupa): {e}")
+    yield client
+    client.close()
+
+
+@pytest.fixture
+def redis_store(redis_client):
+    prefix = f"test-interview:{uuid.uuid4().hex}:"
+    yield RedisSessionStore(client=redis_client, ttl_seconds=60, key_prefix=prefix)
+    for key in redis_client.scan_iter(match=f"{prefix}*"):
+        redis_client.delete(key)
+
+
+def test_redis_conflicting_cas_write_is_rejected(redis_store):
+    redis_store.create("s1", _state())
+    first, second = redis_store.get("s1"), redis_store.get("s1")
+    first["status"] = "a"
+    assert redis_store.save("s1", first) == 2
+    second["status"] = "b"
+    with pytest.raises(SessionConflictError):
+        redis_store.save("s1", second)
+    assert redis_store.get("s1")["status"] == "a"
+    assert redis_store.get("s1")["version"] == 2
+
+
+def test_redis_create_fails_if_session_exists(redis_store):
+    redis_store.create("s1", _state())
+    with pytest.raises(SessionConflictError):
+        redis_store.create("s1", _state())
+
+
+def test_redis_save_refreshes_ttl(redis_store, redis_client):
+    redis_store.create("s1", _state(), ttl_seconds=5)
+    key = redis_store._key("s1")
+    assert 0 < redis_client.ttl(key) <= 5
+    state = redis_store.get("s1")
+    redis_store.save("s1", state, ttl_seconds=100)
+    assert 5 < redis_client.ttl(key) <= 100
+
+
+def test_redis_expired_session_is_gone_and_cannot_be_saved(redis_store):
+    redis_store.create("s1", _state(), ttl_seconds=1)
+    state = redis_store.get("s1")
+    time.sleep(1.2)
+    assert redis_store.get("s1") is None
+    with pytest.raises(SessionConflictError):
+        redis_store.save("s1", state) # Version 1 no longer exists: not silently recreated
@@ -0,0 +1,97 @@
+# backend/upload_guards.py
+# Cheap checks that run on resume uploads before any text extraction.
+#
+# Request bodies are capped by Flask (MAX_CONTENT_LENGTH) and file parts above
+# UPLOAD_SPOOL_THRESHOLD_BYTES are spooled to a temp file instead of RAM. Each file
+# is then checked on metadata only: its byte size, a PDF's page count (read from
+# the page tree, no content decoded) and a DOCX/zip's central directory (entry
+# count, declared uncompressed sizes and compression ratio, against zip bombs).
+import io
+import logging
+import os
+import tempfile
+import zipfile
+
+logger = logging.getLogger(__name__)
+
+MAX_UPLOAD_REQUEST_BYTES = int(os.getenv("MAX_UPLOAD_REQUEST_BYTES", str(12 * 1024 * 1024)))
+MAX_BATCH_REQUEST_BYTES = int(os.getenv("MAX_BATCH_REQUEST_BYTES", str(256 * 1024 * 1024)))
+UPLOAD_SPOOL_THRESHOLD_BYTES = int(os.getenv("UPLOAD_SPOOL_THRESHOLD_BYTES", str(512 * 1024))) # Larger parts go to disk
+MAX_RESUME_FILE_BYTES = int(os.getenv("MAX_RESUME_FILE_BYTES", str(10 * 1024 * 1024)))
+MAX_RESUME_PDF_PAGES = int(os.getenv("MAX_RESUME_PDF_PAGES", "40"))
+MAX_DOCX_ENTRIES = int(os.getenv("MAX_DOCX_ENTRIES", "1000"))
+MAX_DOCX_UNCOMPRESSED_BYTES = int(os.getenv("MAX_DOCX_UNCOMPRESSED_BYTES", str(64 * 1024 * 1024)))
+MAX_BATCH_ZIP_ENTRIES = int(os.getenv("MAX_BATCH_ZIP_ENTRIES", "5000"))
+MAX_BATCH_ZIP_UNCOMPRESSED_BYTES = int(os.getenv("MAX_BATCH_ZIP_UNCOMPRESSED_BYTES", str(2 * 1024 * 1024 * 1024)))
+MAX_ZIP_COMPRESSION_RATIO = int(os.getenv("MAX_ZIP_COMPRESSION_RATIO", "200"))
+
+
+class UploadRejected(ValueError):
+    """An upload that fails a size/shape guard; maps to HTTP 413."""
+    status_code = 413
+
+
+def spooled_file_stream(total_content_length=None, content_type=None, filename=None, content_length=None):
+    """Stream factory for uploaded file parts: memory up to the threshold, then a temp file."""
+    return tempfile.SpooledTemporaryFile(max_size=UPLOAD_SPOOL_THRESHOLD_BYTES, mode="rb+")
+
+
+def stream_size(stream) -> int:
+    """Size of a seekable stream in bytes; the position is reset to the start."""
+    stream.seek(0, io.SEEK_END)
+    size = stream.tell()
+    stream.seek(0)
+    return size
+
+
+def check_zip(source, max_entries, max_uncompressed_bytes, max_entry_bytes=None, label="archive"):
+    """Validates a zip's central directory without decompressing anything."""
+    try:
+        archive = zipfile.ZipFile(source)
+    except zipfile.BadZipFile as e:
+        raise ValueError(f"Invalid {label}: {e}")
+    with archive:
+        entries = archive.infolist()
+    if len(entries) > max_entries:
+        raise UploadRejected(f"The {label} has {len(entries)} entries (limit {max_entries}).")
+    total = 0
+    for info in entries:
+        total += info.file_size
+        if max_entry_bytes is not None and info.file_size > max_entry_bytes:
+            raise UploadRejected(f"'{info.filename}' in the {label} is {info.file_size} bytes uncompressed (limit {max_entry_bytes}).")
+        if info.compress_size and info.file_size / info.compress_size > MAX_ZIP_COMPRESSION_RATIO and info.file_size > 1024 * 1024:
+            raise UploadRejected(f"'{info.filename}' in the {label} has a suspicious compression ratio.")
+    if total > max_uncompressed_bytes:
+        raise UploadRejected(f"The {label} expands to {total} bytes (limit {max_uncompressed_bytes}).")
+    if hasattr(source, "seek"):
+        source.seek(0)
+
+
+def check_pdf(source):
+    """Rejects PDFs with more than MAX_RESUME_PDF_PAGES pages (only the page tree is read)."""
+    from PyPDF2 import PdfReader # Imported here so zip-only callers don't need PyPDF2
+    try:
+        page_count = len(PdfReader(source).pages)
+    except Exception as e:
+        raise ValueError(f"Could not read PDF: {e}")
+    if page_count > MAX_RESUME_PDF_PAGES:
+        raise UploadRejected(f"The PDF has {page_count} pages (limit {MAX_RESUME_PDF_PAGES}).")
+    if hasattr(source, "seek"):
+        source.seek(0)
+
+
+def check_resume_upload(filename, source):
+    """
+    Runs every guard for one resume file (`source` is bytes or a seekable binary
+    stream, left rewound). Raises UploadRejected (too big) or ValueError (unreadable).
+    """
+    stream = io.BytesIO(source) if isinstance(source, (bytes, bytearray)) else source
+    size = stream_size(stream)
+    if size > MAX_RESUME_FILE_BYTES:
+        raise UploadRejected(f"'{filename}' is {size} bytes (limit {MAX_RESUME_FILE_BYTES}).")
+    filename_lower = (filename or "").lower()
+    if filename_lower.endswith(".pdf"):
+        check_pdf(stream)
+    elif filename_lower.endswith(".docx"):
+        check_zip(stream, MAX_DOCX_ENTRIES, MAX_DOCX_UNCOMPRESSED_BYTES, label="DOCX file")
+    stream.seek(0)
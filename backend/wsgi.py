@@ -0,0 +1,18 @@
+# backend/wsgi.py
+# WSGI entry point for production servers.
+#
+#   gunicorn -c gunicorn.conf.py wsgi:app
+#
+# gunicorn.conf.py initializes each worker after it forks (post_worker_init) and
+# shuts it down gracefully (worker_exit). Other WSGI servers that import this
+# module once per worker process can set WSGI_INIT_ON_IMPORT=true instead.
+import atexit
+import os
+
+from appp import app, init_worker, shutdown_worker
+
+if os.getenv("WSGI_INIT_ON_IMPORT", "False").lower() == "true":
+    init_worker()
+    atexit.register(shutdown_worker)
+
+application = app # Name some servers look for by default